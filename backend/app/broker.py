@@ -0,0 +1,279 @@
+"""Fan-out of committed incident events to streaming clients.
+
+Write paths publish a ``StreamEvent`` per committed ``IncidentEvent`` row
+(through ``app.observers``); each SSE/WebSocket connection holds a
+``Subscriber`` with its filter and a bounded queue. A subscriber that falls
+more than ``stream_queue_size`` events behind is marked overflowed rather
+than slowing publishers down; the client reconnects with its last event id
+and catches up from the database with ``replay``.
+
+``InProcessBroker`` serves a single API process. Setting ``stream_redis_url``
+relays events through Redis pub/sub instead, so several processes (or a
+local Redis-compatible server) share one stream; that needs the optional
+``redis`` package.
+"""
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import get_settings
+from .db import SessionLocal
+from .models import Incident, IncidentEvent
+from .spatial import lat_lng_columns
+
+
+settings = get_settings()
+
+REDIS_CHANNEL = "relief:incident-events"
+
+# Yielded by ``event_feed``: KEEPALIVE when idle, OVERFLOW before it stops.
+KEEPALIVE = "keepalive"
+OVERFLOW = "overflow"
+
+
+@dataclass(frozen=True, slots=True)
+class StreamEvent:
+    id: int
+    incident_id: int
+    event_type: str
+    from_status: Optional[str]
+    to_status: Optional[str]
+    note: Optional[str]
+    created_at: datetime
+    lat: float
+    lng: float
+    urgency: Optional[str]
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["created_at"] = self.created_at.isoformat()
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw: str | bytes) -> "StreamEvent":
+        data = json.loads(raw)
+        data["created_at"] = datetime.fromisoformat(data["created_at"])
+        return cls(**data)
+
+
+BBOX_FORMAT = "min_lng,min_lat,max_lng,max_lat"
+
+
+def parse_bbox(bbox: str) -> tuple[float, float, float, float]:
+    """Parse a ``BBOX_FORMAT`` query value; raises ValueError."""
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise ValueError(f"bbox must be {BBOX_FORMAT}") from None
+    return min_lng, min_lat, max_lng, max_lat
+
+
+@dataclass(frozen=True, slots=True)
+class StreamFilter:
+    bbox: Optional[tuple[float, float, float, float]] = None  # min_lng, min_lat, max_lng, max_lat
+    urgencies: Optional[frozenset[str]] = None
+    incident_ids: Optional[frozenset[int]] = None
+
+    def matches(self, event: StreamEvent) -> bool:
+        if self.incident_ids is not None and event.incident_id not in self.incident_ids:
+            return False
+        if self.urgencies is not None and event.urgency not in self.urgencies:
+            return False
+        if self.bbox is not None:
+            min_lng, min_lat, max_lng, max_lat = self.bbox
+            if not (min_lng <= event.lng <= max_lng and min_lat <= event.lat <= max_lat):
+                return False
+        return True
+
+
+class Subscriber:
+    def __init__(self, stream_filter: StreamFilter, max_queue: int):
+        self.filter = stream_filter
+        self.queue: asyncio.Queue[StreamEvent] = asyncio.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def offer(self, event: StreamEvent) -> None:
+        if self.overflowed or not self.filter.matches(event):
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class InProcessBroker:
+    def __init__(self, max_queue: int):
+        self.max_queue = max_queue
+        self._subscribers: set[Subscriber] = set()
+        self.published = 0
+        self.overflows = 0
+
+    def publish(self, events: list[StreamEvent]) -> None:
+        """Hand committed events to subscribers; never blocks."""
+        self._deliver(events)
+
+    def _deliver(self, events: list[StreamEvent]) -> None:
+        self.published += len(events)
+        for subscriber in list(self._subscribers):
+            was_overflowed = subscriber.overflowed
+            for event in events:
+                subscriber.offer(event)
+            if subscriber.overflowed and not was_overflowed:
+                self.overflows += 1
+
+    @asynccontextmanager
+    async def subscribe(self, stream_filter: StreamFilter) -> AsyncIterator[Subscriber]:
+        subscriber = Subscriber(stream_filter, self.max_queue)
+        self._subscribers.add(subscriber)
+        try:
+            yield subscriber
+        finally:
+            self._subscribers.discard(subscriber)
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "overflows": self.overflows,
+        }
+
+
+class RedisBroker(InProcessBroker):
+    """Relays events through a Redis channel; local delivery is unchanged."""
+
+    def __init__(self, url: str, max_queue: int):
+        super().__init__(max_queue)
+        try:
+            import redis.asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError("stream_redis_url is set but the 'redis' package is not installed") from exc
+        self._redis = redis.from_url(url)
+        self._outbox: asyncio.Queue[str] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+
+    def publish(self, events: list[StreamEvent]) -> None:
+        for event in events:
+            self._outbox.put_nowait(event.to_json())
+
+    async def _send(self) -> None:
+        while True:
+            payload = await self._outbox.get()
+            try:
+                await self._redis.publish(REDIS_CHANNEL, payload)
+            except Exception:  # noqa: BLE001
+                logger.exception("Publishing a stream event to Redis failed")
+
+    async def _receive(self) -> None:
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(REDIS_CHANNEL)
+        async for message in pubsub.listen():
+            if message.get("type") == "message":
+                self._deliver([StreamEvent.from_json(message["data"])])
+
+    async def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._send()), asyncio.create_task(self._receive())]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._redis.aclose()
+
+
+def _make_broker() -> InProcessBroker:
+    if settings.stream_redis_url:
+        return RedisBroker(settings.stream_redis_url, settings.stream_queue_size)
+    return InProcessBroker(settings.stream_queue_size)
+
+
+broker = _make_broker()
+
+
+async def replay(
+    db: AsyncSession,
+    after_id: int,
+    stream_filter: StreamFilter,
+    limit: int,
+) -> tuple[list[StreamEvent], int]:
+    """Up to ``limit`` committed events after ``after_id``, oldest first.
+
+    Returns the matching events and the last id scanned, which is the
+    cursor for the next page (equal to ``after_id`` when nothing is left).
+    """
+    lat_col, lng_col = lat_lng_columns(Incident.location)
+    query = (
+        select(IncidentEvent, lat_col, lng_col, Incident.urgency)
+        .join(Incident, Incident.id == IncidentEvent.incident_id)
+        .where(IncidentEvent.id > after_id)
+        .order_by(IncidentEvent.id)
+        .limit(limit)
+    )
+    if stream_filter.incident_ids is not None:
+        query = query.where(IncidentEvent.incident_id.in_(stream_filter.incident_ids))
+    if stream_filter.urgencies is not None:
+        query = query.where(Incident.urgency.in_(stream_filter.urgencies))
+    rows = (await db.execute(query)).all()
+    events = [
+        StreamEvent(
+            id=event.id,
+            incident_id=event.incident_id,
+            event_type=event.event_type,
+            from_status=event.from_status,
+            to_status=event.to_status,
+            note=event.note,
+            created_at=event.created_at,
+            lat=lat,
+            lng=lng,
+            urgency=urgency,
+        )
+        for event, lat, lng, urgency in rows
+    ]
+    # bbox is checked here rather than in SQL so replay and live use one rule
+    return [e for e in events if stream_filter.matches(e)], (rows[-1][0].id if rows else after_id)
+
+
+async def event_feed(stream_filter: StreamFilter, cursor: Optional[int]) -> AsyncIterator[StreamEvent | str]:
+    """Events after ``cursor`` from the database, then live ones from the broker.
+
+    The subscription opens before the replay, so nothing committed in
+    between is lost; live events already covered by the replay are skipped.
+    Ids are allocated before commit, so a transaction that commits late can
+    land behind a cursor; resume is best-effort at that edge.
+    """
+    async with broker.subscribe(stream_filter) as subscriber:
+        last_id = cursor
+        if cursor is not None:
+            async with SessionLocal() as db:
+                while True:
+                    events, scanned = await replay(db, last_id, stream_filter, settings.stream_replay_page_size)
+                    for event in events:
+                        yield event
+                    if scanned == last_id:
+                        break
+                    last_id = scanned
+
+        while True:
+            if subscriber.overflowed and subscriber.queue.empty():
+                yield OVERFLOW
+                return
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), timeout=settings.stream_keepalive_seconds)
+            except asyncio.TimeoutError:
+                yield KEEPALIVE
+                continue
+            if last_id is not None and event.id <= last_id:
+                continue
+            yield event
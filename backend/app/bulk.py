@@ -0,0 +1,366 @@
+"""Bulk incident ingestion from NDJSON or CSV streams.
+
+Rows are validated, enriched with the ``ml`` analyzer a chunk at a time and
+written with multi-row INSERT ... RETURNING statements, one for incidents
+and one for their ``created`` events, committed per chunk. A row that fails
+validation or insertion is reported with its row number; the rest of the
+import carries on.
+
+Run as a CLI. With ``--target`` the file is streamed to a running API's
+POST /incidents/bulk, so its analytics counters, hotspot tiles and
+duplicate index take the new rows in:
+
+    python -m app.bulk incidents.ndjson --target http://localhost:8000 --token "$ADMIN_TOKEN"
+
+Without it the rows go straight into the configured database. A running
+API does not see them in its in-memory read models until it restarts:
+
+    python -m app.bulk incidents.ndjson
+    python -m app.bulk incidents.csv --format csv --chunk-size 5000
+"""
+import argparse
+import asyncio
+import csv
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .dedup import DUPLICATE_EVENT, dedup_text, duplicate_index, duplicate_note, signatures
+from .ml import ENRICHED_FIELDS, analyze_batch, enrich_fields, needs_enrichment
+from .models import Incident, IncidentEvent, IncidentStatus
+from .schemas import IncidentCreate
+from .broker import StreamEvent
+from .observers import IncidentFact, incidents_created
+
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+BULK_NOTE = "Incident created (bulk import)"
+INVALID_UTF8 = "not valid UTF-8"
+
+
+@dataclass
+class BulkImportResult:
+    inserted: int = 0
+    failed: int = 0
+    errors: list[dict] = field(default_factory=list)
+
+    def add_error(self, row: int, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": error})
+
+
+def _normalize(raw: dict) -> dict:
+    """Accept both the IncidentCreate shape and flat lat/lng columns."""
+    data = {k: (None if v == "" else v) for k, v in raw.items()}
+    if "location" not in data and ("lat" in data or "lng" in data):
+        data["location"] = {"lat": data.pop("lat", None), "lng": data.pop("lng", None)}
+    return data
+
+
+async def ndjson_rows(lines: AsyncIterator[str | bytes]) -> AsyncIterator[tuple[int, dict | str]]:
+    """Yield (row number, dict) per non-blank line, or an error string."""
+    row = 0
+    async for line in lines:
+        row += 1
+        if isinstance(line, bytes):
+            yield row, INVALID_UTF8
+            continue
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield row, f"invalid JSON: {exc.msg}"
+            continue
+        yield row, value if isinstance(value, dict) else "expected a JSON object"
+
+
+async def csv_rows(lines: AsyncIterator[str | bytes]) -> AsyncIterator[tuple[int, dict | str]]:
+    """Yield (row number, dict) per CSV record; the first record is the header.
+
+    A quoted field may span lines (free-text descriptions often do): lines
+    are gathered until the quotes balance, then parsed as one record.
+    """
+    header: Optional[list[str]] = None
+    row = 0
+    record: list[str] = []
+    quotes = 0
+    undecodable = False
+    async for line in lines:
+        if isinstance(line, bytes):
+            undecodable = True
+            line = line.decode("utf-8", errors="replace")
+        if not record and not line.strip():
+            continue
+        record.append(line + "\n")
+        # Escaped quotes are doubled, so an odd count means a quoted field is still open.
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+        values = next(csv.reader(record))
+        record, quotes = [], 0
+        if header is None:
+            if undecodable:
+                yield 0, f"header: {INVALID_UTF8}"
+                return
+            header = [h.strip() for h in values]
+            continue
+        row += 1
+        if undecodable:
+            undecodable = False
+            yield row, INVALID_UTF8
+            continue
+        if len(values) != len(header):
+            yield row, f"expected {len(header)} columns, got {len(values)}"
+            continue
+        yield row, dict(zip(header, values))
+    if record and header is not None:
+        yield row + 1, "unterminated quoted field"
+
+
+def _decode(line: bytes) -> str | bytes:
+    try:
+        return line.decode("utf-8").rstrip("\r")
+    except UnicodeDecodeError:
+        return line
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str | bytes]:
+    """Split a byte stream (e.g. a request body) into decoded lines.
+
+    A line that is not valid UTF-8 comes through as its raw bytes, for the
+    row parsers to report as a failed row.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield _decode(line)
+    if buffer:
+        yield _decode(buffer)
+
+
+async def insert_incidents(
+    db: AsyncSession,
+    rows: list[dict],
+    event_type: str,
+    notes: list[str],
+    reporter_id: Optional[int] = None,
+) -> tuple[list[IncidentFact], list[StreamEvent]]:
+    """Insert requested incidents and their creation events.
+
+    Rows carry ``lat``/``lng`` instead of ``location``. Near-duplicates are
+    linked to their primary (``app.dedup``) with a ``duplicate`` event. The
+    caller commits, then hands the returned facts and events to
+    ``incidents_created``.
+    """
+    now = datetime.utcnow()
+    incident_values = [
+        {
+            **{k: v for k, v in values.items() if k not in ("lat", "lng")},
+            "location": f"SRID=4326;POINT({values['lng']} {values['lat']})",
+            "reporter_id": reporter_id,
+            "status": IncidentStatus.requested,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for values in rows
+    ]
+    result = await db.execute(
+        insert(Incident).returning(Incident.id, sort_by_parameter_order=True),
+        incident_values,
+    )
+    ids = list(result.scalars())
+
+    # Near-duplicates of active incidents, or of earlier rows of this batch.
+    sigs = signatures([dedup_text(values["description"], values.get("raw_text")) for values in rows])
+    matches = duplicate_index.find_many(
+        [(i, values["lat"], values["lng"], now, sig) for i, values, sig in zip(ids, rows, sigs)]
+    )
+    links = [(i, m) for i, m in zip(ids, matches) if m is not None]
+    if links:
+        await db.execute(update(Incident), [{"id": i, "duplicate_of_id": m.incident_id} for i, m in links])
+
+    status = IncidentStatus.requested.value
+    event_rows = [(incident_id, event_type, status, note) for incident_id, note in zip(ids, notes)]
+    event_rows += [(i, DUPLICATE_EVENT, None, duplicate_note(m)) for i, m in links]
+    result = await db.execute(
+        insert(IncidentEvent).returning(IncidentEvent.id, sort_by_parameter_order=True),
+        [
+            {
+                "incident_id": incident_id,
+                "actor_user_id": reporter_id,
+                "from_status": None,
+                "to_status": to_status,
+                "event_type": kind,
+                "note": note,
+                "created_at": now,
+            }
+            for incident_id, kind, to_status, note in event_rows
+        ],
+    )
+    event_ids = list(result.scalars())
+    facts = [
+        IncidentFact(
+            incident_id,
+            values["lat"],
+            values["lng"],
+            status,
+            values.get("urgency"),
+            now,
+            match.incident_id if match else None,
+            sig,
+        )
+        for incident_id, values, match, sig in zip(ids, rows, matches, sigs)
+    ]
+    by_id = {f.id: f for f in facts}
+    events = []
+    for event_id, (incident_id, kind, to_status, note) in zip(event_ids, event_rows):
+        f = by_id[incident_id]
+        events.append(StreamEvent(event_id, f.id, kind, None, to_status, note, now, f.lat, f.lng, f.urgency))
+    return facts, events
+
+
+def enrich_rows(rows: list[dict]) -> None:
+    """Fill empty ``ENRICHED_FIELDS`` of incident rows with one batched analysis."""
+    texts = [values.get("raw_text") or values.get("description") for values in rows]
+    todo = [i for i, values in enumerate(rows) if texts[i] and needs_enrichment(values)]
+    for i, analysis in zip(todo, analyze_batch([texts[i] for i in todo])):
+        enrich_fields(rows[i], analysis)
+
+
+async def _flush_chunk(
+    db: AsyncSession,
+    rows: list[tuple[int, dict]],
+    reporter_id: Optional[int],
+    result: BulkImportResult,
+) -> None:
+    enrich_rows([values for _, values in rows])
+
+    try:
+        facts, events = await insert_incidents(
+            db, [values for _, values in rows], "created", [BULK_NOTE] * len(rows), reporter_id
+        )
+        await db.commit()
+        incidents_created(facts, events)
+        result.inserted += len(rows)
+        return
+    except Exception:  # noqa: BLE001
+        await db.rollback()
+
+    # Something in the chunk was rejected; retry row by row to find it.
+    for row_number, values in rows:
+        try:
+            facts, events = await insert_incidents(db, [values], "created", [BULK_NOTE], reporter_id)
+            await db.commit()
+            incidents_created(facts, events)
+            result.inserted += 1
+        except Exception as exc:  # noqa: BLE001
+            await db.rollback()
+            result.add_error(row_number, str(getattr(exc, "orig", exc)).splitlines()[0])
+
+
+async def import_incidents(
+    db: AsyncSession,
+    rows: AsyncIterator[tuple[int, dict | str]],
+    reporter_id: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> BulkImportResult:
+    result = BulkImportResult()
+    pending: list[tuple[int, dict]] = []
+
+    async for row_number, raw in rows:
+        if isinstance(raw, str):
+            result.add_error(row_number, raw)
+            continue
+        try:
+            payload = IncidentCreate.model_validate(_normalize(raw))
+        except ValidationError as exc:
+            first = exc.errors()[0]
+            loc = ".".join(str(p) for p in first["loc"])
+            result.add_error(row_number, f"{loc}: {first['msg']}")
+            continue
+
+        values = payload.model_dump(include={"description", "raw_text", "address", *ENRICHED_FIELDS})
+        values["lat"], values["lng"] = payload.location.lat, payload.location.lng
+        pending.append((row_number, values))
+        if len(pending) >= chunk_size:
+            await _flush_chunk(db, pending, reporter_id, result)
+            pending = []
+
+    if pending:
+        await _flush_chunk(db, pending, reporter_id, result)
+    return result
+
+
+async def _file_chunks(path: str, size: int = 1 << 16) -> AsyncIterator[bytes]:
+    with open(path, "rb") as fh:
+        while chunk := fh.read(size):
+            yield chunk
+
+
+async def _post(path: str, fmt: str, chunk_size: int, target: str, token: str) -> BulkImportResult:
+    import httpx
+
+    from .config import get_settings
+
+    url = f"{target.rstrip('/')}{get_settings().api_v1_prefix}/incidents/bulk"
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "text/csv" if fmt == "csv" else "application/x-ndjson",
+    }
+    async with httpx.AsyncClient(timeout=None) as client:
+        r = await client.post(url, params={"chunk_size": chunk_size}, headers=headers, content=_file_chunks(path))
+    r.raise_for_status()
+    body = r.json()
+    return BulkImportResult(body["inserted"], body["failed"], body["errors"])
+
+
+async def _main(path: str, fmt: str, chunk_size: int) -> BulkImportResult:
+    from .db import SessionLocal, dispose_engine, init_engine
+
+    init_engine()
+    parse = csv_rows if fmt == "csv" else ndjson_rows
+    try:
+        async with SessionLocal() as db:
+            # Recent unresolved primaries (the dedup window), so rows already
+            # in the database are linked too, not just repeats within the file.
+            await duplicate_index.load(db)
+            return await import_incidents(db, parse(iter_lines(_file_chunks(path))), chunk_size=chunk_size)
+    finally:
+        await dispose_engine()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk import incidents from NDJSON or CSV.")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=("ndjson", "csv"), default=None)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--target", help="base URL of a running API to import through (default: the database directly)")
+    parser.add_argument("--token", help="admin bearer token for --target")
+    args = parser.parse_args()
+    if args.target and not args.token:
+        parser.error("--target needs --token")
+
+    fmt = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+    started = datetime.utcnow()
+    if args.target:
+        result = asyncio.run(_post(args.path, fmt, args.chunk_size, args.target, args.token))
+    else:
+        result = asyncio.run(_main(args.path, fmt, args.chunk_size))
+    elapsed = (datetime.utcnow() - started).total_seconds()
+    print(json.dumps({"inserted": result.inserted, "failed": result.failed, "seconds": elapsed}))
+    for error in result.errors:
+        print(json.dumps(error))
+
+
+if __name__ == "__main__":
+    main()
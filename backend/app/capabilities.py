@@ -0,0 +1,163 @@
+"""Responder capabilities as bitsets, and what each incident needs.
+
+``Responder.skills`` (comma-separated) and ``Responder.vehicle_type`` are
+free text. They are normalized through ``ALIASES`` into a fixed vocabulary,
+one bit each, and kept as a mask column in the responder index. An incident
+maps to ``Needs``: capabilities that are required (a responder lacking any
+is not a candidate) and preferred (each one present raises the score).
+Both come from the category plus the extracted fields, so matching the
+whole fleet is a couple of bitwise operations on the mask column.
+"""
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+
+CAPABILITIES = (
+    "medical",
+    "rescue",
+    "heavy_rescue",
+    "water_rescue",
+    "firefighting",
+    "logistics",
+    "boat",
+    "ambulance",
+    "high_clearance",
+    "truck",
+    "air",
+)
+BIT = {name: 1 << i for i, name in enumerate(CAPABILITIES)}
+
+# Normalized free-text term -> capabilities it implies.
+ALIASES: dict[str, tuple[str, ...]] = {
+    "medical": ("medical",),
+    "medic": ("medical",),
+    "paramedic": ("medical",),
+    "emt": ("medical",),
+    "doctor": ("medical",),
+    "nurse": ("medical",),
+    "first aid": ("medical",),
+    "rescue": ("rescue",),
+    "search and rescue": ("rescue",),
+    "sar": ("rescue",),
+    "heavy rescue": ("rescue", "heavy_rescue"),
+    "usar": ("rescue", "heavy_rescue"),
+    "structural": ("heavy_rescue",),
+    "water rescue": ("rescue", "water_rescue"),
+    "swift water": ("rescue", "water_rescue"),
+    "swiftwater": ("rescue", "water_rescue"),
+    "diver": ("water_rescue",),
+    "lifeguard": ("water_rescue",),
+    "fire": ("firefighting",),
+    "firefighter": ("firefighting",),
+    "firefighting": ("firefighting",),
+    "logistics": ("logistics",),
+    "supplies": ("logistics",),
+    "driver": ("logistics",),
+    "boat": ("boat",),
+    "rescue boat": ("boat", "water_rescue"),
+    "dinghy": ("boat",),
+    "raft": ("boat",),
+    "kayak": ("boat",),
+    "ambulance": ("ambulance", "medical"),
+    "4x4": ("high_clearance",),
+    "jeep": ("high_clearance",),
+    "suv": ("high_clearance",),
+    "high clearance": ("high_clearance",),
+    "tractor": ("high_clearance",),
+    "truck": ("truck", "high_clearance"),
+    "lorry": ("truck", "high_clearance"),
+    "fire engine": ("firefighting", "truck"),
+    "fire truck": ("firefighting", "truck"),
+    "helicopter": ("air",),
+}
+
+_SEPARATORS = re.compile(r"[-_/\s]+")
+
+# Water deep enough that only boats get through.
+DEEP_WATER_M = 1.0
+# Water that stops ordinary cars.
+STANDING_WATER_M = 0.3
+MASS_CASUALTY_INJURED = 5
+
+
+def normalize_term(term: str) -> str:
+    return _SEPARATORS.sub(" ", term.strip().lower()).strip()
+
+
+def capability_mask(skills: Optional[str], vehicle_type: Optional[str] = None) -> int:
+    """Bitset of everything the skills list and vehicle imply; unknown terms add nothing."""
+    mask = 0
+    terms = (skills or "").split(",") + [vehicle_type or ""]
+    for term in terms:
+        for name in ALIASES.get(normalize_term(term), ()):
+            mask |= BIT[name]
+    return mask
+
+
+def capability_names(mask: int) -> list[str]:
+    return [name for name in CAPABILITIES if mask & BIT[name]]
+
+
+@dataclass(frozen=True, slots=True)
+class Needs:
+    required: int = 0
+    preferred: int = 0
+
+
+NO_NEEDS = Needs()
+
+# category -> (required, preferred)
+CATEGORY_NEEDS: dict[str, tuple[int, int]] = {
+    "medical": (BIT["medical"], BIT["ambulance"]),
+    "rescue": (BIT["rescue"], BIT["heavy_rescue"] | BIT["firefighting"]),
+    "flood": (0, BIT["boat"] | BIT["water_rescue"]),
+    "supplies": (0, BIT["logistics"] | BIT["truck"]),
+}
+
+
+def incident_needs(
+    category: Optional[str],
+    trapped: Optional[bool] = None,
+    injured_count: Optional[int] = None,
+    water_level_m: Optional[float] = None,
+) -> Needs:
+    required, preferred = CATEGORY_NEEDS.get(category or "", (0, 0))
+    if water_level_m is not None:
+        if water_level_m >= DEEP_WATER_M:
+            required |= BIT["boat"]
+            preferred |= BIT["water_rescue"]
+        elif water_level_m >= STANDING_WATER_M:
+            preferred |= BIT["boat"] | BIT["high_clearance"]
+    if trapped:
+        # In deep water the boat crew does the extraction.
+        if required & BIT["boat"]:
+            preferred |= BIT["rescue"]
+        else:
+            required |= BIT["rescue"]
+        preferred |= BIT["heavy_rescue"]
+    if injured_count:
+        preferred |= BIT["medical"]
+        if injured_count >= MASS_CASUALTY_INJURED:
+            preferred |= BIT["ambulance"]
+    return Needs(required, preferred & ~required)
+
+
+def needs_of(incident) -> Needs:
+    return incident_needs(incident.category, incident.trapped, incident.injured_count, incident.water_level_m)
+
+
+def match_matrix(
+    capabilities: np.ndarray,
+    required: np.ndarray,
+    preferred: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """(eligible, preferred fraction) of shape (incidents, responders)."""
+    caps = capabilities[None, :]
+    eligible = (caps & required[:, None]) == required[:, None]
+    wanted = np.bitwise_count(preferred)[:, None]
+    have = np.bitwise_count(caps & preferred[:, None])
+    fraction = np.divide(have, wanted, out=np.zeros(have.shape), where=wanted > 0)
+    return eligible, fraction
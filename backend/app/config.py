@@ -1,7 +1,7 @@
 from pydantic_settings import BaseSettings
 from pydantic import AnyHttpUrl
 from functools import lru_cache
-from typing import List
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -12,18 +12,90 @@ class Settings(BaseSettings):
     refresh_token_expire_minutes: int = 60 * 24 * 7
     algorithm: str = "HS256"
 
+    # Password hashing pool
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 64
+
+    # Authenticated-user cache
+    user_cache_ttl_seconds: float = 60.0
+    user_cache_max_entries: int = 10_000
+    token_cache_max_entries: int = 10_000
+
     # Database
     postgres_host: str = "db"
     postgres_port: int = 5432
     postgres_user: str = "relief"
     postgres_password: str = "relief_password"
     postgres_db: str = "relief"
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    slow_query_threshold_ms: float = 200.0
+    db_connect_timeout_seconds: float = 5.0
+    db_pool_prewarm: int = 5  # connections opened during warm-up
+
+    # Startup: warm-up retries back off up to this while the DB is down
+    startup_retry_max_seconds: float = 10.0
+    ready_check_timeout_seconds: float = 1.0
 
     # CORS
     backend_cors_origins: List[AnyHttpUrl] | List[str] = []
 
+    # Live responder positions
+    location_flush_interval_seconds: float = 2.0
+
+    # Dispatch rankings, cached per fleet version
+    dispatch_cache_max_entries: int = 10_000
+    dispatch_cache_ttl_seconds: float = 60.0
+    dispatch_cache_move_threshold_km: float = 0.25
+
+    # Responder reservations: a pending assignment holds its responder this long
+    assignment_lease_seconds: float = 120.0
+    assignment_sweep_interval_seconds: float = 5.0
+
+    # Triage scheduler (app.triage): dispatches open incidents by priority
+    triage_enabled: bool = True
+    triage_interval_seconds: float = 1.0
+    triage_batch_size: int = 50  # incidents matched jointly per tick
+    triage_aging_per_minute: float = 2.0  # priority points per minute waited
+    triage_retry_seconds: float = 15.0  # before retrying an incident nobody could take
+    triage_resync_seconds: float = 60.0
+    triage_max_radius_km: float = 50.0
+    triage_candidates_per_incident: int = 20
+    triage_time_budget_ms: float = 100.0
+    triage_shutdown_timeout_seconds: float = 10.0
+
+    # Road-network ETAs (app.routing); straight-line ETA when no graph is set
+    road_graph_path: Optional[str] = None
+    road_landmarks: int = 8
+    road_max_detour_factor: float = 2.0  # search limit: radius at average speed, times this
+    road_max_snap_km: float = 1.0
+    road_access_speed_kmh: float = 15.0  # from a point to its nearest road node
+    road_tree_cache_entries: int = 64
+
+    # Near-duplicate incident reports (app.dedup)
+    dedup_radius_m: float = 150.0
+    dedup_window_minutes: float = 180.0
+    dedup_min_similarity: float = 0.5  # estimated Jaccard of the text shingles
+
+    # Hotspot tiles: zooms up to this are served from in-memory grids
+    hotspot_grid_max_zoom: int = 10
+    hotspot_tile_max_age_seconds: int = 15
+
+    # Event streaming (SSE / WebSocket)
+    stream_queue_size: int = 1000
+    stream_keepalive_seconds: float = 15.0
+    stream_replay_page_size: int = 500
+    stream_redis_url: Optional[str] = None
+
     # SMS / external
     sms_webhook_secret: str = "CHANGE_ME_SMS_SECRET"
+    sms_queue_path: str = "sms_queue.sqlite3"
+    sms_queue_batch_size: int = 500
+    sms_queue_interval_seconds: float = 0.5
+    sms_queue_max_attempts: int = 5  # failures caused by the message itself, not by the database
+    sms_queue_claim_seconds: float = 60.0  # a claim older than this is taken over by another worker
+    sms_dedup_retention_hours: float = 72.0
 
     class Config:
         env_file = ".env"
@@ -36,6 +108,13 @@ class Settings(BaseSettings):
             f"@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
         )
 
+    @property
+    def sqlalchemy_async_database_uri(self) -> str:
+        return (
+            f"postgresql+asyncpg://{self.postgres_user}:{self.postgres_password}"
+            f"@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
+        )
+
 
 @lru_cache()
 def get_settings() -> Settings:
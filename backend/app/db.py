@@ -1,15 +1,26 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+import asyncio
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase
 from geoalchemy2 import Geography
 
 from .config import get_settings
+from .metrics import TimedQueuePool, instrument_engine
 
 
 settings = get_settings()
 
-engine = create_engine(settings.sqlalchemy_database_uri, echo=False, future=True)
+# Created by init_engine() (the app lifespan, CLIs), not at import: importing
+# the app must not need a database. The schema is managed by Alembic
+# (``alembic upgrade head``), never created by the app.
+engine: Optional[AsyncEngine] = None
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
+# expire_on_commit=False so attributes stay readable after commit without
+# an implicit (and, under asyncio, illegal) lazy refresh. Bound to the
+# engine by init_engine().
+SessionLocal = async_sessionmaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 
 class Base(DeclarativeBase):
@@ -20,9 +31,53 @@ class Base(DeclarativeBase):
 GeographyType = Geography
 
 
-def get_db():
-    db = SessionLocal()
+def init_engine() -> AsyncEngine:
+    """Create the engine and bind SessionLocal to it; idempotent."""
+    global engine
+    if engine is None:
+        engine = create_async_engine(
+            settings.sqlalchemy_async_database_uri,
+            echo=False,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            poolclass=TimedQueuePool,
+            connect_args={"timeout": settings.db_connect_timeout_seconds},
+        )
+        instrument_engine(engine)
+        SessionLocal.configure(bind=engine)
+    return engine
+
+
+async def dispose_engine() -> None:
+    global engine
+    if engine is not None:
+        await engine.dispose()
+        engine = None
+
+
+async def prewarm_pool(connections: int) -> None:
+    """Open ``connections`` pooled connections up front, so the first
+    requests do not pay for connection setup."""
+
+    async def _touch(_):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await asyncio.gather(*map(_touch, range(min(connections, settings.db_pool_size))))
+
+
+async def ping(timeout: float) -> bool:
+    if engine is None:
+        return False
     try:
+        async with asyncio.timeout(timeout):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        return True
+    except Exception:  # noqa: BLE001
+        return False
+
+
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -0,0 +1,317 @@
+"""Near-duplicate incident detection.
+
+During a surge the same emergency is reported many times, by app, SMS and
+phone. Every new incident is compared with the primaries (incidents that are
+not themselves duplicates and not resolved) reported within
+``dedup_radius_m`` and ``dedup_window_minutes`` of it. If one is textually
+similar enough, the new incident is linked to it through
+``Incident.duplicate_of_id`` and left out of dispatch.
+
+Text similarity is the Jaccard similarity of character 3-gram shingles,
+estimated from MinHash signatures. Primaries are bucketed into grid cells
+about ``dedup_radius_m`` wide, so a lookup only reads the signatures in the
+few cells around the report, whatever the number of active incidents;
+those pass an LSH band test and then the similarity threshold, both as
+array operations. The index is rebuilt at startup and kept current by the
+observers.
+"""
+import asyncio
+import calendar
+import math
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import get_settings
+from .models import Incident, IncidentStatus
+from .scoring import haversine_matrix
+from .spatial import KM_PER_DEGREE_LAT, lat_lng_columns
+
+
+settings = get_settings()
+
+NUM_PERM = 60
+BANDS = 20
+ROWS = NUM_PERM // BANDS
+# With 20 bands of 3 rows a pair at similarity 0.5 shares a band with
+# probability 0.93, at 0.6 with 0.99 and at 0.2 with 0.15.
+
+# Multiply-add hashing mod 2**32 with a odd: one multiply-add per shingle
+# and permutation in 32-bit lanes, no division.
+_rng = np.random.default_rng(20240917)
+_A = _rng.integers(0, 1 << 31, NUM_PERM, dtype=np.uint32) * np.uint32(2) + np.uint32(1)
+_B = _rng.integers(0, 1 << 32, NUM_PERM, dtype=np.uint32)
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def dedup_text(description: str, raw_text: Optional[str]) -> str:
+    """The text a report is compared by; SMS bodies already contain the description."""
+    if not raw_text or description in raw_text:
+        return description
+    return f"{description} {raw_text}"
+
+
+def _normalize(text: str) -> bytes:
+    return _NON_WORD.sub(" ", text.lower()).strip().encode()
+
+
+def signatures(texts: Sequence[str], chunk: int = 64) -> list[Optional[np.ndarray]]:
+    """MinHash signatures of the character 3-gram shingles of each text.
+
+    None for a text too short to have a shingle. The texts of a chunk are
+    hashed as one buffer; grams that straddle two texts are masked out, and
+    repeated grams need no removal since they cannot change a minimum.
+    """
+    out: list[Optional[np.ndarray]] = [None] * len(texts)
+    for first in range(0, len(texts), chunk):
+        parts = [_normalize(text) for text in texts[first : first + chunk]]
+        lengths = np.array([len(part) for part in parts])
+        data = np.frombuffer(b"".join(parts), dtype=np.uint8)
+        if len(data) < 3:
+            continue
+        grams = (data[:-2].astype(np.uint32) << 16) | (data[1:-1].astype(np.uint32) << 8) | data[2:]
+        hashed = grams[:, None] * _A + _B
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        ends = np.repeat(starts + lengths, lengths)[: len(grams)]
+        hashed[np.arange(len(grams)) + 2 >= ends] = np.iinfo(np.uint32).max
+        has_gram = np.flatnonzero(lengths >= 3)
+        if not len(has_gram):
+            continue
+        mins = np.minimum.reduceat(hashed, starts[has_gram], axis=0)
+        for i, sig in zip(has_gram, mins):
+            out[first + i] = sig
+    return out
+
+
+def signature(text: str) -> Optional[np.ndarray]:
+    return signatures([text])[0]
+
+
+def _second(dt: datetime) -> int:
+    return calendar.timegm(dt.utctimetuple())
+
+
+@dataclass(frozen=True, slots=True)
+class Match:
+    incident_id: int
+    similarity: float
+    distance_m: float
+
+
+DUPLICATE_EVENT = "duplicate"
+
+
+def duplicate_note(match: Match) -> str:
+    return (
+        f"Likely duplicate of incident #{match.incident_id} "
+        f"({match.similarity:.0%} similar, {match.distance_m:.0f} m away)"
+    )
+
+
+class DuplicateIndex:
+    """Primaries in a uniform grid of cells about ``radius_m`` wide.
+
+    Like the responder index, each primary owns a slot in column arrays
+    (position, time, signature) and cells hold slot numbers.
+    """
+
+    def __init__(self, radius_m: float, window_minutes: float, min_similarity: float, initial_capacity: int = 1024):
+        self.radius_km = radius_m / 1000
+        self.window_seconds = int(window_minutes * 60)
+        self.min_similarity = min_similarity
+        self.cell_deg = self.radius_km / KM_PER_DEGREE_LAT
+        self._lon_cells = int(math.ceil(360.0 / self.cell_deg))
+        self._lock = threading.RLock()
+        self._allocate(initial_capacity)
+        self.loaded = False
+
+    def _allocate(self, capacity: int) -> None:
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._lat = np.zeros(capacity, dtype=np.float64)
+        self._lng = np.zeros(capacity, dtype=np.float64)
+        self._second = np.zeros(capacity, dtype=np.int64)
+        self._sig = np.zeros((capacity, NUM_PERM), dtype=np.uint32)
+        self._slots: dict[int, int] = {}
+        self._free: list[int] = []
+        self._size = 0
+        self._cells: dict[tuple[int, int], set[int]] = {}
+        self._order: deque[tuple[int, int]] = deque()  # (second, id), oldest first
+
+    def _grow(self) -> None:
+        capacity = max(1, len(self._ids)) * 2
+        for name in ("_ids", "_lat", "_lng", "_second", "_sig"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[: len(old)] = old
+            setattr(self, name, new)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _cell(self, lat: float, lng: float) -> tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor((lng + 180.0) / self.cell_deg) % self._lon_cells
+
+    def _slots_near(self, lat: float, lng: float) -> np.ndarray:
+        dlat = self.radius_km / KM_PER_DEGREE_LAT
+        dlng = min(180.0, self.radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6)))
+        col_lo = math.floor((lng - dlng + 180.0) / self.cell_deg)
+        col_hi = min(math.floor((lng + dlng + 180.0) / self.cell_deg), col_lo + self._lon_cells - 1)
+        cols = {c % self._lon_cells for c in range(col_lo, col_hi + 1)}
+        found: list[int] = []
+        for row in range(math.floor((lat - dlat) / self.cell_deg), math.floor((lat + dlat) / self.cell_deg) + 1):
+            for col in cols:
+                bucket = self._cells.get((row, col))
+                if bucket:
+                    found.extend(bucket)
+        return np.fromiter(found, dtype=np.int64, count=len(found))
+
+    def _add(self, incident_id: int, lat: float, lng: float, second: int, sig: np.ndarray) -> None:
+        self._remove(incident_id)
+        if self._free:
+            slot = self._free.pop()
+        else:
+            if self._size == len(self._ids):
+                self._grow()
+            slot = self._size
+            self._size += 1
+        self._slots[incident_id] = slot
+        self._ids[slot] = incident_id
+        self._lat[slot] = lat
+        self._lng[slot] = lng
+        self._second[slot] = second
+        self._sig[slot] = sig
+        self._cells.setdefault(self._cell(lat, lng), set()).add(slot)
+        self._order.append((second, incident_id))
+
+    def _remove(self, incident_id: int) -> None:
+        slot = self._slots.pop(incident_id, None)
+        if slot is None:
+            return
+        key = self._cell(self._lat[slot], self._lng[slot])
+        bucket = self._cells.get(key)
+        if bucket is not None:
+            bucket.discard(slot)
+            if not bucket:
+                del self._cells[key]
+        self._free.append(slot)
+
+    def _expire(self, now: int) -> None:
+        cutoff = now - self.window_seconds
+        while self._order and self._order[0][0] < cutoff:
+            second, incident_id = self._order.popleft()
+            slot = self._slots.get(incident_id)
+            if slot is not None and self._second[slot] == second:
+                self._remove(incident_id)
+
+    def _find(self, lat: float, lng: float, second: int, sig: np.ndarray) -> Optional[Match]:
+        slots = self._slots_near(lat, lng)
+        if not len(slots):
+            return None
+        slots = slots[np.abs(self._second[slots] - second) <= self.window_seconds]
+        # LSH banding: a candidate agrees with the report on every row of at
+        # least one band.
+        same = self._sig[slots] == sig
+        banded = same.reshape(len(slots), BANDS, ROWS).all(axis=2).any(axis=1)
+        slots, same = slots[banded], same[banded]
+        if not len(slots):
+            return None
+        scores = same.mean(axis=1)
+        distances = haversine_matrix(np.array([lat]), np.array([lng]), self._lat[slots], self._lng[slots])[0]
+        ok = (scores >= self.min_similarity) & (distances <= self.radius_km)
+        if not ok.any():
+            return None
+        # Most similar first, then nearest.
+        best = np.lexsort((distances[ok], -scores[ok]))[0]
+        slot = slots[ok][best]
+        return Match(int(self._ids[slot]), float(scores[ok][best]), float(distances[ok][best]) * 1000)
+
+    def find(self, lat: float, lng: float, created_at: datetime, sig: Optional[np.ndarray]) -> Optional[Match]:
+        """The best matching primary for a report, if any."""
+        if sig is None:
+            return None
+        with self._lock:
+            return self._find(lat, lng, _second(created_at), sig)
+
+    def find_many(
+        self, reports: Sequence[tuple[int, float, float, datetime, Optional[np.ndarray]]]
+    ) -> list[Optional[Match]]:
+        """Match (id, lat, lng, created_at, signature) reports in order.
+
+        A report without a match is a primary for the reports after it, so
+        duplicates within one batch are linked too. The index itself is left
+        as it was; primaries are added by ``add`` once they are committed.
+        """
+        matches: list[Optional[Match]] = []
+        added: list[int] = []
+        with self._lock:
+            try:
+                for incident_id, lat, lng, created_at, sig in reports:
+                    if sig is None:
+                        matches.append(None)
+                        continue
+                    second = _second(created_at)
+                    match = self._find(lat, lng, second, sig)
+                    if match is None and incident_id not in self._slots:
+                        self._add(incident_id, lat, lng, second, sig)
+                        added.append(incident_id)
+                    matches.append(match)
+            finally:
+                for incident_id in added:
+                    self._remove(incident_id)
+        return matches
+
+    def add(self, incident_id: int, lat: float, lng: float, created_at: datetime, sig: Optional[np.ndarray]) -> None:
+        if sig is None:
+            return
+        second = _second(created_at)
+        with self._lock:
+            self._expire(max(second, _second(datetime.utcnow())))
+            self._add(incident_id, lat, lng, second, sig)
+
+    def remove(self, incident_id: int) -> None:
+        with self._lock:
+            self._remove(incident_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._slots), "cells": len(self._cells)}
+
+    async def load(self, db: AsyncSession) -> None:
+        """Rebuild from the unresolved primaries created within the window."""
+        lat_col, lng_col = lat_lng_columns(Incident.location)
+        since = datetime.utcnow() - timedelta(seconds=self.window_seconds)
+        result = await db.execute(
+            select(Incident.id, lat_col, lng_col, Incident.created_at, Incident.description, Incident.raw_text)
+            .where(
+                Incident.created_at >= since,
+                Incident.duplicate_of_id.is_(None),
+                Incident.status != IncidentStatus.resolved,
+            )
+            .order_by(Incident.created_at)
+        )
+        rows = result.all()
+        await asyncio.to_thread(self._rebuild, rows)
+
+    def _rebuild(self, rows) -> None:
+        fresh = DuplicateIndex(
+            self.radius_km * 1000, self.window_seconds / 60, self.min_similarity, max(1024, len(rows))
+        )
+        sigs = signatures([dedup_text(description, raw_text) for _, _, _, _, description, raw_text in rows])
+        for (incident_id, lat, lng, created_at, _, _), sig in zip(rows, sigs):
+            if sig is not None:
+                fresh._add(incident_id, float(lat), float(lng), _second(created_at), sig)
+        with self._lock:
+            for name in ("_ids", "_lat", "_lng", "_second", "_sig", "_slots", "_free", "_size", "_cells", "_order"):
+                setattr(self, name, getattr(fresh, name))
+            self.loaded = True
+
+
+duplicate_index = DuplicateIndex(settings.dedup_radius_m, settings.dedup_window_minutes, settings.dedup_min_similarity)
@@ -1,78 +1,394 @@
-import math
-from typing import Iterable, List
+import asyncio
+import time
+from dataclasses import replace
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, List, Optional, Sequence
 
-from sqlalchemy import select, func
-from sqlalchemy.orm import Session
+import numpy as np
+from loguru import logger
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .models import Incident, Responder
+from . import routing
+from .cache import TTLCache
+from .capabilities import needs_of
+from .config import get_settings
+from .db import SessionLocal
+from .metrics import RESERVATION_CONFLICTS
+from .models import Incident, IncidentEvent, IncidentStatus, Assignment, AssignmentStatus, Responder
+from .observers import IncidentFact, incident_events_added, stream_event
 from .schemas import DispatchScore
+from .scoring import rank_fleet, rank_fleet_many
+from .spatial import responder_index, lat_lng_columns
 
 
-AVERAGE_SPEED_KM_PER_HOUR = 30.0
+settings = get_settings()
 
+# Ranked responders per (incident, urgency, capability needs, radius, limit,
+# road closures version, fleet version). A fleet or road change bumps a version, so old
+# entries are never hit again and simply age out.
+dispatch_cache: TTLCache[tuple, List[DispatchScore]] = TTLCache(
+    settings.dispatch_cache_max_entries, settings.dispatch_cache_ttl_seconds
+)
 
-def _distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    # Haversine formula
-    R = 6371.0
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlambda = math.radians(lon2 - lon1)
 
-    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
+async def incident_lat_lng(db: AsyncSession, incident: Incident) -> tuple[float, float]:
+    lat_col, lon_col = lat_lng_columns(Incident.location)
+    result = await db.execute(select(lat_col, lon_col).where(Incident.id == incident.id))
+    lat, lon = result.one()
+    return float(lat), float(lon)
 
 
-def _parse_point(geom_wkt: str) -> tuple[float, float]:
-    # Expecting 'POINT(lon lat)'
-    inner = geom_wkt.strip()[6:-1]
-    lon_str, lat_str = inner.split()
-    return float(lat_str), float(lon_str)
+async def incidents_lat_lng(db: AsyncSession, incident_ids: Sequence[int]) -> dict[int, tuple[float, float]]:
+    lat_col, lon_col = lat_lng_columns(Incident.location)
+    result = await db.execute(select(Incident.id, lat_col, lon_col).where(Incident.id.in_(incident_ids)))
+    return {incident_id: (float(lat), float(lon)) for incident_id, lat, lon in result.all()}
 
 
-def score_responders_for_incident(
-    db: Session,
+async def score_responders_for_incident(
+    db: AsyncSession,
     incident: Incident,
     max_radius_km: float = 50.0,
+    limit: Optional[int] = None,
 ) -> List[DispatchScore]:
-    # Fetch available responders; we do distance filtering in Python for now.
-    responders: Iterable[Responder] = db.scalars(
-        select(Responder).where(Responder.is_available.is_(True))
-    ).all()
-
-    incident_lat, incident_lon = _parse_point(db.scalar(select(func.ST_AsText(incident.location))))
-
-    items: List[DispatchScore] = []
-    for resp in responders:
-        lat, lon = _parse_point(db.scalar(select(func.ST_AsText(resp.location))))
-        distance = _distance_km(incident_lat, incident_lon, lat, lon)
-        if distance > max_radius_km:
-            continue
+    # Candidates come from the in-process responder index, so only the grid
+    # cells overlapping the search radius are visited.
+    await responder_index.ensure_loaded(db)
+    needs = needs_of(incident)
+    key = (
+        incident.id,
+        incident.urgency,
+        needs,
+        max_radius_km,
+        limit,
+        routing.graph_version(),
+        responder_index.version,
+    )
+    cached = dispatch_cache.get(key)
+    if cached is not None:
+        return list(cached)
+    incident_lat, incident_lon = await incident_lat_lng(db, incident)
 
-        eta_hours = distance / AVERAGE_SPEED_KM_PER_HOUR if AVERAGE_SPEED_KM_PER_HOUR > 0 else 0
-        eta_minutes = eta_hours * 60
+    # No await between reading the versions and the fleet, so the entry is
+    # stored under the versions it was computed from (a later change only
+    # bumps past it).
+    key = key[:-2] + (routing.graph_version(), responder_index.version)
+    fleet = responder_index.candidates(incident_lat, incident_lon, max_radius_km)
+    router = routing.road_graph
+    if router is None:
+        scores = rank_fleet(incident_lat, incident_lon, incident.urgency, fleet, max_radius_km, limit, None, needs)
+    else:
+        # Road searches are milliseconds, not microseconds: off the event loop.
+        scores = await asyncio.to_thread(
+            rank_fleet, incident_lat, incident_lon, incident.urgency, fleet, max_radius_km, limit, router, needs
+        )
+    dispatch_cache.set(key, scores)
+    return list(scores)
 
-        # Simple score combining distance, trust_score, and urgency priority.
-        urgency_weight = 1.0
-        if incident.urgency == "critical":
-            urgency_weight = 1.5
-        elif incident.urgency == "urgent":
-            urgency_weight = 1.2
 
-        distance_penalty = distance / max_radius_km
-        trust = resp.trust_score or 0.5
+async def score_responders_for_incidents(
+    db: AsyncSession,
+    incidents: Sequence[Incident],
+    max_radius_km: float = 50.0,
+    limit: Optional[int] = None,
+    exclude_responder_ids: Iterable[int] = (),
+) -> dict[int, List[DispatchScore]]:
+    """Score the whole fleet against many incidents in one pass.
 
-        score = urgency_weight * (trust * 1.5 + (1 - distance_penalty))
+    The matrix work runs in a worker thread so large batches do not stall
+    the event loop.
+    """
+    if not incidents:
+        return {}
+    await responder_index.ensure_loaded(db)
+    coords = await incidents_lat_lng(db, [i.id for i in incidents])
 
-        items.append(
-            DispatchScore(
-                responder_id=resp.id,
-                score=score,
-                distance_km=distance,
-                eta_minutes=eta_minutes,
-            )
+    fleet = responder_index.snapshot()
+    excluded = np.fromiter(exclude_responder_ids, dtype=np.int64)
+    if len(excluded):
+        fleet = replace(fleet, available=fleet.available & ~np.isin(fleet.ids, excluded))
+    ranked = await asyncio.to_thread(
+        rank_fleet_many,
+        [coords[i.id][0] for i in incidents],
+        [coords[i.id][1] for i in incidents],
+        [i.urgency for i in incidents],
+        fleet,
+        max_radius_km,
+        limit,
+        routing.road_graph,
+        [needs_of(i) for i in incidents],
+    )
+    return {incident.id: scores for incident, scores in zip(incidents, ranked)}
+
+
+ACTIVE_ASSIGNMENT_STATUSES = (AssignmentStatus.pending, AssignmentStatus.accepted)
+OPEN_INCIDENT_STATUSES = (IncidentStatus.requested, IncidentStatus.triaged)
+
+
+def has_active_assignment():
+    """EXISTS clause: the incident holds a pending or accepted assignment."""
+    return (
+        select(Assignment.id)
+        .where(Assignment.incident_id == Incident.id, Assignment.status.in_(ACTIVE_ASSIGNMENT_STATUSES))
+        .exists()
+    )
+
+
+async def busy_responder_ids(db: AsyncSession) -> set[int]:
+    """Responders that already hold a pending or accepted assignment."""
+    result = await db.scalars(
+        select(Assignment.responder_id).where(Assignment.status.in_(ACTIVE_ASSIGNMENT_STATUSES))
+    )
+    return set(result.all())
+
+
+# Ranked candidates per wanted responder when reserving, so responders that
+# other dispatchers took since the ranking still leave enough.
+RESERVATION_HEADROOM = 3
+
+
+def lease_deadline() -> datetime:
+    return datetime.utcnow() + timedelta(seconds=settings.assignment_lease_seconds)
+
+
+async def reserve_responders(db: AsyncSession, ranked_ids: Sequence[int], limit: Optional[int] = None) -> list[int]:
+    """Reserve up to ``limit`` of ``ranked_ids``, best first, by marking them unavailable.
+
+    The rows are locked with SKIP LOCKED, so a responder another dispatcher
+    is reserving at the same moment is passed over instead of waited for,
+    and one it has already reserved is no longer available. Concurrent
+    dispatchers never block each other or book the same responder. The
+    caller commits, or rolls back to drop the reservation.
+    """
+    if not ranked_ids:
+        return []
+    free = set(
+        await db.scalars(
+            select(Responder.id)
+            .where(Responder.id.in_(ranked_ids), Responder.is_available.is_(True))
+            .with_for_update(skip_locked=True)
+        )
+    )
+    if len(free) < len(ranked_ids):
+        RESERVATION_CONFLICTS.inc(len(ranked_ids) - len(free))
+    reserved = [responder_id for responder_id in ranked_ids if responder_id in free][:limit]
+    if reserved:
+        await db.execute(
+            update(Responder)
+            .where(Responder.id.in_(reserved))
+            .values(is_available=False)
+            .execution_options(synchronize_session=False)
+        )
+    return reserved
+
+
+async def release_responders(db: AsyncSession, responder_ids: Iterable[int]) -> list[int]:
+    """Make responders available again unless they still hold an active assignment.
+
+    Run after the assignment's own status change, in the same transaction.
+    """
+    ids = list(set(responder_ids))
+    if not ids:
+        return []
+    still_active = (
+        select(Assignment.id)
+        .where(Assignment.responder_id == Responder.id, Assignment.status.in_(ACTIVE_ASSIGNMENT_STATUSES))
+        .exists()
+    )
+    result = await db.scalars(
+        update(Responder)
+        .where(Responder.id.in_(ids), ~still_active)
+        .values(is_available=True)
+        .returning(Responder.id)
+        .execution_options(synchronize_session=False)
+    )
+    return list(result)
+
+
+async def end_assignments(
+    db: AsyncSession,
+    incident_id: int,
+    statuses: Sequence[AssignmentStatus],
+    to: AssignmentStatus,
+    note: str,
+    actor_user_id: Optional[int] = None,
+    keep_id: Optional[int] = None,
+) -> tuple[list[IncidentEvent], list[int]]:
+    """Move the incident's assignments in ``statuses`` (except ``keep_id``) to ``to``.
+
+    Their responders are released in the same transaction; ``note`` is
+    formatted with each responder id. Lock the incident row first, as
+    every path that ends several of its assignments does. Returns the
+    events and the released responder ids; the caller commits.
+    """
+    query = select(Assignment).where(Assignment.incident_id == incident_id, Assignment.status.in_(statuses))
+    if keep_id is not None:
+        query = query.where(Assignment.id != keep_id)
+    ended = (await db.scalars(query.with_for_update())).all()
+    if not ended:
+        return [], []
+    for assignment in ended:
+        assignment.status = to
+        assignment.expires_at = None
+    events = [
+        IncidentEvent(
+            incident_id=incident_id,
+            actor_user_id=actor_user_id,
+            event_type=f"assignment_{to.value}",
+            note=note.format(a.responder_id),
         )
+        for a in ended
+    ]
+    db.add_all(events)
+    await db.flush()
+    return events, await release_responders(db, [a.responder_id for a in ended])
+
+
+def availability_changed(reserved: Iterable[int] = (), released: Iterable[int] = ()) -> None:
+    """Mirror committed reservations and releases into the responder index."""
+    for responder_id in reserved:
+        responder_index.set_available(responder_id, False)
+    for responder_id in released:
+        responder_index.set_available(responder_id, True)
+
+
+def assigned_events(assignments: Sequence[Assignment], actor_user_id: Optional[int]) -> list[IncidentEvent]:
+    return [
+        IncidentEvent(
+            incident_id=a.incident_id,
+            actor_user_id=actor_user_id,
+            event_type="assigned",
+            note=f"Responder {a.responder_id} proposed (score {a.score:.2f}, eta {a.eta_minutes:.0f} min)",
+        )
+        for a in assignments
+    ]
+
+
+def publish_events(events: Sequence[IncidentEvent], incidents: dict[int, Incident]) -> None:
+    """Stream committed events that leave the incident read models alone."""
+    facts = {e.incident_id: IncidentFact.from_incident(incidents[e.incident_id]) for e in events}
+    incident_events_added([stream_event(e, facts[e.incident_id]) for e in events])
+
+
+EXPIRE_BATCH = 500
+
+
+async def expire_assignments(limit: int = EXPIRE_BATCH) -> list[int]:
+    """Cancel up to ``limit`` pending assignments whose lease ran out and release their responders.
+
+    Returns the incident id of each expired assignment.
+    """
+    async with SessionLocal() as db:
+        expired = (
+            await db.scalars(
+                select(Assignment)
+                .where(Assignment.status == AssignmentStatus.pending, Assignment.expires_at < datetime.utcnow())
+                .order_by(Assignment.expires_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+        ).all()
+        if not expired:
+            return []
+        for assignment in expired:
+            assignment.status = AssignmentStatus.cancelled
+            assignment.expires_at = None
+        events = [
+            IncidentEvent(
+                incident_id=a.incident_id,
+                event_type="assignment_expired",
+                note=f"Responder {a.responder_id} did not answer in time",
+            )
+            for a in expired
+        ]
+        db.add_all(events)
+        await db.flush()
+        released = await release_responders(db, [a.responder_id for a in expired])
+        incident_ids = {a.incident_id for a in expired}
+        incidents = {i.id: i for i in await db.scalars(select(Incident).where(Incident.id.in_(incident_ids)))}
+        await db.commit()
+    availability_changed(released=released)
+    publish_events(events, incidents)
+    return [a.incident_id for a in expired]
+
+
+async def run_assignment_sweeper(
+    interval_seconds: float, on_expired: Optional[Callable[[list[int]], None]] = None
+) -> None:
+    """Expire lapsed offers every ``interval_seconds``; ``on_expired`` gets their incident ids."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            while True:
+                incident_ids = await expire_assignments()
+                if incident_ids and on_expired is not None:
+                    on_expired(incident_ids)
+                if len(incident_ids) < EXPIRE_BATCH:
+                    break
+        except Exception:  # noqa: BLE001
+            logger.exception("Expiring assignment leases failed")
+
+
+def assign_jointly(
+    ranked: dict[int, List[DispatchScore]],
+    per_incident: int = 1,
+    time_budget_ms: Optional[float] = None,
+    epsilon: float = 0.01,
+) -> list[tuple[int, DispatchScore]]:
+    """Jointly match responders to incidents with a forward auction.
+
+    Every incident gets ``per_incident`` bidder slots; a slot bids for the
+    responder with the best score minus current price, raising that price by
+    the margin over its second choice plus ``epsilon``. Leaving a slot empty
+    is always an option worth 0, so slots without a worthwhile responder drop
+    out. The result is within ``len(slots) * epsilon`` of the best total
+    score. If the time budget runs out, the slots still open are filled
+    greedily from the responders nobody has won.
+    """
+    deadline = time.perf_counter() + time_budget_ms / 1000 if time_budget_ms is not None else None
+
+    slots: list[tuple[int, List[DispatchScore]]] = [
+        (incident_id, scores)
+        for incident_id, scores in ranked.items()
+        if scores
+        for _ in range(per_incident)
+    ]
+    prices: dict[int, float] = {}
+    owner: dict[int, int] = {}
+    won: dict[int, DispatchScore] = {}
+    queue = list(range(len(slots)))
+
+    rounds = 0
+    while queue:
+        rounds += 1
+        if deadline is not None and rounds % 256 == 0 and time.perf_counter() > deadline:
+            break
+        slot = queue.pop()
+        best: Optional[DispatchScore] = None
+        best_value = 0.0
+        second_value = 0.0
+        for score in slots[slot][1]:
+            value = score.score - prices.get(score.responder_id, 0.0)
+            if value > best_value:
+                best, second_value, best_value = score, best_value, value
+            elif value > second_value:
+                second_value = value
+        if best is None:
+            continue
+
+        prices[best.responder_id] = prices.get(best.responder_id, 0.0) + best_value - second_value + epsilon
+        previous = owner.get(best.responder_id)
+        if previous is not None:
+            del won[previous]
+            queue.append(previous)
+        owner[best.responder_id] = slot
+        won[slot] = best
+
+    for slot in queue:
+        for score in slots[slot][1]:
+            if score.responder_id not in owner:
+                owner[score.responder_id] = slot
+                won[slot] = score
+                break
 
-    items.sort(key=lambda x: x.score, reverse=True)
-    return items
+    return [(slots[slot][0], score) for slot, score in sorted(won.items())]
@@ -0,0 +1,54 @@
+"""JSON responses encoded straight from column rows.
+
+List endpoints select only the columns their ``*Out`` schema exposes and
+encode the row tuples with orjson, skipping ORM instances and per-row
+pydantic validation. The wire format matches FastAPI's default
+``response_model`` encoding: compact separators, ISO datetimes, enum values
+and raw UTF-8. Unbounded lists are streamed as a JSON array from their own
+session, a partition of rows at a time.
+"""
+from typing import Iterable, Optional, Sequence
+
+import orjson
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import Select
+
+from .db import SessionLocal
+
+
+STREAM_PARTITION_ROWS = 1000
+
+
+def schema_columns(model, schema: type[BaseModel]) -> list:
+    """The mapped columns of ``model`` named by ``schema``'s fields, in field order."""
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+def encode_rows(rows: Iterable[Sequence], names: Sequence[str]) -> bytes:
+    return orjson.dumps([dict(zip(names, row)) for row in rows])
+
+
+def json_response(content, headers: Optional[dict] = None) -> Response:
+    return Response(orjson.dumps(content), media_type="application/json", headers=headers)
+
+
+def rows_response(rows: Iterable[Sequence], names: Sequence[str], headers: Optional[dict] = None) -> Response:
+    return Response(encode_rows(rows, names), media_type="application/json", headers=headers)
+
+
+def streamed_rows_response(query: Select, names: Sequence[str]) -> StreamingResponse:
+    """Stream ``query``'s rows as a JSON array of objects keyed by ``names``."""
+
+    async def body():
+        yield b"["
+        first = True
+        async with SessionLocal() as db:
+            result = await db.stream(query.execution_options(yield_per=STREAM_PARTITION_ROWS))
+            async for partition in result.partitions():
+                chunk = b",".join(orjson.dumps(dict(zip(names, row))) for row in partition)
+                yield chunk if first else b"," + chunk
+                first = False
+        yield b"]"
+
+    return StreamingResponse(body(), media_type="application/json")
@@ -0,0 +1,98 @@
+"""Startup warm-up and the readiness gate.
+
+The lifespan only creates the engine and starts the background workers, so
+a worker is live (``/health``) as soon as it has imported. Warm-up — the road
+graph, pool pre-warming and the in-memory read models — runs in the background
+and retries while the database is unreachable instead of failing worker
+start. Until it has finished, ``/ready`` answers 503 and API requests are
+refused with 503, so no write lands between a read-model snapshot and the
+observers that keep it current.
+"""
+import asyncio
+import time
+from typing import Optional
+
+from loguru import logger
+
+from . import db, observers
+from .config import get_settings
+from .routing import load_road_graph
+from .spatial import responder_index
+
+
+settings = get_settings()
+
+
+class Readiness:
+    def __init__(self):
+        self.ready = False
+        self.started_at = time.monotonic()
+        self.warmup_seconds: Optional[float] = None
+        self.attempts = 0
+        self.last_error: Optional[str] = None
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "warmup_seconds": self.warmup_seconds,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+        }
+
+
+readiness = Readiness()
+
+
+async def warm_up() -> None:
+    """Load the road graph, then pre-warm the pool and load the read models,
+    retrying the database part with backoff."""
+    try:
+        await asyncio.to_thread(load_road_graph)
+    except Exception:  # noqa: BLE001
+        # A broken extract should not keep the API down; dispatch falls back
+        # to straight-line ETAs.
+        logger.exception("Loading the road graph failed; using straight-line ETAs")
+
+    delay = 0.5
+    while True:
+        readiness.attempts += 1
+        try:
+            await db.prewarm_pool(settings.db_pool_prewarm)
+            async with db.SessionLocal() as session:
+                await observers.load(session)
+                await responder_index.load(session)
+        except Exception as exc:  # noqa: BLE001
+            readiness.last_error = f"{type(exc).__name__}: {exc}"
+            logger.warning("Warm-up attempt {} failed ({}); retrying in {:.1f}s", readiness.attempts, exc, delay)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, settings.startup_retry_max_seconds)
+            continue
+        readiness.ready = True
+        readiness.last_error = None
+        readiness.warmup_seconds = time.monotonic() - readiness.started_at
+        logger.info("Ready after {:.2f}s ({} attempt(s))", readiness.warmup_seconds, readiness.attempts)
+        return
+
+
+class ReadinessGateMiddleware:
+    """Refuse API requests with 503 until warm-up has finished."""
+
+    def __init__(self, app, prefix: str):
+        self.app = app
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if readiness.ready or scope["type"] not in ("http", "websocket") or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+        if scope["type"] == "websocket":
+            await send({"type": "websocket.close", "code": 1013})
+            return
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [(b"content-type", b"application/json"), (b"retry-after", b"1")],
+            }
+        )
+        await send({"type": "http.response.body", "body": b'{"detail":"Service is starting"}'})
@@ -0,0 +1,106 @@
+"""Live responder positions with coalesced writes to PostGIS.
+
+GPS pings update the in-memory responder index straight away so dispatch
+sees fresh positions. Only the latest ping per responder is remembered, and
+a background task flushes those to ``responders.location`` in one batched
+UPDATE every few seconds.
+"""
+import asyncio
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+from loguru import logger
+from sqlalchemy import bindparam, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .db import SessionLocal
+from .models import Responder
+from .spatial import responder_index
+
+
+class LivePositionTable:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_seen: dict[int, datetime] = {}
+        self._pending: dict[int, tuple[float, float, datetime]] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def record(
+        self,
+        responder_id: int,
+        lat: float,
+        lon: float,
+        recorded_at: Optional[datetime] = None,
+    ) -> bool:
+        """Store a ping; returns False if it is older than one already seen.
+
+        ``recorded_at`` may carry a timezone (client clocks); it is kept as
+        naive UTC like every other timestamp here.
+        """
+        if recorded_at is None:
+            recorded_at = datetime.utcnow()
+        elif recorded_at.tzinfo is not None:
+            recorded_at = recorded_at.astimezone(timezone.utc).replace(tzinfo=None)
+        with self._lock:
+            last = self._last_seen.get(responder_id)
+            if last is not None and recorded_at < last:
+                return False
+            self._last_seen[responder_id] = recorded_at
+            self._pending[responder_id] = (lat, lon, recorded_at)
+            # Under the lock, so an older ping applied later cannot move the index past a newer one.
+            responder_index.move(responder_id, lat, lon)
+        return True
+
+    def drain(self) -> dict[int, tuple[float, float, datetime]]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def restore(self, pending: dict[int, tuple[float, float, datetime]]) -> None:
+        """Put back positions from a failed flush unless newer ones arrived."""
+        with self._lock:
+            for responder_id, position in pending.items():
+                self._pending.setdefault(responder_id, position)
+
+    async def flush(self, db: AsyncSession) -> int:
+        pending = self.drain()
+        if not pending:
+            return 0
+        table = Responder.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("responder_id"))
+            .values(location=bindparam("ewkt"))
+        )
+        params = [
+            {"responder_id": responder_id, "ewkt": f"SRID=4326;POINT({lon} {lat})"}
+            for responder_id, (lat, lon, _) in pending.items()
+        ]
+        try:
+            await db.execute(stmt, params)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            self.restore(pending)
+            raise
+        return len(params)
+
+
+live_positions = LivePositionTable()
+
+
+async def flush_live_positions() -> int:
+    async with SessionLocal() as db:
+        return await live_positions.flush(db)
+
+
+async def run_position_flusher(interval_seconds: float) -> None:
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await flush_live_positions()
+        except Exception:  # noqa: BLE001
+            logger.exception("Flushing live responder positions failed")
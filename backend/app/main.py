@@ -1,16 +1,62 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
+from .broker import broker
 from .config import get_settings
-from .db import Base, engine
-from .routers import auth, incidents, responders, dispatch, sms, analytics
+from .db import dispose_engine, init_engine, ping
+from .dispatch import run_assignment_sweeper
+from .hashing import password_hasher
+from .lifecycle import ReadinessGateMiddleware, readiness, warm_up
+from .live import flush_live_positions, run_position_flusher
+from .metrics import MetricsMiddleware, metrics_response
+from .sms_queue import drain_sms_queue, run_sms_worker, sms_queue
+from .triage import triage_scheduler
+from .routers import auth, incidents, responders, dispatch, assignments, sms, analytics, stream, roads
 
 
 settings = get_settings()
 
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title=settings.app_name)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # No schema work here: run `alembic upgrade head` before starting workers.
+    init_engine()
+    warmup = asyncio.create_task(warm_up())
+    await broker.start()
+    flusher = asyncio.create_task(run_position_flusher(settings.location_flush_interval_seconds))
+    sms_worker = asyncio.create_task(run_sms_worker(settings.sms_queue_interval_seconds))
+    triage = None
+    if settings.triage_enabled:
+        triage = asyncio.create_task(triage_scheduler.run(settings.triage_interval_seconds))
+    sweeper = asyncio.create_task(
+        run_assignment_sweeper(settings.assignment_sweep_interval_seconds, triage_scheduler.reopen)
+    )
+    yield
+    if triage is not None:
+        # Let a dispatch in progress commit and publish before the engine goes.
+        triage_scheduler.stop()
+        with suppress(asyncio.TimeoutError, asyncio.CancelledError):
+            await asyncio.wait_for(triage, settings.triage_shutdown_timeout_seconds)
+    for task in (warmup, flusher, sms_worker, sweeper):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await flush_live_positions()
+    with suppress(Exception):
+        await drain_sms_queue()
+    sms_queue.close()
+    await broker.stop()
+    password_hasher.shutdown()
+    await dispose_engine()
+
+
+app = FastAPI(title=settings.app_name, lifespan=lifespan)
+app.add_middleware(ReadinessGateMiddleware, prefix=settings.api_v1_prefix)
+app.add_middleware(MetricsMiddleware)
 
 
 if settings.backend_cors_origins:
@@ -25,12 +71,29 @@ if settings.backend_cors_origins:
 
 @app.get("/health")
 async def health_check():
+    """Liveness: the process is up and serving; never touches the database."""
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def ready_check():
+    """Readiness: warm-up has finished and the database answers."""
+    if readiness.ready and await ping(settings.ready_check_timeout_seconds):
+        return {"status": "ready", **readiness.status()}
+    return JSONResponse({"status": "not_ready", **readiness.status()}, status_code=503)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return metrics_response()
+
+
 app.include_router(auth.router, prefix=settings.api_v1_prefix)
 app.include_router(incidents.router, prefix=settings.api_v1_prefix)
 app.include_router(responders.router, prefix=settings.api_v1_prefix)
 app.include_router(dispatch.router, prefix=settings.api_v1_prefix)
+app.include_router(assignments.router, prefix=settings.api_v1_prefix)
 app.include_router(sms.router, prefix=settings.api_v1_prefix)
 app.include_router(analytics.router, prefix=settings.api_v1_prefix)
+app.include_router(stream.router, prefix=settings.api_v1_prefix)
+app.include_router(roads.router, prefix=settings.api_v1_prefix)
@@ -0,0 +1,255 @@
+"""Prometheus instrumentation, exported on ``/metrics``.
+
+- request latency per method/route/status (ASGI middleware),
+- SQL statement latency per operation and statements/DB time per request,
+  from cursor events on the engine, plus a slow-query log,
+- connection pool checkout wait, and size/checked-out/overflow gauges,
+- gauges and counters for the in-process caches, queues and workers,
+- time to first offer and to assignment, and triage scheduler tick duration.
+
+Per-request DB totals are kept in a context variable set by the middleware;
+SQLAlchemy runs asyncpg calls in greenlets that inherit the caller's
+context, so the engine events see the request that issued the statement.
+"""
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from loguru import logger
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, REGISTRY
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.responses import Response
+
+from .config import get_settings
+
+
+settings = get_settings()
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency, until the last body byte is sent",
+    ["method", "route", "status"],
+)
+REQUEST_DB_STATEMENTS = Histogram(
+    "http_request_db_statements",
+    "SQL statements executed per request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100, 250, 1000),
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Time spent executing SQL per request",
+    ["route"],
+)
+STATEMENT_LATENCY = Histogram(
+    "db_statement_duration_seconds",
+    "SQL statement latency by operation",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 10),
+)
+SLOW_STATEMENTS = Counter(
+    "db_slow_statements_total",
+    "SQL statements slower than slow_query_threshold_ms",
+    ["operation"],
+)
+RESERVATION_CONFLICTS = Counter(
+    "dispatch_reservation_conflicts_total",
+    "Ranked responders a dispatcher found reserved by another or being reserved",
+)
+WAIT_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 7200, 21600)
+CAPABILITY_FALLBACKS = Counter(
+    "dispatch_capability_fallbacks_total",
+    "Incidents ranked against unqualified responders because no qualified one was in range",
+)
+TRIAGE_TIME_TO_FIRST_OFFER = Histogram(
+    "triage_time_to_first_offer_seconds",
+    "From incident creation to its first offer by the triage scheduler",
+    buckets=WAIT_BUCKETS,
+)
+INCIDENT_TIME_TO_ASSIGNMENT = Histogram(
+    "incident_time_to_assignment_seconds",
+    "From incident creation to a responder accepting it",
+    buckets=WAIT_BUCKETS,
+)
+TRIAGE_TICK = Histogram(
+    "triage_tick_duration_seconds",
+    "Triage scheduler tick: queue refresh plus one micro-batch dispatch",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+
+
+class RequestDbStats:
+    __slots__ = ("route", "statements", "seconds")
+
+    def __init__(self):
+        self.route = "unmatched"
+        self.statements = 0
+        self.seconds = 0.0
+
+
+_request_db: ContextVar[Optional[RequestDbStats]] = ContextVar("request_db", default=None)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that records how long each checkout waited."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+
+def _operation(statement: str) -> str:
+    word = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return word if word in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OTHER"
+
+
+def instrument_engine(engine) -> None:
+    sync_engine = engine.sync_engine
+    threshold = settings.slow_query_threshold_ms / 1000
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        operation = _operation(statement)
+        STATEMENT_LATENCY.labels(operation).observe(elapsed)
+
+        stats = _request_db.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.seconds += elapsed
+        if elapsed >= threshold:
+            SLOW_STATEMENTS.labels(operation).inc()
+            logger.warning(
+                "Slow query ({:.1f} ms, route {}): {}",
+                elapsed * 1000,
+                stats.route if stats is not None else "-",
+                " ".join(statement.split())[:500],
+            )
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streamed responses are timed to their end."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestDbStats()
+        token = _request_db.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            stats.route = getattr(route, "path", "unmatched")
+            REQUEST_LATENCY.labels(scope["method"], stats.route, str(status_code)).observe(
+                time.perf_counter() - start
+            )
+            REQUEST_DB_STATEMENTS.labels(stats.route).observe(stats.statements)
+            REQUEST_DB_SECONDS.labels(stats.route).observe(stats.seconds)
+            _request_db.reset(token)
+
+
+# Keys of the ``stats()`` dicts below that only ever grow: exported as counters, so rate() works.
+_COUNTER_KEYS = frozenset({"hits", "misses", "evictions", "published", "overflows", "offered", "ticks"})
+
+
+class _StateCollector:
+    """Gauges and counters read at scrape time from the pool and in-process structures."""
+
+    def describe(self):
+        # Nothing to check up front; skips a collect() at registration time.
+        return []
+
+    def collect(self):
+        from . import db
+        from .broker import broker
+        from .dedup import duplicate_index
+        from .dispatch import dispatch_cache
+        from .hashing import password_hasher
+        from .lifecycle import readiness
+        from .live import live_positions
+        from .routing import road_graph
+        from .security import auth_cache_stats
+        from .sms_queue import sms_queue
+        from .spatial import responder_index
+        from .triage import triage_scheduler
+
+        yield _gauge("app_ready", "Warm-up finished and serving API requests", int(readiness.ready))
+        if db.engine is not None:
+            pool = db.engine.sync_engine.pool
+            yield _gauge("db_pool_size", "Configured pool size", pool.size())
+            yield _gauge("db_pool_checked_out", "Connections currently checked out", pool.checkedout())
+            yield _gauge("db_pool_overflow", "Connections open beyond pool_size", max(pool.overflow(), 0))
+            yield _gauge("db_pool_checked_in", "Idle pooled connections", pool.checkedin())
+
+        for name, stats in auth_cache_stats().items():
+            for key in ("entries", "hits", "misses", "evictions"):
+                yield _stat(f"auth_{name}_cache_{key}", f"Auth {name} cache {key}", key, stats[key])
+
+        yield _gauge("password_hash_pending", "Queued or running password hashes", password_hasher.pending)
+        yield _counter("password_hash_rejected", "Hash requests rejected as busy", password_hasher.rejected)
+        yield _gauge("live_positions_pending", "Responder positions waiting to be flushed", len(live_positions))
+        yield _gauge("responder_index_loaded", "Responder index is loaded", int(responder_index.loaded))
+        yield _gauge("responder_index_version", "Fleet version keying dispatch rankings", responder_index.version)
+        dispatch_stats = dispatch_cache.stats()
+        for key in ("entries", "hits", "misses", "evictions"):
+            yield _stat(f"dispatch_cache_{key}", f"Dispatch ranking cache {key}", key, dispatch_stats[key])
+        if road_graph is not None:
+            for key, value in road_graph.stats().items():
+                yield _gauge(f"road_graph_{key}", f"Road graph {key}", value)
+        for key, value in duplicate_index.stats().items():
+            yield _gauge(f"dedup_index_{key}", f"Near-duplicate index {key}", value)
+        for key, value in triage_scheduler.stats().items():
+            yield _stat(f"triage_{key}", f"Triage scheduler {key}", key, value)
+        # Counted by the SMS worker off the event loop; a scrape never touches SQLite.
+        for state, count in sms_queue.cached_stats().items():
+            yield _gauge(f"sms_queue_{state}", f"SMS queue messages in state {state}", count)
+        for key, value in broker.stats().items():
+            yield _stat(f"stream_{key}", f"Event stream {key}", key, value)
+
+
+REGISTRY.register(_StateCollector())
+
+
+def _gauge(name: str, documentation: str, value: float) -> GaugeMetricFamily:
+    return GaugeMetricFamily(name, documentation, value=value)
+
+
+def _counter(name: str, documentation: str, value: float) -> CounterMetricFamily:
+    """Exported as ``<name>_total``."""
+    return CounterMetricFamily(name, documentation, value=value)
+
+
+def _stat(name: str, documentation: str, key: str, value: float):
+    return (_counter if key in _COUNTER_KEYS else _gauge)(name, documentation, value)
+
+
+def metrics_response() -> Response:
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,44 +1,137 @@
+import re
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Sequence
 
 
-@dataclass
+@dataclass(frozen=True)
 class ClassificationResult:
     category: str
     urgency: str
 
 
-@dataclass
+@dataclass(frozen=True)
 class ExtractionResult:
     injured_count: Optional[int]
     trapped: Optional[bool]
     water_level_m: Optional[float]
 
 
+@dataclass(slots=True)
+class TextAnalysis:
+    classification: ClassificationResult
+    extraction: ExtractionResult
+
+
+# (category, urgency, keywords) in priority order: the first rule with any
+# keyword present in the text wins.
+CATEGORY_RULES: list[tuple[str, str, tuple[str, ...]]] = [
+    ("medical", "critical", ("heart attack", "unconscious", "severe bleeding", "not breathing")),
+    ("rescue", "critical", ("fire", "building collapse", "trapped")),
+    ("flood", "urgent", ("flood", "water rising", "water level")),
+    ("supplies", "urgent", ("no food", "no water", "supplies")),
+]
+DEFAULT_CLASSIFICATION = ("other", "low")
+
+# Presence of this keyword sets ExtractionResult.trapped.
+TRAPPED_KEYWORD = "trapped"
+
+# Both numeric extractions in one pattern, so a single scan finds them.
+# The lookbehind anchors "N injured" at the first digit, like re.search did.
+_EXTRACTION_PATTERN = re.compile(r"(?<!\d)(\d+)\s+injured|water\s+(\d+(?:\.\d+)?)m")
+
+
+class _Matcher:
+    """Rule table compiled once into the structures ``analyze`` walks.
+
+    Keywords are matched as plain substrings, rule by rule with an early
+    exit: CPython's substring search beats a combined keyword regex for a
+    table this size. Numeric fields come from one compiled regex scan.
+    """
+
+    def __init__(self, rules, default):
+        self.rules = tuple(
+            (ClassificationResult(category=category, urgency=urgency), tuple(keywords))
+            for category, urgency, keywords in rules
+        )
+        self.default = ClassificationResult(*default)
+        self.no_extraction = ExtractionResult(injured_count=None, trapped=None, water_level_m=None)
+
+    def analyze(self, text: str) -> TextAnalysis:
+        lowered = text.lower()
+
+        classification = self.default
+        for result, keywords in self.rules:
+            for keyword in keywords:
+                if keyword in lowered:
+                    classification = result
+                    break
+            else:
+                continue
+            break
+
+        injured = None
+        water_level = None
+        for injured_str, water_str in _EXTRACTION_PATTERN.findall(lowered):
+            if injured_str:
+                if injured is None:
+                    injured = int(injured_str)
+            elif water_level is None:
+                water_level = float(water_str)
+        trapped = True if TRAPPED_KEYWORD in lowered else None
+
+        if injured is None and trapped is None and water_level is None:
+            extraction = self.no_extraction
+        else:
+            extraction = ExtractionResult(injured_count=injured, trapped=trapped, water_level_m=water_level)
+        return TextAnalysis(classification=classification, extraction=extraction)
+
+
+_matcher = _Matcher(CATEGORY_RULES, DEFAULT_CLASSIFICATION)
+
+
+def analyze_text(text: str) -> TextAnalysis:
+    """Classify the text and extract structured fields in one call."""
+    return _matcher.analyze(text)
+
+
+def analyze_batch(texts: Sequence[str]) -> list[TextAnalysis]:
+    analyze = _matcher.analyze
+    return [analyze(text) for text in texts]
+
+
+# Incident fields the analysis can fill in when the reporter left them empty.
+ENRICHED_FIELDS = ("category", "urgency", "injured_count", "trapped", "water_level_m")
+
+
+def needs_enrichment(fields: dict) -> bool:
+    return any(fields.get(name) is None for name in ENRICHED_FIELDS)
+
+
+def enrich_fields(fields: dict, analysis: TextAnalysis) -> dict:
+    """Fill None-valued incident fields in place from an analysis."""
+    found = {
+        "category": analysis.classification.category,
+        "urgency": analysis.classification.urgency,
+        "injured_count": analysis.extraction.injured_count,
+        "trapped": analysis.extraction.trapped,
+        "water_level_m": analysis.extraction.water_level_m,
+    }
+    for name in ENRICHED_FIELDS:
+        if fields.get(name) is None:
+            fields[name] = found[name]
+    return fields
+
+
 def classify_text(text: str) -> ClassificationResult:
     """Very simple rule-based classifier stub.
 
     In production, replace with a real ML model (e.g. transformer hosted service or local model).
     """
-    text_lower = text.lower()
-
-    if any(k in text_lower for k in ["heart attack", "unconscious", "severe bleeding", "not breathing"]):
-        category = "medical"
-        urgency = "critical"
-    elif any(k in text_lower for k in ["fire", "building collapse", "trapped"]):
-        category = "rescue"
-        urgency = "critical"
-    elif any(k in text_lower for k in ["flood", "water rising", "water level"]):
-        category = "flood"
-        urgency = "urgent"
-    elif any(k in text_lower for k in ["no food", "no water", "supplies"]):
-        category = "supplies"
-        urgency = "urgent"
-    else:
-        category = "other"
-        urgency = "low"
-
-    return ClassificationResult(category=category, urgency=urgency)
+    return _matcher.analyze(text).classification
+
+
+def classify_batch(texts: Sequence[str]) -> list[ClassificationResult]:
+    return [a.classification for a in analyze_batch(texts)]
 
 
 def extract_structured(text: str) -> ExtractionResult:
@@ -47,26 +140,4 @@ def extract_structured(text: str) -> ExtractionResult:
     Looks for simple patterns like "X injured", "Y trapped", "water Zm".
     Replace with a real IE model in production.
     """
-    import re
-
-    text_lower = text.lower()
-
-    injured = None
-    m_inj = re.search(r"(\d+)\s+injured", text_lower)
-    if m_inj:
-        injured = int(m_inj.group(1))
-
-    trapped = None
-    if "trapped" in text_lower:
-        trapped = True
-
-    water_level = None
-    m_water = re.search(r"water\s+(\d+(?:\.\d+)?)m", text_lower)
-    if m_water:
-        water_level = float(m_water.group(1))
-
-    return ExtractionResult(
-        injured_count=injured,
-        trapped=trapped,
-        water_level_m=water_level,
-    )
+    return _matcher.analyze(text).extraction
@@ -11,6 +11,7 @@ from sqlalchemy import (
     Float,
     Boolean,
     Text,
+    Index,
 )
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from geoalchemy2 import Geography
@@ -52,7 +53,7 @@ class User(Base):
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
-    responder_profile: Mapped["Responder" | None] = relationship("Responder", back_populates="user", uselist=False)
+    responder_profile: Mapped["Responder | None"] = relationship("Responder", back_populates="user", uselist=False)
 
 
 class Incident(Base):
@@ -75,6 +76,10 @@ class Incident(Base):
         nullable=False,
     )
     address: Mapped[str | None] = mapped_column(String(255))
+    # Set when the report is a near-duplicate of another (see app.dedup); kept out of dispatch.
+    duplicate_of_id: Mapped[int | None] = mapped_column(ForeignKey("incidents.id"), nullable=True, index=True)
+    # Idempotency key of the SMS this incident came from (app.sms_queue), so a replayed batch inserts nothing.
+    sms_key: Mapped[str | None] = mapped_column(String(255), nullable=True, unique=True)
 
     status: Mapped[IncidentStatus] = mapped_column(
         Enum(IncidentStatus), default=IncidentStatus.requested, index=True
@@ -87,6 +92,11 @@ class Incident(Base):
     events: Mapped[list["IncidentEvent"]] = relationship("IncidentEvent", back_populates="incident")
     media_items: Mapped[list["IncidentMedia"]] = relationship("IncidentMedia", back_populates="incident")
 
+    __table_args__ = (
+        # Keyset pagination in list_incidents walks (created_at, id).
+        Index("ix_incidents_created_at_id", "created_at", "id"),
+    )
+
 
 class IncidentMedia(Base):
     __tablename__ = "incident_media"
@@ -95,7 +105,7 @@ class IncidentMedia(Base):
     incident_id: Mapped[int] = mapped_column(ForeignKey("incidents.id"), index=True)
     type: Mapped[str] = mapped_column(String(32))  # image, audio
     url: Mapped[str] = mapped_column(String(512))
-    metadata: Mapped[str | None] = mapped_column(Text, nullable=True)
+    metadata_: Mapped[str | None] = mapped_column("metadata", Text, nullable=True)
 
     incident: Mapped[Incident] = relationship("Incident", back_populates="media_items")
 
@@ -132,6 +142,8 @@ class Assignment(Base):
     )
     score: Mapped[float] = mapped_column(Float, default=0.0)
     eta_minutes: Mapped[float | None] = mapped_column(Float, nullable=True)
+    # Lease on the reserved responder while pending; expired offers are cancelled.
+    expires_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, index=True)
 
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,109 @@
+"""Fan-out of incident writes to the in-memory read models.
+
+Write paths call these after their commit, so every derived structure
+(analytics counters, hotspot grids, the duplicate index, the event stream) sees the same
+committed changes.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional, Sequence
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .broker import StreamEvent, broker
+from .dedup import duplicate_index
+from .models import Incident, IncidentEvent, IncidentStatus
+from .spatial import point_lat_lng
+from .stats import incident_counters
+from .tiles import hotspot_grid
+
+
+@dataclass(frozen=True, slots=True)
+class IncidentFact:
+    id: int
+    lat: float
+    lng: float
+    status: str
+    urgency: Optional[str]
+    created_at: datetime
+    duplicate_of_id: Optional[int] = None
+    # MinHash of the report text (app.dedup); only set on creation.
+    signature: Optional[np.ndarray] = field(default=None, compare=False, repr=False)
+
+    @classmethod
+    def from_incident(
+        cls,
+        incident: Incident,
+        lat: Optional[float] = None,
+        lng: Optional[float] = None,
+        signature: Optional[np.ndarray] = None,
+    ):
+        if lat is None or lng is None:
+            lat, lng = point_lat_lng(incident.location)
+        return cls(
+            incident.id,
+            lat,
+            lng,
+            incident.status.value,
+            incident.urgency,
+            incident.created_at,
+            incident.duplicate_of_id,
+            signature,
+        )
+
+
+def stream_event(event: IncidentEvent, fact: IncidentFact) -> StreamEvent:
+    return StreamEvent(
+        id=event.id,
+        incident_id=event.incident_id,
+        event_type=event.event_type,
+        from_status=event.from_status,
+        to_status=event.to_status,
+        note=event.note,
+        created_at=event.created_at,
+        lat=fact.lat,
+        lng=fact.lng,
+        urgency=fact.urgency,
+    )
+
+
+def incidents_created(facts: Sequence[IncidentFact], events: Sequence[StreamEvent] = ()) -> None:
+    if not facts:
+        return
+    incident_counters.record_created((f.urgency for f in facts), facts[0].created_at)
+    for f in facts:
+        hotspot_grid.add(f.lat, f.lng, f.status, f.urgency, f.created_at)
+        if f.duplicate_of_id is None:
+            duplicate_index.add(f.id, f.lat, f.lng, f.created_at, f.signature)
+    incident_events_added(events)
+
+
+def incident_status_changed(fact: IncidentFact, from_status: str, event: Optional[StreamEvent] = None) -> None:
+    """``fact`` carries the new status."""
+    incident_counters.record_status_change(from_status, fact.status)
+    hotspot_grid.change_status(fact.lat, fact.lng, fact.urgency, fact.created_at, from_status, fact.status)
+    if fact.status == IncidentStatus.resolved.value:
+        duplicate_index.remove(fact.id)
+    if event is not None:
+        incident_events_added([event])
+
+
+def incident_unlinked(fact: IncidentFact, event: Optional[StreamEvent] = None) -> None:
+    """``fact`` was a duplicate and is a primary of its own now."""
+    if fact.status != IncidentStatus.resolved.value:
+        duplicate_index.add(fact.id, fact.lat, fact.lng, fact.created_at, fact.signature)
+    if event is not None:
+        incident_events_added([event])
+
+
+def incident_events_added(events: Sequence[StreamEvent]) -> None:
+    """Events that leave the read models alone (e.g. assignment changes)."""
+    if events:
+        broker.publish(list(events))
+
+
+async def load(db: AsyncSession) -> None:
+    await incident_counters.load(db)
+    await hotspot_grid.load(db)
+    await duplicate_index.load(db)
@@ -1,61 +1,92 @@
-from datetime import datetime, timedelta
+import hashlib
+import json
+from datetime import date, datetime, time
+from typing import Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response
 from sqlalchemy import select, func
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..db import get_db
+from ..fastjson import json_response
+from ..config import get_settings
 from ..models import Incident, IncidentStatus
 from ..security import require_role
 from ..models import UserRole
+from ..spatial import lat_lng_columns
+from ..stats import incident_counters
+from ..tiles import MAX_ZOOM, TILE_BINS, bin_rows, hotspot_grid, tile_bounds
 
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
+settings = get_settings()
 
 
 @router.get("/summary")
-def summary(
-    db: Session = Depends(get_db),
+async def summary(
+    db: AsyncSession = Depends(get_db),
     _admin=Depends(require_role(UserRole.admin)),
 ):
-    total = db.scalar(select(func.count(Incident.id))) or 0
+    """Incident totals from the in-memory counters (see ``app.stats``)."""
+    if not incident_counters.loaded:
+        await incident_counters.load(db)
+    return incident_counters.summary()
 
-    by_status = db.execute(
-        select(Incident.status, func.count(Incident.id)).group_by(Incident.status)
-    ).all()
 
-    last_24h = datetime.utcnow() - timedelta(hours=24)
-    recent = db.scalar(
-        select(func.count(Incident.id)).where(Incident.created_at >= last_24h)
-    ) or 0
+@router.get("/hotspots")
+async def hotspots(
+    db: AsyncSession = Depends(get_db),
+    _admin=Depends(require_role(UserRole.admin)),
+):
+    """Incident counts per 3-decimal (lat, lng) cell, from the in-memory grid.
 
-    return {
-        "total_incidents": total,
-        "incidents_by_status": {status.value: count for status, count in by_status},
-        "incidents_last_24h": recent,
-    }
+    Prefer ``/hotspots/tiles/{z}/{x}/{y}`` for map views.
+    """
+    if not hotspot_grid.loaded:
+        await hotspot_grid.load(db)
+    return json_response(hotspot_grid.hotspots())
 
 
-@router.get("/hotspots")
-def hotspots(
-    db: Session = Depends(get_db),
+@router.get("/hotspots/tiles/{z}/{x}/{y}")
+async def hotspot_tile(
+    request: Request,
+    z: int = Path(..., ge=0, le=MAX_ZOOM),
+    x: int = Path(..., ge=0),
+    y: int = Path(..., ge=0),
+    status: Optional[list[IncidentStatus]] = Query(None),
+    urgency: Optional[list[str]] = Query(None),
+    since: Optional[date] = Query(None, description="Only incidents created on or after this UTC day"),
+    db: AsyncSession = Depends(get_db),
     _admin=Depends(require_role(UserRole.admin)),
 ):
-    """Return simple geospatial aggregation (centroids and counts).
+    """Heatmap tile: counts on a TILE_BINS x TILE_BINS grid as [[bin_x, bin_y, count], ...].
 
-    This is a stub: in production, use proper clustering or heatmap tiles.
+    Bin (0, 0) is the tile's north-west corner, as in the XYZ tile scheme.
     """
+    if x >= 1 << z or y >= 1 << z:
+        raise HTTPException(status_code=404, detail="Tile out of range")
+
+    statuses = {s.value for s in status} if status else None
+    urgencies = set(urgency) if urgency else None
+    if z <= hotspot_grid.max_zoom:
+        if not hotspot_grid.loaded:
+            await hotspot_grid.load(db)
+        bins = hotspot_grid.tile(z, x, y, statuses, urgencies, since)
+    else:
+        lat_col, lng_col = lat_lng_columns(Incident.location)
+        envelope = func.ST_MakeEnvelope(*tile_bounds(z, x, y), 4326)
+        query = select(lat_col, lng_col).where(func.ST_Intersects(Incident.location, func.Geography(envelope)))
+        if statuses:
+            query = query.where(Incident.status.in_(status))
+        if urgencies:
+            query = query.where(Incident.urgency.in_(urgencies))
+        if since is not None:
+            query = query.where(Incident.created_at >= datetime.combine(since, time.min))
+        bins = bin_rows((await db.execute(query)).all(), z, x, y)
 
-    rows = db.execute(
-        select(
-            func.round(func.ST_Y(func.ST_Centroid(Incident.location)), 3).label("lat"),
-            func.round(func.ST_X(func.ST_Centroid(Incident.location)), 3).label("lng"),
-            func.count(Incident.id).label("count"),
-        )
-        .group_by("lat", "lng")
-    ).all()
-
-    return [
-        {"lat": float(lat), "lng": float(lng), "count": int(count)}
-        for lat, lng, count in rows
-    ]
+    body = json.dumps({"z": z, "x": x, "y": y, "bins_per_side": TILE_BINS, "bins": bins}, separators=(",", ":"))
+    etag = '"' + hashlib.sha1(body.encode()).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={settings.hotspot_tile_max_age_seconds}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
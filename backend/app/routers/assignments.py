@@ -0,0 +1,132 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db import get_db
+from ..dispatch import availability_changed, end_assignments, publish_events, release_responders
+from ..metrics import INCIDENT_TIME_TO_ASSIGNMENT
+from ..models import Assignment, AssignmentStatus, Incident, IncidentEvent, IncidentStatus, Responder, UserRole
+from ..observers import IncidentFact, incident_status_changed, stream_event
+from ..schemas import AssignmentOut
+from ..security import require_role
+from ..triage import triage_scheduler
+
+
+router = APIRouter(prefix="/assignments", tags=["assignments"])
+
+# Incident statuses an accepted assignment moves on to ``assigned``.
+UNASSIGNED_STATUSES = (IncidentStatus.requested, IncidentStatus.triaged)
+
+
+async def _transition(
+    db: AsyncSession,
+    assignment_id: int,
+    user,
+    expected: AssignmentStatus,
+    to: AssignmentStatus,
+    verb: str,
+) -> Assignment:
+    """Move an assignment from ``expected`` to ``to`` under a row lock.
+
+    Rejecting or completing releases the responder; accepting keeps the
+    reservation, ends its lease and cancels the incident's other pending
+    offers, releasing their responders. The incident row is locked before
+    the assignment, so two offers accepted at once take turns instead of
+    deadlocking over each other's rows.
+    """
+    incident_id = await db.scalar(select(Assignment.incident_id).where(Assignment.id == assignment_id))
+    if incident_id is None:
+        raise HTTPException(status_code=404, detail="Assignment not found")
+    incident = await db.get(Incident, incident_id, with_for_update=True)
+    assignment = await db.get(Assignment, assignment_id, with_for_update=True)
+    if user.role != UserRole.admin:
+        owner = await db.scalar(select(Responder.user_id).where(Responder.id == assignment.responder_id))
+        if owner != user.id:
+            raise HTTPException(status_code=403, detail="Not enough permissions")
+    if assignment.status != expected:
+        raise HTTPException(status_code=400, detail=f"Assignment is {assignment.status.value}")
+    if expected == AssignmentStatus.pending and assignment.expires_at and assignment.expires_at < datetime.utcnow():
+        raise HTTPException(status_code=400, detail="Assignment offer has expired")
+
+    assignment.status = to
+    assignment.expires_at = None
+    event = IncidentEvent(
+        incident_id=incident.id,
+        actor_user_id=user.id,
+        event_type=f"assignment_{to.value}",
+        note=f"Responder {assignment.responder_id} {verb}",
+    )
+    db.add(event)
+
+    status_event = None
+    from_status = incident.status.value
+    if to == AssignmentStatus.accepted and incident.status in UNASSIGNED_STATUSES:
+        incident.status = IncidentStatus.assigned
+        status_event = IncidentEvent(
+            incident_id=incident.id,
+            actor_user_id=user.id,
+            from_status=from_status,
+            to_status=IncidentStatus.assigned.value,
+            event_type="status_change",
+            note=f"Responder {assignment.responder_id} accepted",
+        )
+        db.add(status_event)
+
+    events = [event]
+    if to == AssignmentStatus.accepted:
+        cancelled, released = await end_assignments(
+            db,
+            incident.id,
+            (AssignmentStatus.pending,),
+            AssignmentStatus.cancelled,
+            f"Responder {{}} no longer needed: responder {assignment.responder_id} accepted",
+            user.id,
+            keep_id=assignment.id,
+        )
+        events += cancelled
+    else:
+        await db.flush()
+        released = await release_responders(db, [assignment.responder_id])
+    await db.commit()
+    await db.refresh(assignment)
+
+    availability_changed(released=released)
+    publish_events(events, {incident.id: incident})
+    if to == AssignmentStatus.rejected:
+        triage_scheduler.reopen([incident.id])
+    if status_event is not None:
+        INCIDENT_TIME_TO_ASSIGNMENT.observe((datetime.utcnow() - incident.created_at).total_seconds())
+        fact = IncidentFact.from_incident(incident)
+        incident_status_changed(fact, from_status, stream_event(status_event, fact))
+    return assignment
+
+
+@router.post("/{assignment_id}/accept", response_model=AssignmentOut)
+async def accept_assignment(
+    assignment_id: int,
+    db: AsyncSession = Depends(get_db),
+    user=Depends(require_role(UserRole.responder, UserRole.admin)),
+):
+    return await _transition(db, assignment_id, user, AssignmentStatus.pending, AssignmentStatus.accepted, "accepted")
+
+
+@router.post("/{assignment_id}/reject", response_model=AssignmentOut)
+async def reject_assignment(
+    assignment_id: int,
+    db: AsyncSession = Depends(get_db),
+    user=Depends(require_role(UserRole.responder, UserRole.admin)),
+):
+    return await _transition(db, assignment_id, user, AssignmentStatus.pending, AssignmentStatus.rejected, "declined")
+
+
+@router.post("/{assignment_id}/complete", response_model=AssignmentOut)
+async def complete_assignment(
+    assignment_id: int,
+    db: AsyncSession = Depends(get_db),
+    user=Depends(require_role(UserRole.responder, UserRole.admin)),
+):
+    return await _transition(
+        db, assignment_id, user, AssignmentStatus.accepted, AssignmentStatus.completed, "completed"
+    )
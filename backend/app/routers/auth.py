@@ -3,53 +3,104 @@ from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..config import get_settings
 from ..db import get_db
 from ..models import User, UserRole
-from ..schemas import UserCreate, UserOut, TokenResponse
-from ..security import get_password_hash, verify_password, create_access_token
+from ..schemas import UserCreate, UserOut, UserAdminUpdate, TokenResponse
+from ..hashing import password_hasher, PasswordHasherBusy
+from ..security import auth_cache_stats, create_access_token, invalidate_user, require_role
 
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 settings = get_settings()
 
 
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication is busy, retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/register", response_model=UserOut)
-def register_user(payload: UserCreate, db: Session = Depends(get_db)):
-    existing = db.scalar(select(User).where(User.email == payload.email))
+async def register_user(payload: UserCreate, db: AsyncSession = Depends(get_db)):
+    existing = await db.scalar(select(User).where(User.email == payload.email))
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
+    try:
+        hashed_password = await password_hasher.hash(payload.password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
+
     user = User(
         email=payload.email,
         phone=payload.phone,
-        hashed_password=get_password_hash(payload.password),
+        hashed_password=hashed_password,
         role=payload.role,
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 
 @router.post("/token", response_model=TokenResponse)
-def login_for_access_token(
+async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    user = db.scalar(select(User).where(User.email == form_data.username))
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await db.scalar(select(User).where(User.email == form_data.username))
+    valid, new_hash = False, None
+    if user:
+        try:
+            valid, new_hash = await password_hasher.verify(form_data.password, user.hashed_password)
+        except PasswordHasherBusy:
+            raise _hasher_busy()
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    if new_hash is not None:
+        # Stored hash used an outdated scheme or cost; upgrade it in place.
+        user.hashed_password = new_hash
+        await db.commit()
+
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
-        data={"sub": user.id, "role": user.role.value},
+        data={"sub": str(user.id), "role": user.role.value},
         expires_delta=access_token_expires,
     )
     return TokenResponse(access_token=access_token)
+
+
+@router.patch("/users/{user_id}", response_model=UserOut)
+async def update_user(
+    user_id: int,
+    payload: UserAdminUpdate,
+    db: AsyncSession = Depends(get_db),
+    _admin=Depends(require_role(UserRole.admin)),
+):
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    if payload.role is not None:
+        user.role = payload.role
+    if payload.is_active is not None:
+        user.is_active = payload.is_active
+    await db.commit()
+    invalidate_user(user.id)
+    await db.refresh(user)
+    return user
+
+
+@router.get("/cache-stats")
+async def cache_stats(_admin=Depends(require_role(UserRole.admin))):
+    return auth_cache_stats()
@@ -1,10 +1,26 @@
+import asyncio
+
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..db import get_db
 from ..models import Incident, Assignment, AssignmentStatus
-from ..schemas import DispatchRequest, AssignmentOut
-from ..dispatch import score_responders_for_incident
+from ..schemas import DispatchRequest, BatchDispatchRequest, AssignmentOut
+from ..dispatch import (
+    OPEN_INCIDENT_STATUSES,
+    RESERVATION_HEADROOM,
+    assign_jointly,
+    assigned_events,
+    availability_changed,
+    busy_responder_ids,
+    has_active_assignment,
+    lease_deadline,
+    publish_events,
+    reserve_responders,
+    score_responders_for_incident,
+    score_responders_for_incidents,
+)
 from ..security import get_current_active_user, require_role
 from ..models import UserRole
 
@@ -13,30 +29,109 @@ router = APIRouter(prefix="/dispatch", tags=["dispatch"])
 
 
 @router.post("/auto", response_model=list[AssignmentOut])
-def auto_dispatch(
+async def auto_dispatch(
     payload: DispatchRequest,
-    db: Session = Depends(get_db),
-    _admin=Depends(require_role(UserRole.admin)),
+    db: AsyncSession = Depends(get_db),
+    admin=Depends(require_role(UserRole.admin)),
 ):
-    incident = db.get(Incident, payload.incident_id)
+    """Propose the best ``limit`` free responders, reserving each until it answers or the lease expires."""
+    incident = await db.get(Incident, payload.incident_id)
     if not incident:
         raise HTTPException(status_code=404, detail="Incident not found")
+    if incident.duplicate_of_id is not None:
+        raise HTTPException(status_code=400, detail=f"Incident is a duplicate of incident {incident.duplicate_of_id}")
 
-    scores = score_responders_for_incident(db, incident, max_radius_km=payload.max_radius_km)
+    scores = await score_responders_for_incident(
+        db, incident, max_radius_km=payload.max_radius_km, limit=payload.limit * RESERVATION_HEADROOM
+    )
+    reserved = await reserve_responders(db, [s.responder_id for s in scores], payload.limit)
+    by_responder = {s.responder_id: s for s in scores}
 
+    expires_at = lease_deadline()
     assignments: list[Assignment] = []
-    for score in scores[: payload.limit]:
+    for responder_id in reserved:
+        score = by_responder[responder_id]
         assignment = Assignment(
             incident_id=incident.id,
-            responder_id=score.responder_id,
+            responder_id=responder_id,
             status=AssignmentStatus.pending,
             score=score.score,
             eta_minutes=score.eta_minutes,
+            expires_at=expires_at,
         )
         db.add(assignment)
         assignments.append(assignment)
+    events = assigned_events(assignments, admin.id)
+    db.add_all(events)
+
+    await db.commit()
+    availability_changed(reserved=reserved)
+    publish_events(events, {incident.id: incident})
+    for a in assignments:
+        await db.refresh(a)
+    return assignments
+
+
+@router.post("/batch", response_model=list[AssignmentOut])
+async def batch_dispatch(
+    payload: BatchDispatchRequest,
+    db: AsyncSession = Depends(get_db),
+    admin=Depends(require_role(UserRole.admin)),
+):
+    """Jointly assign responders to many incidents in one transaction.
 
-    db.commit()
+    Only open incidents without an active assignment are considered
+    (``incident_ids`` narrows them down), and duplicates are skipped. Each
+    responder is proposed for at most one incident per batch, and responders
+    already holding an active assignment are skipped. Proposed responders
+    are reserved until they answer or the lease expires.
+    """
+    query = (
+        select(Incident)
+        .where(
+            Incident.duplicate_of_id.is_(None),
+            Incident.status.in_(OPEN_INCIDENT_STATUSES),
+            ~has_active_assignment(),
+        )
+        .order_by(Incident.created_at)
+        .limit(payload.max_incidents)
+    )
+    if payload.incident_ids is not None:
+        query = query.where(Incident.id.in_(payload.incident_ids))
+    incidents = (await db.scalars(query)).all()
+
+    ranked = await score_responders_for_incidents(
+        db,
+        incidents,
+        max_radius_km=payload.max_radius_km,
+        limit=payload.candidates_per_incident,
+        exclude_responder_ids=await busy_responder_ids(db),
+    )
+    matches = await asyncio.to_thread(assign_jointly, ranked, payload.per_incident, payload.time_budget_ms)
+    # A responder another dispatcher reserved meanwhile is dropped; its
+    # incident waits for the next batch.
+    reserved = await reserve_responders(db, [score.responder_id for _, score in matches])
+    kept = set(reserved)
+
+    expires_at = lease_deadline()
+    assignments = [
+        Assignment(
+            incident_id=incident_id,
+            responder_id=score.responder_id,
+            status=AssignmentStatus.pending,
+            score=score.score,
+            eta_minutes=score.eta_minutes,
+            expires_at=expires_at,
+        )
+        for incident_id, score in matches
+        if score.responder_id in kept
+    ]
+    db.add_all(assignments)
+    events = assigned_events(assignments, admin.id)
+    db.add_all(events)
+    await db.commit()
+    availability_changed(reserved=reserved)
+    publish_events(events, {i.id: i for i in incidents})
     for a in assignments:
-        db.refresh(a)
+        await db.refresh(a)
     return assignments
@@ -1,29 +1,65 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+import base64
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func
 
+from ..broker import parse_bbox
 from ..db import get_db
-from ..models import Incident, IncidentEvent, IncidentStatus
+from ..dispatch import availability_changed, end_assignments
+from ..dedup import DUPLICATE_EVENT, dedup_text, duplicate_index, duplicate_note, signature
+from ..fastjson import rows_response, schema_columns, streamed_rows_response
+from ..bulk import DEFAULT_CHUNK_SIZE, csv_rows, import_incidents, iter_lines, ndjson_rows
+from ..models import AssignmentStatus, Incident, IncidentEvent, IncidentStatus, UserRole
 from ..schemas import IncidentCreate, IncidentOut, IncidentUpdateStatus, IncidentEventOut
-from ..security import get_current_active_user
+from ..security import get_current_active_user, require_role
+from ..observers import (
+    IncidentFact,
+    incident_events_added,
+    incident_status_changed,
+    incident_unlinked,
+    incidents_created,
+    stream_event,
+)
 from ..config import get_settings
-from ..ml import classify_text, extract_structured
+from ..ml import ENRICHED_FIELDS, analyze_text, enrich_fields, needs_enrichment
 
 
 router = APIRouter(prefix="/incidents", tags=["incidents"])
 settings = get_settings()
 
+INCIDENT_COLUMNS = schema_columns(Incident, IncidentOut)
+INCIDENT_FIELDS = list(IncidentOut.model_fields)
+EVENT_COLUMNS = schema_columns(IncidentEvent, IncidentEventOut)
+EVENT_FIELDS = list(IncidentEventOut.model_fields)
+
 
 def _point_from_lat_lng(lat: float, lng: float):
     # PostGIS geography from lon/lat
     return func.ST_GeogFromText(f"SRID=4326;POINT({lng} {lat})")
 
 
+def _encode_cursor(created_at: datetime, incident_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{incident_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, incident_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(incident_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.post("/", response_model=IncidentOut)
-def create_incident(
+async def create_incident(
     payload: IncidentCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user=Depends(get_current_active_user),
 ):
     geom = _point_from_lat_lng(payload.location.lat, payload.location.lng)
@@ -31,44 +67,25 @@ def create_incident(
     # Use description + raw_text for ML enrichment
     text_source = payload.raw_text or payload.description
 
-    category = payload.category
-    urgency = payload.urgency
-    injured_count = payload.injured_count
-    trapped = payload.trapped
-    water_level_m = payload.water_level_m
-
-    if text_source:
-        if category is None or urgency is None:
-            cls = classify_text(text_source)
-            if category is None:
-                category = cls.category
-            if urgency is None:
-                urgency = cls.urgency
-
-        if injured_count is None or trapped is None or water_level_m is None:
-            ext = extract_structured(text_source)
-            if injured_count is None:
-                injured_count = ext.injured_count
-            if trapped is None:
-                trapped = ext.trapped
-            if water_level_m is None:
-                water_level_m = ext.water_level_m
+    fields = payload.model_dump(include=set(ENRICHED_FIELDS))
+    if text_source and needs_enrichment(fields):
+        enrich_fields(fields, analyze_text(text_source))
+
+    sig = signature(dedup_text(payload.description, payload.raw_text))
+    match = duplicate_index.find(payload.location.lat, payload.location.lng, datetime.utcnow(), sig)
 
     incident = Incident(
         reporter_id=user.id,
         description=payload.description,
         raw_text=payload.raw_text,
-        category=category,
-        urgency=urgency,
-        injured_count=injured_count,
-        trapped=trapped,
-        water_level_m=water_level_m,
+        **fields,
         location=geom,
         address=payload.address,
         status=IncidentStatus.requested,
+        duplicate_of_id=match.incident_id if match else None,
     )
     db.add(incident)
-    db.flush()
+    await db.flush()
 
     event = IncidentEvent(
         incident_id=incident.id,
@@ -78,45 +95,124 @@ def create_incident(
         event_type="created",
         note="Incident created",
     )
-    db.add(event)
-    db.commit()
-    db.refresh(incident)
+    events = [event]
+    if match:
+        events.append(
+            IncidentEvent(
+                incident_id=incident.id,
+                actor_user_id=user.id,
+                event_type=DUPLICATE_EVENT,
+                note=duplicate_note(match),
+            )
+        )
+    db.add_all(events)
+    await db.commit()
+    await db.refresh(incident)
+    fact = IncidentFact.from_incident(incident, payload.location.lat, payload.location.lng, sig)
+    incidents_created([fact], [stream_event(e, fact) for e in events])
     return incident
 
 
+@router.post("/bulk")
+async def bulk_import_incidents(
+    request: Request,
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=10_000),
+    db: AsyncSession = Depends(get_db),
+    admin=Depends(require_role(UserRole.admin)),
+):
+    """Import incidents from an NDJSON (default) or CSV (``text/csv``) body.
+
+    The body is streamed and inserted in chunks; rows that fail are listed
+    in ``errors`` and do not abort the import.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    parse = csv_rows if content_type == "text/csv" else ndjson_rows
+    result = await import_incidents(db, parse(iter_lines(request.stream())), admin.id, chunk_size)
+    return {"inserted": result.inserted, "failed": result.failed, "errors": result.errors}
+
+
 @router.get("/", response_model=list[IncidentOut])
-def list_incidents(
-    db: Session = Depends(get_db),
+async def list_incidents(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    status: Optional[IncidentStatus] = None,
+    urgency: Optional[str] = None,
+    category: Optional[str] = None,
+    bbox: Optional[str] = Query(None, description="min_lng,min_lat,max_lng,max_lat"),
+    near_lat: Optional[float] = None,
+    near_lng: Optional[float] = None,
+    radius_km: Optional[float] = Query(None, gt=0),
+    db: AsyncSession = Depends(get_db),
     user=Depends(get_current_active_user),
 ):
-    incidents = db.scalars(select(Incident).order_by(Incident.created_at.desc())).all()
-    return incidents
+    """Newest-first page of incidents.
+
+    Pages are keyed on (created_at, id); pass the ``X-Next-Cursor`` response
+    header back as ``cursor`` to fetch the next page.
+    """
+    query = select(*INCIDENT_COLUMNS)
+    if status is not None:
+        query = query.where(Incident.status == status)
+    if urgency is not None:
+        query = query.where(Incident.urgency == urgency)
+    if category is not None:
+        query = query.where(Incident.category == category)
+    if bbox is not None:
+        try:
+            min_lng, min_lat, max_lng, max_lat = parse_bbox(bbox)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        envelope = func.ST_MakeEnvelope(min_lng, min_lat, max_lng, max_lat, 4326)
+        query = query.where(func.ST_Intersects(Incident.location, func.Geography(envelope)))
+    if radius_km is not None:
+        if near_lat is None or near_lng is None:
+            raise HTTPException(status_code=400, detail="radius_km requires near_lat and near_lng")
+        query = query.where(
+            func.ST_DWithin(Incident.location, _point_from_lat_lng(near_lat, near_lng), radius_km * 1000)
+        )
+    if cursor is not None:
+        created_at, incident_id = _decode_cursor(cursor)
+        query = query.where(tuple_(Incident.created_at, Incident.id) < tuple_(created_at, incident_id))
+
+    query = query.order_by(Incident.created_at.desc(), Incident.id.desc()).limit(limit + 1)
+    rows = (await db.execute(query)).all()
+
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        headers["X-Next-Cursor"] = _encode_cursor(last.created_at, last.id)
+    return rows_response(rows, INCIDENT_FIELDS, headers)
 
 
 @router.get("/{incident_id}", response_model=IncidentOut)
-def get_incident(incident_id: int, db: Session = Depends(get_db), user=Depends(get_current_active_user)):
-    incident = db.get(Incident, incident_id)
+async def get_incident(incident_id: int, db: AsyncSession = Depends(get_db), user=Depends(get_current_active_user)):
+    incident = await db.get(Incident, incident_id)
     if not incident:
         raise HTTPException(status_code=404, detail="Incident not found")
     return incident
 
 
 @router.get("/{incident_id}/events", response_model=list[IncidentEventOut])
-def get_incident_events(incident_id: int, db: Session = Depends(get_db), user=Depends(get_current_active_user)):
-    events = db.scalars(
-        select(IncidentEvent).where(IncidentEvent.incident_id == incident_id).order_by(IncidentEvent.created_at)
-    ).all()
-    return events
+async def get_incident_events(
+    incident_id: int,
+    db: AsyncSession = Depends(get_db),
+    user=Depends(get_current_active_user),
+):
+    return streamed_rows_response(
+        select(*EVENT_COLUMNS).where(IncidentEvent.incident_id == incident_id).order_by(IncidentEvent.created_at),
+        EVENT_FIELDS,
+    )
 
 
 @router.patch("/{incident_id}/status", response_model=IncidentOut)
-def update_incident_status(
+async def update_incident_status(
     incident_id: int,
     payload: IncidentUpdateStatus,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user=Depends(get_current_active_user),
 ):
-    incident = db.get(Incident, incident_id)
+    incident = await db.get(Incident, incident_id, with_for_update=True)
     if not incident:
         raise HTTPException(status_code=404, detail="Incident not found")
 
@@ -132,6 +228,53 @@ def update_incident_status(
         note=payload.note,
     )
     db.add(event)
-    db.commit()
-    db.refresh(incident)
+
+    # A closed incident holds nobody: open offers are withdrawn, accepted ones are done.
+    ended, released = [], []
+    if payload.status == IncidentStatus.resolved:
+        for statuses, to in (
+            ((AssignmentStatus.pending,), AssignmentStatus.cancelled),
+            ((AssignmentStatus.accepted,), AssignmentStatus.completed),
+        ):
+            events, freed = await end_assignments(
+                db, incident.id, statuses, to, f"Responder {{}} released: incident {payload.status.value}", user.id
+            )
+            ended += events
+            released += freed
+    await db.commit()
+    await db.refresh(incident)
+    availability_changed(released=released)
+    fact = IncidentFact.from_incident(incident)
+    incident_status_changed(fact, from_status, stream_event(event, fact))
+    incident_events_added([stream_event(e, fact) for e in ended])
+    return incident
+
+
+@router.delete("/{incident_id}/duplicate_of", response_model=IncidentOut)
+async def unlink_duplicate(
+    incident_id: int,
+    db: AsyncSession = Depends(get_db),
+    admin=Depends(require_role(UserRole.admin)),
+):
+    """Treat a report linked as a duplicate as an incident of its own again."""
+    incident = await db.get(Incident, incident_id)
+    if not incident:
+        raise HTTPException(status_code=404, detail="Incident not found")
+    if incident.duplicate_of_id is None:
+        raise HTTPException(status_code=400, detail="Incident is not linked as a duplicate")
+
+    primary_id = incident.duplicate_of_id
+    incident.duplicate_of_id = None
+    event = IncidentEvent(
+        incident_id=incident.id,
+        actor_user_id=admin.id,
+        event_type="duplicate_unlinked",
+        note=f"Unlinked from incident #{primary_id}",
+    )
+    db.add(event)
+    await db.commit()
+    await db.refresh(incident)
+    sig = signature(dedup_text(incident.description, incident.raw_text))
+    fact = IncidentFact.from_incident(incident, signature=sig)
+    incident_unlinked(fact, stream_event(event, fact))
     return incident
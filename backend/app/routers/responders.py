@@ -1,32 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select, func
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..capabilities import capability_mask
 from ..db import get_db
+from ..fastjson import schema_columns, streamed_rows_response
 from ..models import Responder, User
-from ..schemas import ResponderCreate, ResponderOut
+from ..schemas import ResponderCreate, ResponderOut, LocationUpdate, LocationBatch
 from ..security import get_current_active_user, require_role
+from ..spatial import responder_index, ResponderEntry
+from ..live import live_positions
 from ..models import UserRole
 
 
 router = APIRouter(prefix="/responders", tags=["responders"])
 
+RESPONDER_COLUMNS = schema_columns(Responder, ResponderOut)
+RESPONDER_FIELDS = list(ResponderOut.model_fields)
+
 
 def _point_from_lat_lng(lat: float, lng: float):
     return func.ST_GeogFromText(f"SRID=4326;POINT({lng} {lat})")
 
 
 @router.post("/", response_model=ResponderOut)
-def create_responder(
+async def create_responder(
     payload: ResponderCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     _admin=Depends(require_role(UserRole.admin)),
 ):
-    user = db.get(User, payload.user_id)
+    user = await db.get(User, payload.user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    existing = db.scalar(select(Responder).where(Responder.user_id == user.id))
+    existing = await db.scalar(select(Responder).where(Responder.user_id == user.id))
     if existing:
         raise HTTPException(status_code=400, detail="Responder already exists for user")
 
@@ -40,15 +47,69 @@ def create_responder(
         location=geom,
     )
     db.add(responder)
-    db.commit()
-    db.refresh(responder)
+    await db.commit()
+    await db.refresh(responder)
+
+    if responder_index.loaded:
+        responder_index.upsert(
+            ResponderEntry(
+                id=responder.id,
+                user_id=responder.user_id,
+                lat=payload.location.lat,
+                lon=payload.location.lng,
+                trust_score=responder.trust_score,
+                is_available=responder.is_available,
+                capabilities=capability_mask(responder.skills, responder.vehicle_type),
+            )
+        )
     return responder
 
 
 @router.get("/", response_model=list[ResponderOut])
-def list_responders(
-    db: Session = Depends(get_db),
+async def list_responders(
+    db: AsyncSession = Depends(get_db),
     _user=Depends(get_current_active_user),
 ):
-    responders = db.scalars(select(Responder)).all()
-    return responders
+    return streamed_rows_response(select(*RESPONDER_COLUMNS).order_by(Responder.id), RESPONDER_FIELDS)
+
+
+@router.post("/locations", status_code=status.HTTP_202_ACCEPTED)
+async def update_locations(
+    payload: LocationBatch,
+    db: AsyncSession = Depends(get_db),
+    user=Depends(require_role(UserRole.responder, UserRole.admin)),
+):
+    """Accept many GPS pings at once; unknown or stale pings are ignored."""
+    await responder_index.ensure_loaded(db)
+
+    accepted = 0
+    for ping in payload.pings:
+        entry = responder_index.get(ping.responder_id)
+        if entry is None:
+            continue
+        if user.role != UserRole.admin and entry.user_id != user.id:
+            continue
+        if live_positions.record(ping.responder_id, ping.location.lat, ping.location.lng, ping.recorded_at):
+            accepted += 1
+    return {"accepted": accepted, "ignored": len(payload.pings) - accepted}
+
+
+@router.post("/{responder_id}/location", status_code=status.HTTP_202_ACCEPTED)
+async def update_location(
+    responder_id: int,
+    payload: LocationUpdate,
+    db: AsyncSession = Depends(get_db),
+    user=Depends(require_role(UserRole.responder, UserRole.admin)),
+):
+    await responder_index.ensure_loaded(db)
+
+    entry = responder_index.get(responder_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Responder not found")
+    if user.role != UserRole.admin and entry.user_id != user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+
+    accepted = live_positions.record(
+        responder_id, payload.location.lat, payload.location.lng, payload.recorded_at
+    )
+    return {"accepted": accepted}
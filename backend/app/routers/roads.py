@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from .. import routing
+from ..models import UserRole
+from ..routing import Closure, RoadGraph
+from ..schemas import GeoPoint, RoadClosureCreate, RoadClosureOut
+from ..security import require_role
+
+
+router = APIRouter(prefix="/roads", tags=["roads"])
+
+
+def _graph() -> RoadGraph:
+    if routing.road_graph is None:
+        raise HTTPException(status_code=404, detail="No road network is loaded")
+    return routing.road_graph
+
+
+def _closure_out(closure: Closure) -> RoadClosureOut:
+    return RoadClosureOut(
+        id=closure.id,
+        location=GeoPoint(lat=closure.lat, lng=closure.lng),
+        radius_m=closure.radius_m,
+        note=closure.note,
+        edges_closed=len(closure.edges),
+        created_at=closure.created_at,
+    )
+
+
+@router.get("/")
+async def road_network(_admin=Depends(require_role(UserRole.admin))):
+    return _graph().stats()
+
+
+@router.get("/closures", response_model=list[RoadClosureOut])
+async def list_closures(_admin=Depends(require_role(UserRole.admin))):
+    return [_closure_out(c) for c in _graph().closures()]
+
+
+@router.post("/closures", response_model=RoadClosureOut, status_code=status.HTTP_201_CREATED)
+async def close_roads(payload: RoadClosureCreate, _admin=Depends(require_role(UserRole.admin))):
+    """Close every road segment within ``radius_m`` of the point (e.g. a
+    flooded stretch or a bridge). Takes effect for the next dispatch; closures are kept
+    in memory by this process."""
+    graph = _graph()
+    closure = graph.close_area(payload.location.lat, payload.location.lng, payload.radius_m, payload.note)
+    return _closure_out(closure)
+
+
+@router.delete("/closures/{closure_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def reopen_roads(closure_id: int, _admin=Depends(require_role(UserRole.admin))):
+    if _graph().reopen(closure_id) is None:
+        raise HTTPException(status_code=404, detail="Closure not found")
@@ -0,0 +1,98 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from ..broker import KEEPALIVE, OVERFLOW, StreamFilter, event_feed, parse_bbox
+from ..db import SessionLocal
+from ..security import authenticate_token, get_current_active_user
+
+
+router = APIRouter(prefix="/stream", tags=["stream"])
+
+
+def _stream_filter(bbox: Optional[str], urgency: Optional[list[str]], incident_id: Optional[list[int]]) -> StreamFilter:
+    try:
+        box = parse_bbox(bbox) if bbox is not None else None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return StreamFilter(
+        bbox=box,
+        urgencies=frozenset(urgency) if urgency else None,
+        incident_ids=frozenset(incident_id) if incident_id else None,
+    )
+
+
+@router.get("/events")
+async def stream_events(
+    bbox: Optional[str] = Query(None, description="min_lng,min_lat,max_lng,max_lat"),
+    urgency: Optional[list[str]] = Query(None),
+    incident_id: Optional[list[int]] = Query(None),
+    cursor: Optional[int] = Query(None, ge=0, description="Resume after this event id"),
+    last_event_id: Optional[str] = Header(None),
+    user=Depends(get_current_active_user),
+):
+    """Server-Sent Events stream of incident events.
+
+    Each message's ``id`` is the event id; browsers send it back as
+    ``Last-Event-ID`` on reconnect and the stream resumes after it. An
+    ``overflow`` event means the client fell behind and should reconnect.
+    """
+    stream_filter = _stream_filter(bbox, urgency, incident_id)
+    if last_event_id is not None and last_event_id.isdigit():
+        cursor = int(last_event_id)
+
+    async def body():
+        async for item in event_feed(stream_filter, cursor):
+            if item == KEEPALIVE:
+                yield ": keepalive\n\n"
+            elif item == OVERFLOW:
+                yield "event: overflow\ndata: {}\n\n"
+            else:
+                yield f"id: {item.id}\ndata: {item.to_json()}\n\n"
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def stream_events_ws(
+    websocket: WebSocket,
+    token: str = Query(...),
+    bbox: Optional[str] = Query(None),
+    urgency: Optional[list[str]] = Query(None),
+    incident_id: Optional[list[int]] = Query(None),
+    cursor: Optional[int] = Query(None, ge=0),
+):
+    """WebSocket variant of ``/stream/events``; browsers cannot set headers, so the token is a query param.
+
+    Messages are ``{"type": "event", "event": {...}}``, ``{"type": "keepalive"}``
+    or ``{"type": "overflow"}``, after which the server closes and the client
+    reconnects with ``cursor`` set to the last event id it saw.
+    """
+    async with SessionLocal() as db:
+        user = await authenticate_token(token, db)
+    try:
+        stream_filter = _stream_filter(bbox, urgency, incident_id)
+    except HTTPException:
+        stream_filter = None
+    if user is None or stream_filter is None:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    try:
+        async for item in event_feed(stream_filter, cursor):
+            if item == KEEPALIVE:
+                await websocket.send_text('{"type":"keepalive"}')
+            elif item == OVERFLOW:
+                await websocket.send_text('{"type":"overflow"}')
+                await websocket.close(code=1013)
+                return
+            else:
+                await websocket.send_text(f'{{"type":"event","event":{item.to_json()}}}')
+    except WebSocketDisconnect:
+        pass
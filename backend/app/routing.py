@@ -0,0 +1,612 @@
+"""Road-network travel times for dispatch.
+
+The road graph is read from an OpenStreetMap extract (``.osm`` XML, or
+``.osm.pbf`` when pyosmium is installed) and compiled once into CSR arrays,
+saved next to the extract as ``<extract>.graph.npz``; later starts load the
+arrays directly. Edge weights are seconds at a per-highway-class speed (or
+``maxspeed``).
+
+Queries are one-to-many: the travel time from many responders to one
+incident is a single Dijkstra over the reversed graph from the incident's
+node, bounded by a time limit and stopped as soon as every responder node
+is settled. ALT landmarks (distances to and from a few far-apart nodes)
+give lower bounds that drop responders which cannot arrive within the
+limit before the search starts.
+
+Closures (flooded segments, collapsed bridges) mark edges closed in place.
+Closing edges only lengthens paths, so the landmark bounds, computed on the
+fully open network, stay valid: a closure costs O(edges touched) and needs
+no re-preprocessing, unlike contraction hierarchies. Each change bumps
+``version``, which keys the cached search trees and dispatch rankings.
+
+Compile an extract ahead of deploys (from backend/):
+
+    python -m app.routing extract.osm --landmarks 8
+"""
+import argparse
+import heapq
+import math
+import os
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Optional
+
+import numpy as np
+from loguru import logger
+
+from .cache import TTLCache
+from .config import get_settings
+from .spatial import EARTH_RADIUS_KM, KM_PER_DEGREE_LAT
+
+
+settings = get_settings()
+
+HIGHWAY_SPEEDS_KMH = {
+    "motorway": 90.0,
+    "motorway_link": 50.0,
+    "trunk": 70.0,
+    "trunk_link": 40.0,
+    "primary": 55.0,
+    "primary_link": 40.0,
+    "secondary": 45.0,
+    "secondary_link": 35.0,
+    "tertiary": 40.0,
+    "tertiary_link": 30.0,
+    "unclassified": 30.0,
+    "residential": 25.0,
+    "road": 25.0,
+    "living_street": 10.0,
+    "service": 15.0,
+    "track": 15.0,
+}
+
+GRAPH_FORMAT = 1
+SNAP_CELL_DEG = 0.005
+
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    a = (
+        np.sin((phi2 - phi1) / 2) ** 2
+        + np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(np.asarray(lon2) - np.asarray(lon1)) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _way_attributes(tags: dict) -> Optional[tuple[float, int]]:
+    """(speed km/h, oneway: 1 forward, -1 backward, 0 both) or None if not drivable."""
+    highway = tags.get("highway")
+    if highway not in HIGHWAY_SPEEDS_KMH or tags.get("access") in ("no", "private"):
+        return None
+    speed = HIGHWAY_SPEEDS_KMH[highway]
+    maxspeed = tags.get("maxspeed", "")
+    number = maxspeed.split()[0] if maxspeed else ""
+    if number.replace(".", "", 1).isdigit():
+        speed = float(number) * (1.609 if "mph" in maxspeed else 1.0)
+    oneway = tags.get("oneway", "")
+    if oneway in ("yes", "1", "true"):
+        direction = 1
+    elif oneway in ("-1", "reverse"):
+        direction = -1
+    elif tags.get("junction") == "roundabout" or highway == "motorway":
+        direction = 1
+    else:
+        direction = 0
+    return speed, direction
+
+
+def _read_osm_xml(path: str):
+    coords: dict[int, tuple[float, float]] = {}
+    ways: list[tuple[list[int], float, int]] = []
+    refs: list[int] = []
+    tags: dict[str, str] = {}
+    root = None
+    for event, elem in ElementTree.iterparse(path, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            continue
+        if elem.tag == "nd":
+            refs.append(int(elem.get("ref")))
+        elif elem.tag == "tag":
+            tags[elem.get("k")] = elem.get("v")
+        elif elem.tag in ("node", "way", "relation"):
+            if elem.tag == "node":
+                coords[int(elem.get("id"))] = (float(elem.get("lat")), float(elem.get("lon")))
+            elif elem.tag == "way":
+                attributes = _way_attributes(tags)
+                if attributes is not None and len(refs) > 1:
+                    ways.append((refs, *attributes))
+            # Tags and refs belong to the element that just ended, whatever its kind.
+            refs, tags = [], {}
+            # Drop finished elements, so memory stays flat on large extracts.
+            root.clear()
+    return coords, ways
+
+
+def _read_osm_pbf(path: str):
+    try:
+        import osmium
+    except ImportError as exc:
+        raise RuntimeError("reading .pbf extracts needs the 'osmium' package; convert to .osm XML otherwise") from exc
+
+    coords: dict[int, tuple[float, float]] = {}
+    ways: list[tuple[list[int], float, int]] = []
+
+    class Handler(osmium.SimpleHandler):
+        def way(self, way):
+            attributes = _way_attributes({t.k: t.v for t in way.tags})
+            if attributes is None or len(way.nodes) < 2:
+                return
+            for n in way.nodes:
+                if n.location.valid():
+                    coords[n.ref] = (n.location.lat, n.location.lon)
+            ways.append(([n.ref for n in way.nodes], *attributes))
+
+    Handler().apply_file(path, locations=True)
+    return coords, ways
+
+
+def read_osm(path: str) -> "RoadGraph":
+    coords, ways = _read_osm_pbf(path) if path.endswith(".pbf") else _read_osm_xml(path)
+
+    index: dict[int, int] = {}
+    src: list[int] = []
+    dst: list[int] = []
+    speeds: list[float] = []
+    for refs, speed, direction in ways:
+        for a, b in zip(refs, refs[1:]):
+            if a not in coords or b not in coords or a == b:
+                continue
+            ia = index.setdefault(a, len(index))
+            ib = index.setdefault(b, len(index))
+            if direction >= 0:
+                src.append(ia), dst.append(ib), speeds.append(speed)
+            if direction <= 0:
+                src.append(ib), dst.append(ia), speeds.append(speed)
+
+    lat = np.empty(len(index))
+    lon = np.empty(len(index))
+    for osm_id, i in index.items():
+        lat[i], lon[i] = coords[osm_id]
+    src_arr = np.asarray(src, dtype=np.int64)
+    dst_arr = np.asarray(dst, dtype=np.int64)
+    km = _haversine_km(lat[src_arr], lon[src_arr], lat[dst_arr], lon[dst_arr])
+    seconds = km / np.asarray(speeds) * 3600
+    return RoadGraph(lat, lon, src_arr, dst_arr, seconds)
+
+
+def _csr(n: int, tails: np.ndarray, heads: np.ndarray):
+    """(offsets, heads, edge ids) of the edges grouped by tail node."""
+    order = np.argsort(tails, kind="stable")
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tails, minlength=n), out=offsets[1:])
+    return offsets, heads[order], order
+
+
+@dataclass
+class Closure:
+    id: int
+    lat: float
+    lng: float
+    radius_m: float
+    note: Optional[str]
+    edges: np.ndarray
+    created_at: datetime
+
+
+class RoadGraph:
+    """Directed road graph in CSR form, with landmarks and closures."""
+
+    def __init__(
+        self,
+        lat: np.ndarray,
+        lon: np.ndarray,
+        edge_from: np.ndarray,
+        edge_to: np.ndarray,
+        edge_seconds: np.ndarray,
+        landmarks: Optional[np.ndarray] = None,
+        from_landmark: Optional[np.ndarray] = None,
+        to_landmark: Optional[np.ndarray] = None,
+    ):
+        self.max_detour_factor = settings.road_max_detour_factor
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.edge_from = np.asarray(edge_from, dtype=np.int64)
+        self.edge_to = np.asarray(edge_to, dtype=np.int64)
+        self.edge_seconds = np.asarray(edge_seconds, dtype=np.float64)
+        n = len(self.lat)
+
+        # Python lists: scalar indexing in the search loop is several times
+        # faster on lists than on NumPy arrays.
+        fwd_offsets, fwd_heads, fwd_edges = _csr(n, self.edge_from, self.edge_to)
+        rev_offsets, rev_heads, rev_edges = _csr(n, self.edge_to, self.edge_from)
+        self._forward = (
+            fwd_offsets.tolist(),
+            fwd_heads.tolist(),
+            fwd_edges.tolist(),
+            self.edge_seconds[fwd_edges].tolist(),
+        )
+        self._reverse = (
+            rev_offsets.tolist(),
+            rev_heads.tolist(),
+            rev_edges.tolist(),
+            self.edge_seconds[rev_edges].tolist(),
+        )
+
+        self._closed_count = np.zeros(len(self.edge_from), dtype=np.int32)
+        self._closed = bytearray(len(self.edge_from))
+        self._closures: dict[int, Closure] = {}
+        self._next_closure = 1
+        self._lock = threading.Lock()
+        self.version = 0
+
+        self.landmarks = landmarks if landmarks is not None else np.zeros(0, dtype=np.int64)
+        self.from_landmark = from_landmark if from_landmark is not None else np.zeros((0, n), dtype=np.float32)
+        self.to_landmark = to_landmark if to_landmark is not None else np.zeros((0, n), dtype=np.float32)
+
+        cells = self._cell_keys(self.lat, self.lon)
+        self._snap_order = np.argsort(cells, kind="stable")
+        self._snap_keys = cells[self._snap_order]
+
+        self._trees: TTLCache[tuple[int, int], tuple[dict[int, float], float]] = TTLCache(
+            settings.road_tree_cache_entries, 600.0
+        )
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.edge_from)
+
+    # --- persistence -------------------------------------------------------
+
+    def save(self, path: str) -> None:
+        np.savez(
+            path,
+            format=np.array([GRAPH_FORMAT]),
+            lat=self.lat,
+            lon=self.lon,
+            edge_from=self.edge_from.astype(np.int32),
+            edge_to=self.edge_to.astype(np.int32),
+            edge_seconds=self.edge_seconds.astype(np.float32),
+            landmarks=self.landmarks,
+            from_landmark=self.from_landmark,
+            to_landmark=self.to_landmark,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "RoadGraph":
+        with np.load(path) as data:
+            if int(data["format"][0]) != GRAPH_FORMAT:
+                raise ValueError(f"{path} was compiled by an incompatible version")
+            return cls(
+                data["lat"],
+                data["lon"],
+                data["edge_from"],
+                data["edge_to"],
+                data["edge_seconds"],
+                data["landmarks"],
+                data["from_landmark"],
+                data["to_landmark"],
+            )
+
+    # --- search ------------------------------------------------------------
+
+    def _dijkstra(
+        self,
+        graph,
+        source: int,
+        goals: Optional[set[int]] = None,
+        limit: float = math.inf,
+        closures: bool = True,
+    ) -> tuple[dict[int, float], float]:
+        """Settled nodes -> seconds, and the radius up to which the search is
+        complete. Stops early once every goal is settled."""
+        offsets, heads, edges, seconds = graph
+        closed = self._closed if closures else bytes(len(self._closed))
+        remaining = set(goals) if goals is not None else None
+        settled: dict[int, float] = {}
+        best = {source: 0.0}
+        heap = [(0.0, source)]
+        radius = limit
+        push, pop, inf = heapq.heappush, heapq.heappop, math.inf
+        while heap:
+            d, u = pop(heap)
+            if u in settled:
+                continue
+            settled[u] = d
+            if remaining is not None and u in remaining:
+                remaining.discard(u)
+                if not remaining:
+                    radius = d
+                    break
+            for i in range(offsets[u], offsets[u + 1]):
+                nd = d + seconds[i]
+                if nd <= limit:
+                    v = heads[i]
+                    if nd < best.get(v, inf) and not closed[edges[i]]:
+                        best[v] = nd
+                        push(heap, (nd, v))
+        return settled, radius
+
+    def _full_distances(self, graph, source: int) -> np.ndarray:
+        settled, _ = self._dijkstra(graph, source, closures=False)
+        out = np.full(len(self), np.inf, dtype=np.float32)
+        out[list(settled)] = list(settled.values())
+        return out
+
+    def build_landmarks(self, count: int) -> None:
+        """Pick ``count`` far-apart landmarks (farthest-point heuristic) on the
+        open network and store distances from and to each of them."""
+        count = min(count, len(self))
+        if count == 0:
+            return
+        reach = self._full_distances(self._forward, 0)
+        chosen: list[int] = []
+        from_rows, to_rows = [], []
+        nearest = np.full(len(self), np.inf)
+        first = int(np.argmax(np.where(np.isfinite(reach), reach, -1)))
+        candidate = first
+        for _ in range(count):
+            chosen.append(candidate)
+            from_rows.append(self._full_distances(self._forward, candidate))
+            to_rows.append(self._full_distances(self._reverse, candidate))
+            nearest = np.minimum(nearest, from_rows[-1])
+            candidate = int(np.argmax(np.where(np.isfinite(nearest), nearest, -1)))
+            if candidate in chosen:
+                break
+        self.landmarks = np.asarray(chosen, dtype=np.int64)
+        self.from_landmark = np.vstack(from_rows)
+        self.to_landmark = np.vstack(to_rows)
+
+    def lower_bounds(self, sources: np.ndarray, target: int) -> np.ndarray:
+        """ALT lower bounds (seconds) on the travel time from each source to
+        ``target``; inf where the landmarks prove ``target`` unreachable."""
+        if len(self.landmarks) == 0 or len(sources) == 0:
+            return np.zeros(len(sources))
+        with np.errstate(invalid="ignore"):
+            a = self.from_landmark[:, target][:, None] - self.from_landmark[:, sources]
+            b = self.to_landmark[:, sources] - self.to_landmark[:, target][:, None]
+            bounds = np.nan_to_num(np.maximum(a, b), nan=0.0, posinf=np.inf, neginf=0.0)
+        return bounds.max(axis=0)
+
+    # --- snapping ----------------------------------------------------------
+
+    @staticmethod
+    def _cell_keys(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        rows = np.floor(np.asarray(lat) / SNAP_CELL_DEG).astype(np.int64)
+        cols = np.floor((np.asarray(lon) + 180.0) / SNAP_CELL_DEG).astype(np.int64)
+        return rows * 1_000_000 + cols
+
+    def snap(self, lat: float, lon: float, max_km: float) -> tuple[int, float]:
+        """Nearest node within ``max_km`` and its distance; (-1, inf) if none."""
+        row = math.floor(lat / SNAP_CELL_DEG)
+        col = math.floor((lon + 180.0) / SNAP_CELL_DEG)
+        cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+        max_rings = max(1, math.ceil(max_km / (SNAP_CELL_DEG * KM_PER_DEGREE_LAT * cos_lat)))
+        best_node, best_km = -1, math.inf
+        for ring in range(max_rings + 1):
+            found = []
+            for r in range(row - ring, row + ring + 1):
+                for c in range(col - ring, col + ring + 1):
+                    if max(abs(r - row), abs(c - col)) != ring:
+                        continue
+                    key = r * 1_000_000 + c
+                    lo = np.searchsorted(self._snap_keys, key, "left")
+                    hi = np.searchsorted(self._snap_keys, key, "right")
+                    if hi > lo:
+                        found.append(self._snap_order[lo:hi])
+            if found:
+                nodes = np.concatenate(found)
+                km = _haversine_km(lat, lon, self.lat[nodes], self.lon[nodes])
+                i = int(np.argmin(km))
+                if km[i] < best_km:
+                    best_node, best_km = int(nodes[i]), float(km[i])
+            # A node in a later ring is at least ring cells away.
+            if best_node >= 0 and best_km <= ring * SNAP_CELL_DEG * KM_PER_DEGREE_LAT * cos_lat:
+                break
+        if best_km > max_km:
+            return -1, math.inf
+        return best_node, best_km
+
+    def snap_many(self, lat: np.ndarray, lon: np.ndarray, max_km: float) -> tuple[np.ndarray, np.ndarray]:
+        """Vectorized ``snap``: the 3x3 cells around every point in one pass,
+        the scalar search only for points whose answer is not settled there."""
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        n = len(lat)
+        rows = np.floor(lat / SNAP_CELL_DEG).astype(np.int64)
+        cols = np.floor((lon + 180.0) / SNAP_CELL_DEG).astype(np.int64)
+        offsets = [(dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1)]
+        keys = np.stack([(rows + dr) * 1_000_000 + cols + dc for dr, dc in offsets], axis=1).ravel()
+        lo = np.searchsorted(self._snap_keys, keys, "left")
+        counts = np.searchsorted(self._snap_keys, keys, "right") - lo
+
+        owner = np.repeat(np.repeat(np.arange(n), len(offsets)), counts)
+        starts = np.repeat(lo - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+        nodes = self._snap_order[starts + np.arange(len(owner))]
+        km = _haversine_km(lat[owner], lon[owner], self.lat[nodes], self.lon[nodes])
+
+        best_km = np.full(n, np.inf)
+        np.minimum.at(best_km, owner, km)
+        best_node = np.full(n, -1, dtype=np.int64)
+        hit = km == best_km[owner]
+        best_node[owner[hit]] = nodes[hit]
+
+        # Exact only when nothing beyond the 3x3 block can be closer.
+        cell_km = SNAP_CELL_DEG * KM_PER_DEGREE_LAT * np.maximum(np.cos(np.radians(lat)), 1e-6)
+        for i in np.flatnonzero(best_km > cell_km):
+            best_node[i], best_km[i] = self.snap(float(lat[i]), float(lon[i]), max_km)
+        far = best_km > max_km
+        best_node[far], best_km[far] = -1, np.inf
+        return best_node, best_km
+
+    # --- queries -----------------------------------------------------------
+
+    def travel_minutes_to(
+        self,
+        lat: float,
+        lon: float,
+        from_lat: np.ndarray,
+        from_lon: np.ndarray,
+        max_minutes: float,
+    ) -> np.ndarray:
+        """Minutes from each (from_lat, from_lon) to (lat, lon) by road.
+
+        inf where unreachable within ``max_minutes`` (closures included); nan
+        where a point is too far from any road to route, so callers can fall
+        back to their straight-line estimate.
+        """
+        out = np.full(len(from_lat), np.nan)
+        target, target_km = self.snap(lat, lon, settings.road_max_snap_km)
+        if target < 0 or len(from_lat) == 0:
+            return out
+
+        access = settings.road_access_speed_kmh
+        limit = max_minutes * 60
+        sources, source_km = self.snap_many(from_lat, from_lon, settings.road_max_snap_km)
+        leg_seconds = (source_km + target_km) / access * 3600
+        routable = sources >= 0
+
+        bounds = np.full(len(from_lat), np.inf)
+        bounds[routable] = self.lower_bounds(sources[routable], target) + leg_seconds[routable]
+        wanted = routable & (bounds <= limit)
+        out[routable] = np.inf
+        if not wanted.any():
+            return out
+
+        goals = set(sources[wanted].tolist())
+        version = self.version
+        cached = self._trees.get((target, version))
+        if cached is not None and (cached[1] >= limit or goals.issubset(cached[0])):
+            settled = cached[0]
+        else:
+            settled, radius = self._dijkstra(self._reverse, target, goals, limit)
+            self._trees.set((target, version), (settled, radius))
+
+        for i in np.flatnonzero(wanted):
+            seconds = settled.get(int(sources[i]))
+            if seconds is not None and seconds + leg_seconds[i] <= limit:
+                out[i] = (seconds + leg_seconds[i]) / 60
+        return out
+
+    # --- closures ----------------------------------------------------------
+
+    def _edges_near(self, lat: float, lon: float, radius_m: float) -> np.ndarray:
+        """Edges whose segment passes within ``radius_m`` of the point
+        (equirectangular projection around it; fine at closure scale)."""
+        kx = KM_PER_DEGREE_LAT * 1000 * math.cos(math.radians(lat))
+        ky = KM_PER_DEGREE_LAT * 1000
+        ax = (self.lon[self.edge_from] - lon) * kx
+        ay = (self.lat[self.edge_from] - lat) * ky
+        bx = (self.lon[self.edge_to] - lon) * kx
+        by = (self.lat[self.edge_to] - lat) * ky
+        near = ~(
+            (np.minimum(ax, bx) > radius_m)
+            | (np.maximum(ax, bx) < -radius_m)
+            | (np.minimum(ay, by) > radius_m)
+            | (np.maximum(ay, by) < -radius_m)
+        )
+        edges = np.flatnonzero(near)
+        ax, ay, bx, by = ax[edges], ay[edges], bx[edges], by[edges]
+        dx, dy = bx - ax, by - ay
+        length2 = dx * dx + dy * dy
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t = np.clip(np.where(length2 > 0, -(ax * dx + ay * dy) / length2, 0.0), 0.0, 1.0)
+        px, py = ax + t * dx, ay + t * dy
+        return edges[px * px + py * py <= radius_m * radius_m]
+
+    def close_area(self, lat: float, lon: float, radius_m: float, note: Optional[str] = None) -> Closure:
+        """Close every road segment within ``radius_m`` of the point."""
+        edges = self._edges_near(lat, lon, radius_m)
+        with self._lock:
+            closure = Closure(self._next_closure, lat, lon, radius_m, note, edges, datetime.utcnow())
+            self._next_closure += 1
+            self._closures[closure.id] = closure
+            self._closed_count[edges] += 1
+            for e in edges.tolist():
+                self._closed[e] = 1
+            self.version += 1
+        return closure
+
+    def reopen(self, closure_id: int) -> Optional[Closure]:
+        with self._lock:
+            closure = self._closures.pop(closure_id, None)
+            if closure is None:
+                return None
+            self._closed_count[closure.edges] -= 1
+            for e in closure.edges.tolist():
+                if self._closed_count[e] == 0:
+                    self._closed[e] = 0
+            self.version += 1
+        return closure
+
+    def closures(self) -> list[Closure]:
+        with self._lock:
+            return list(self._closures.values())
+
+    def clear_cache(self) -> None:
+        """Forget cached shortest-path trees, e.g. to time searches from scratch."""
+        self._trees.clear()
+
+    def stats(self) -> dict:
+        return {
+            "nodes": len(self),
+            "edges": self.edge_count,
+            "landmarks": len(self.landmarks),
+            "closures": len(self._closures),
+            "closed_edges": int(np.count_nonzero(self._closed_count)),
+            "version": self.version,
+        }
+
+
+road_graph: Optional[RoadGraph] = None
+
+
+def graph_version() -> int:
+    return road_graph.version if road_graph is not None else 0
+
+
+def compile_graph(path: str, landmarks: int) -> RoadGraph:
+    """Load the compiled arrays next to ``path``, compiling them if missing or stale."""
+    compiled = path + ".graph.npz"
+    if os.path.exists(compiled) and os.path.getmtime(compiled) >= os.path.getmtime(path):
+        return RoadGraph.load(compiled)
+    started = time.perf_counter()
+    graph = read_osm(path)
+    graph.build_landmarks(landmarks)
+    graph.save(compiled)
+    logger.info(
+        "Compiled road graph {} ({} nodes, {} edges) in {:.1f}s",
+        path,
+        len(graph),
+        graph.edge_count,
+        time.perf_counter() - started,
+    )
+    return graph
+
+
+def load_road_graph() -> Optional[RoadGraph]:
+    """Load the configured graph once; None when ``road_graph_path`` is unset."""
+    global road_graph
+    if road_graph is None and settings.road_graph_path:
+        road_graph = compile_graph(settings.road_graph_path, settings.road_landmarks)
+    return road_graph
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compile an OSM extract into a road graph for dispatch.")
+    parser.add_argument("path")
+    parser.add_argument("--landmarks", type=int, default=settings.road_landmarks)
+    args = parser.parse_args(argv)
+    graph = compile_graph(args.path, args.landmarks)
+    print(graph.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -24,6 +24,11 @@ class UserOut(BaseModel):
         from_attributes = True
 
 
+class UserAdminUpdate(BaseModel):
+    role: Optional[UserRole] = None
+    is_active: Optional[bool] = None
+
+
 class TokenResponse(BaseModel):
     access_token: str
     token_type: str = "bearer"
@@ -67,6 +72,7 @@ class IncidentOut(BaseModel):
     water_level_m: Optional[float]
     address: Optional[str]
     status: IncidentStatus
+    duplicate_of_id: Optional[int] = None
     created_at: datetime
     updated_at: datetime
 
@@ -96,6 +102,19 @@ class ResponderCreate(BaseModel):
     location: GeoPoint
 
 
+class LocationUpdate(BaseModel):
+    location: GeoPoint
+    recorded_at: Optional[datetime] = None
+
+
+class ResponderLocationPing(LocationUpdate):
+    responder_id: int
+
+
+class LocationBatch(BaseModel):
+    pings: list[ResponderLocationPing]
+
+
 class ResponderOut(BaseModel):
     id: int
     user_id: int
@@ -121,6 +140,7 @@ class AssignmentOut(BaseModel):
     status: AssignmentStatus
     score: float
     eta_minutes: Optional[float]
+    expires_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
 
@@ -141,7 +161,37 @@ class DispatchRequest(BaseModel):
     limit: int = 5
 
 
+class BatchDispatchRequest(BaseModel):
+    # Only open incidents without an active assignment are used; these ids narrow them down.
+    incident_ids: Optional[list[int]] = None
+    max_radius_km: float = 50.0
+    per_incident: int = Field(default=1, ge=1)
+    candidates_per_incident: int = Field(default=20, ge=1)
+    max_incidents: int = Field(default=500, ge=1)
+    time_budget_ms: int = Field(default=500, ge=1)
+
+
 class SMSInbound(BaseModel):
     from_number: str
     body: str
     received_at: datetime
+    message_id: Optional[str] = None
+
+
+class SMSInboundBatch(BaseModel):
+    messages: list[SMSInbound] = Field(..., max_length=5000)
+
+
+class RoadClosureCreate(BaseModel):
+    location: GeoPoint
+    radius_m: float = Field(default=100.0, gt=0, le=5000)
+    note: Optional[str] = None
+
+
+class RoadClosureOut(BaseModel):
+    id: int
+    location: GeoPoint
+    radius_m: float
+    note: Optional[str]
+    edges_closed: int
+    created_at: datetime
@@ -0,0 +1,228 @@
+"""Vectorized dispatch scoring over responder column arrays.
+
+Distances and scores for every (incident, responder) pair are computed in
+one NumPy pass; only the top ``limit`` candidates per incident are ranked
+and turned into ``DispatchScore`` objects.
+
+ETAs are straight-line distance at ``AVERAGE_SPEED_KM_PER_HOUR``, or road
+travel times when a ``RoadGraph`` is passed. The distance term of the score
+is the ETA relative to the longest one accepted: driving ``max_radius_km``
+at the average speed, times the graph's ``max_detour_factor`` by road. In
+the straight-line case that is exactly ``distance / max_radius_km``; either
+way the term stays within [0, 1], so scores never go negative.
+
+Capabilities (``app.capabilities``) filter and weight the fleet: responders
+missing a required capability score -inf, and the fraction of preferred
+capabilities a responder has adds up to ``CAPABILITY_WEIGHT``. When no
+qualified responder is available within the radius, the incident falls back
+to the unqualified ones at ``UNQUALIFIED_FACTOR`` of their score, so a fleet
+whose skills map to few capabilities still gets offered rather than nobody.
+"""
+from typing import TYPE_CHECKING, Optional, Sequence
+
+import numpy as np
+
+from .capabilities import NO_NEEDS, Needs, match_matrix
+from .metrics import CAPABILITY_FALLBACKS
+from .schemas import DispatchScore
+from .spatial import EARTH_RADIUS_KM, FleetColumns
+
+if TYPE_CHECKING:
+    from .routing import RoadGraph
+
+
+AVERAGE_SPEED_KM_PER_HOUR = 30.0
+
+URGENCY_WEIGHTS = {"critical": 1.5, "urgent": 1.2}
+
+CAPABILITY_WEIGHT = 1.0
+# Score multiplier for responders lacking a required capability, used only
+# when no qualified responder is in range. Scores stay positive, so joint
+# matching still takes them.
+UNQUALIFIED_FACTOR = 0.5
+
+# Upper bound on incidents x responders cells computed at once.
+MAX_MATRIX_CELLS = 4_000_000
+
+
+def urgency_weight(urgency: Optional[str]) -> float:
+    return URGENCY_WEIGHTS.get(urgency or "", 1.0)
+
+
+def haversine_matrix(
+    lat1: np.ndarray,
+    lon1: np.ndarray,
+    lat2: np.ndarray,
+    lon2: np.ndarray,
+) -> np.ndarray:
+    """Pairwise great-circle distances (km), shape (len(lat1), len(lat2))."""
+    phi1 = np.radians(lat1)[:, None]
+    phi2 = np.radians(lat2)[None, :]
+    dphi = phi2 - phi1
+    dlambda = np.radians(lon2)[None, :] - np.radians(lon1)[:, None]
+
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def road_eta_matrix(
+    router: "RoadGraph",
+    lat: np.ndarray,
+    lon: np.ndarray,
+    fleet: FleetColumns,
+    candidates: np.ndarray,
+    max_radius_km: float,
+) -> np.ndarray:
+    """Road minutes for the ``candidates`` pairs; inf elsewhere or when
+    unreachable, nan where a point is too far from the road network."""
+    max_minutes = max_radius_km / AVERAGE_SPEED_KM_PER_HOUR * 60 * router.max_detour_factor
+    eta = np.full(candidates.shape, np.inf)
+    for row in range(len(lat)):
+        cols = np.flatnonzero(candidates[row])
+        if len(cols):
+            eta[row, cols] = router.travel_minutes_to(
+                float(lat[row]), float(lon[row]), fleet.lat[cols], fleet.lon[cols], max_minutes
+            )
+    return eta
+
+
+def score_matrix(
+    lat: np.ndarray,
+    lon: np.ndarray,
+    weights: np.ndarray,
+    fleet: FleetColumns,
+    max_radius_km: float,
+    router: Optional["RoadGraph"] = None,
+    needs: Optional[Sequence[Needs]] = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return (scores, distances, eta minutes) for each incident row against the fleet.
+
+    Pairs outside the radius, with an unavailable or unqualified responder,
+    or (by road) unreachable score -inf. Rows without any qualified
+    responder in range keep the unqualified ones at a reduced score.
+    """
+    distances = haversine_matrix(lat, lon, fleet.lat, fleet.lon)
+    invalid = (distances > max_radius_km) | ~fleet.available[None, :]
+    preferred_fraction = 0.0
+    unqualified = None
+    if needs is not None and any(n != NO_NEEDS for n in needs):
+        required = np.fromiter((n.required for n in needs), dtype=np.uint32, count=len(needs))
+        preferred = np.fromiter((n.preferred for n in needs), dtype=np.uint32, count=len(needs))
+        eligible, preferred_fraction = match_matrix(fleet.capabilities, required, preferred)
+        in_range = ~invalid
+        fallback = (in_range & ~eligible).any(axis=1) & ~(in_range & eligible).any(axis=1)
+        if fallback.any():
+            CAPABILITY_FALLBACKS.inc(int(fallback.sum()))
+            unqualified = ~eligible & fallback[:, None]
+            eligible = eligible | unqualified
+        invalid |= ~eligible
+    eta_minutes = distances / AVERAGE_SPEED_KM_PER_HOUR * 60
+    if router is not None:
+        road = road_eta_matrix(router, lat, lon, fleet, ~invalid, max_radius_km)
+        eta_minutes = np.where(np.isnan(road), eta_minutes, road)
+        invalid |= np.isinf(eta_minutes)
+    max_minutes = max_radius_km / AVERAGE_SPEED_KM_PER_HOUR * 60
+    if router is not None:
+        max_minutes *= router.max_detour_factor
+    eta_penalty = np.clip(eta_minutes / max_minutes, 0.0, 1.0)
+    scores = weights[:, None] * (
+        fleet.trust[None, :] * 1.5 + (1 - eta_penalty) + CAPABILITY_WEIGHT * preferred_fraction
+    )
+    if unqualified is not None:
+        scores[unqualified] *= UNQUALIFIED_FACTOR
+    scores[invalid] = -np.inf
+    return scores, distances, eta_minutes
+
+
+def top_k(scores: np.ndarray, k: Optional[int]) -> np.ndarray:
+    """Column indices of the k best finite scores in a 1-D row, best first."""
+    valid = np.flatnonzero(np.isfinite(scores))
+    if k is not None and len(valid) > k:
+        part = np.argpartition(-scores[valid], k - 1)[:k]
+        valid = valid[part]
+    return valid[np.argsort(-scores[valid], kind="stable")]
+
+
+def _to_scores(
+    row: np.ndarray,
+    distances: np.ndarray,
+    eta_minutes: np.ndarray,
+    picked: np.ndarray,
+    ids: np.ndarray,
+) -> list[DispatchScore]:
+    return [
+        DispatchScore(
+            responder_id=int(ids[col]),
+            score=float(row[col]),
+            distance_km=float(distances[col]),
+            eta_minutes=float(eta_minutes[col]),
+        )
+        for col in picked
+    ]
+
+
+def rank_fleet(
+    lat: float,
+    lon: float,
+    urgency: Optional[str],
+    fleet: FleetColumns,
+    max_radius_km: float,
+    limit: Optional[int] = None,
+    router: Optional["RoadGraph"] = None,
+    needs: Needs = NO_NEEDS,
+) -> list[DispatchScore]:
+    """Rank responders in ``fleet`` for a single incident."""
+    if len(fleet) == 0:
+        return []
+    scores, distances, eta = score_matrix(
+        np.array([lat]),
+        np.array([lon]),
+        np.array([urgency_weight(urgency)]),
+        fleet,
+        max_radius_km,
+        router,
+        [needs],
+    )
+    picked = top_k(scores[0], limit)
+    return _to_scores(scores[0], distances[0], eta[0], picked, fleet.ids)
+
+
+def rank_fleet_many(
+    lats: Sequence[float],
+    lons: Sequence[float],
+    urgencies: Sequence[Optional[str]],
+    fleet: FleetColumns,
+    max_radius_km: float,
+    limit: Optional[int] = None,
+    router: Optional["RoadGraph"] = None,
+    needs: Optional[Sequence[Needs]] = None,
+) -> list[list[DispatchScore]]:
+    """Rank the fleet for many incidents, processing rows in bounded chunks."""
+    n = len(lats)
+    if n == 0:
+        return []
+    if len(fleet) == 0:
+        return [[] for _ in range(n)]
+
+    lat_arr = np.asarray(lats, dtype=np.float64)
+    lon_arr = np.asarray(lons, dtype=np.float64)
+    weights = np.array([urgency_weight(u) for u in urgencies], dtype=np.float64)
+    needs = list(needs) if needs is not None else None
+    chunk = max(1, MAX_MATRIX_CELLS // len(fleet))
+
+    results: list[list[DispatchScore]] = []
+    for start in range(0, n, chunk):
+        stop = min(n, start + chunk)
+        scores, distances, eta = score_matrix(
+            lat_arr[start:stop],
+            lon_arr[start:stop],
+            weights[start:stop],
+            fleet,
+            max_radius_km,
+            router,
+            needs[start:stop] if needs is not None else None,
+        )
+        for row in range(stop - start):
+            picked = top_k(scores[row], limit)
+            results.append(_to_scores(scores[row], distances[row], eta[row], picked, fleet.ids))
+    return results
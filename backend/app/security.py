@@ -1,19 +1,20 @@
-from datetime import datetime, timedelta
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from .cache import TTLCache
 from .config import get_settings
 from .db import get_db
+from .hashing import pwd_context
 from .models import User, UserRole
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token")
 settings = get_settings()
 
@@ -28,6 +29,40 @@ class TokenData(BaseModel):
     role: UserRole
 
 
+@dataclass(frozen=True, slots=True)
+class AuthenticatedUser:
+    """Snapshot of the fields request handlers need from ``users``."""
+
+    id: int
+    email: str
+    role: UserRole
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "AuthenticatedUser":
+        return cls(id=user.id, email=user.email, role=user.role, is_active=user.is_active)
+
+
+# Decoded token claims keyed by the raw token, and user records keyed by id.
+# Both are per-process; invalidate_user() must be called whenever a user's
+# role or active flag changes so hot endpoints never see stale permissions.
+token_cache: TTLCache[str, TokenData] = TTLCache(
+    settings.token_cache_max_entries, settings.access_token_expire_minutes * 60
+)
+user_cache: TTLCache[int, AuthenticatedUser] = TTLCache(
+    settings.user_cache_max_entries, settings.user_cache_ttl_seconds
+)
+
+
+def invalidate_user(user_id: int) -> None:
+    user_cache.invalidate(user_id)
+    token_cache.invalidate_where(lambda _token, claims: claims.user_id == user_id)
+
+
+def auth_cache_stats() -> dict:
+    return {"tokens": token_cache.stats(), "users": user_cache.stats()}
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -44,38 +79,73 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+def decode_token(token: str) -> Optional[TokenData]:
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+
+    try:
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        sub: str | None = payload.get("sub")
+        role: str | None = payload.get("role")
+        if sub is None or role is None:
+            return None
+        claims = TokenData(user_id=int(sub), role=UserRole(role))
+    except (JWTError, ValueError):
+        return None
+
+    # Never keep a token in the cache past its own expiry.
+    exp = payload.get("exp")
+    if exp is not None:
+        remaining = exp - datetime.now(timezone.utc).timestamp()
+        if remaining <= 0:
+            return None
+        token_cache.set(token, claims, ttl_seconds=remaining)
+    return claims
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-) -> User:
+    db: AsyncSession = Depends(get_db),
+) -> AuthenticatedUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        user_id: int | None = payload.get("sub")
-        role: str | None = payload.get("role")
-        if user_id is None or role is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-
-    user = db.get(User, user_id)
-    if user is None or not user.is_active:
+    user = await authenticate_token(token, db)
+    if user is None:
         raise credentials_exception
     return user
 
 
-async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+async def authenticate_token(token: str, db: AsyncSession) -> Optional[AuthenticatedUser]:
+    """The active user a bearer token belongs to, or None."""
+    claims = decode_token(token)
+    if claims is None:
+        return None
+
+    user = user_cache.get(claims.user_id)
+    if user is None:
+        record = await db.get(User, claims.user_id)
+        if record is None:
+            return None
+        user = AuthenticatedUser.from_user(record)
+        user_cache.set(user.id, user)
+
+    return user if user.is_active else None
+
+
+async def get_current_active_user(
+    current_user: AuthenticatedUser = Depends(get_current_user),
+) -> AuthenticatedUser:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 
 def require_role(*roles: UserRole):
-    async def _role_dep(current_user: User = Depends(get_current_active_user)) -> User:
+    async def _role_dep(current_user: AuthenticatedUser = Depends(get_current_active_user)) -> AuthenticatedUser:
         if current_user.role not in roles:
             raise HTTPException(status_code=403, detail="Not enough permissions")
         return current_user
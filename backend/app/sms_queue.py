@@ -0,0 +1,342 @@
+"""Durable SMS intake queue.
+
+The webhook only appends messages to a local SQLite file and acknowledges;
+a background worker drains it in batches into incidents. Every message is
+keyed by an idempotency key (the gateway's ``message_id`` when it sends
+one), and keys are remembered for ``sms_dedup_retention_hours`` after
+processing, so gateway retries and replays after an outage are dropped at
+enqueue time.
+
+Workers claim messages for ``sms_queue_claim_seconds`` before processing,
+so several processes can share the file; a claim that runs out (its worker
+died) is taken over. Incidents carry the message key in ``sms_key`` and a
+key already in Postgres is skipped, so a message persisted just before a
+crash is not inserted twice. While Postgres is unreachable the worker backs
+off and messages keep their attempts; only errors a message causes itself
+count towards ``sms_queue_max_attempts``.
+"""
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from loguru import logger
+from sqlalchemy import exc as sa_exc, select
+
+from .bulk import enrich_rows, insert_incidents
+from .config import get_settings
+from .db import SessionLocal
+from .lifecycle import readiness
+from .models import Incident
+from .schemas import SMSInbound
+from .observers import incidents_created
+
+
+settings = get_settings()
+
+PENDING, CLAIMED, DONE, FAILED = "pending", "claimed", "done", "failed"
+# How often the worker recounts messages per state for /metrics.
+STATS_REFRESH_SECONDS = 15.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sms_messages (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL UNIQUE,
+    from_number TEXT NOT NULL,
+    body TEXT NOT NULL,
+    received_at TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    enqueued_at REAL NOT NULL,
+    processed_at REAL,
+    claimed_by TEXT,
+    claimed_until REAL
+);
+CREATE INDEX IF NOT EXISTS ix_sms_messages_state_seq ON sms_messages (state, seq);
+"""
+# Columns added after the first release; files created before lack them.
+_ADDED_COLUMNS = {"claimed_by": "TEXT", "claimed_until": "REAL"}
+
+
+@dataclass(slots=True)
+class QueuedSMS:
+    seq: int
+    key: str
+    from_number: str
+    body: str
+    received_at: str
+    attempts: int
+
+
+def idempotency_key(message: SMSInbound) -> str:
+    if message.message_id:
+        return f"id:{message.message_id}"
+    raw = f"{message.from_number}|{message.received_at.isoformat()}|{message.body}"
+    return "sha256:" + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def parse_sms(body: str) -> tuple[Optional[str], float, float, str]:
+    """Parse "URGENT;lat;lng;description" into (urgency, lat, lng, description).
+
+    Raises ValueError on a malformed body.
+    """
+    parts = body.split(";", 3)
+    urgency = parts[0].strip().lower() if len(parts) > 0 else None
+    lat = float(parts[1]) if len(parts) > 1 else 0.0
+    lng = float(parts[2]) if len(parts) > 2 else 0.0
+    description = parts[3] if len(parts) > 3 else body
+    return urgency, lat, lng, description
+
+
+class SMSQueue:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.owner = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._counts: dict[str, int] = {}
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(sms_messages)")}
+            for name, kind in _ADDED_COLUMNS.items():
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE sms_messages ADD COLUMN {name} {kind}")
+            self._conn = conn
+        return self._conn
+
+    def enqueue(self, messages: Iterable[SMSInbound]) -> tuple[int, int]:
+        """Persist messages; returns (accepted, duplicates)."""
+        now = time.time()
+        rows = [
+            (idempotency_key(m), m.from_number, m.body, m.received_at.isoformat(), now)
+            for m in messages
+        ]
+        with self._lock:
+            db = self._db()
+            before = db.total_changes
+            db.execute("BEGIN")
+            db.executemany(
+                "INSERT OR IGNORE INTO sms_messages (key, from_number, body, received_at, enqueued_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            db.execute("COMMIT")
+            accepted = db.total_changes - before
+        return accepted, len(rows) - accepted
+
+    def claim(self, limit: int, lease_seconds: float) -> list[QueuedSMS]:
+        """Claim up to ``limit`` pending messages, or ones whose claim ran out, oldest first.
+
+        BEGIN IMMEDIATE takes SQLite's write lock, so two processes never
+        claim the same message.
+        """
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = db.execute(
+                    "SELECT seq, key, from_number, body, received_at, attempts FROM sms_messages "
+                    "WHERE state = ? OR (state = ? AND claimed_until < ?) ORDER BY seq LIMIT ?",
+                    (PENDING, CLAIMED, now, limit),
+                ).fetchall()
+                db.executemany(
+                    "UPDATE sms_messages SET state = ?, claimed_by = ?, claimed_until = ? WHERE seq = ?",
+                    [(CLAIMED, self.owner, now + lease_seconds, row[0]) for row in rows],
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return [QueuedSMS(*row) for row in rows]
+
+    def mark(self, seqs: list[int], state: str) -> None:
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN")
+            db.executemany(
+                "UPDATE sms_messages SET state = ?, processed_at = ?, claimed_by = NULL, claimed_until = NULL "
+                "WHERE seq = ?",
+                [(state, time.time(), seq) for seq in seqs],
+            )
+            db.execute("COMMIT")
+
+    def release(self, seqs: list[int], max_attempts: Optional[int] = None) -> None:
+        """Hand claimed messages back; with ``max_attempts``, the try counts and exhausted ones fail."""
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN")
+            db.executemany(
+                "UPDATE sms_messages SET state = ?, claimed_by = NULL, claimed_until = NULL, "
+                "attempts = attempts + ? WHERE seq = ? AND state = ?",
+                [(PENDING, int(max_attempts is not None), seq, CLAIMED) for seq in seqs],
+            )
+            if max_attempts is not None:
+                db.execute(
+                    "UPDATE sms_messages SET state = ?, processed_at = ? WHERE state = ? AND attempts >= ?",
+                    (FAILED, time.time(), PENDING, max_attempts),
+                )
+            db.execute("COMMIT")
+
+    def prune(self, retention_seconds: float) -> int:
+        """Forget processed keys older than the retention window."""
+        with self._lock:
+            cur = self._db().execute(
+                "DELETE FROM sms_messages WHERE state IN (?, ?) AND processed_at < ?",
+                (DONE, FAILED, time.time() - retention_seconds),
+            )
+            return cur.rowcount
+
+    def stats(self) -> dict:
+        """Count messages per state (a query: run it off the event loop); also refreshes ``cached_stats``."""
+        with self._lock:
+            counts = dict(self._db().execute("SELECT state, COUNT(*) FROM sms_messages GROUP BY state").fetchall())
+        self._counts = {state: counts.get(state, 0) for state in (PENDING, CLAIMED, DONE, FAILED)}
+        return self._counts
+
+    def cached_stats(self) -> dict:
+        """The counts from the last ``stats()`` call, without touching the file."""
+        return self._counts
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+sms_queue = SMSQueue(settings.sms_queue_path)
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Errors of the database connection rather than of the messages in the batch."""
+    if isinstance(exc, sa_exc.DBAPIError) and exc.connection_invalidated:
+        return True
+    return isinstance(
+        exc, (sa_exc.OperationalError, sa_exc.InterfaceError, sa_exc.TimeoutError, OSError, TimeoutError)
+    )
+
+
+async def persist_batch(batch: list[QueuedSMS]) -> None:
+    """Turn claimed messages into incidents; malformed ones are marked failed.
+
+    Messages whose key is already on an incident were persisted before
+    (the worker died before marking them) and are only marked done.
+    """
+    rows, notes, seqs, bad = [], [], [], []
+    for msg in batch:
+        try:
+            urgency, lat, lng, description = parse_sms(msg.body)
+        except ValueError:
+            bad.append(msg.seq)
+            continue
+        rows.append(
+            {
+                "description": description,
+                "raw_text": msg.body,
+                "category": None,
+                "urgency": urgency or None,
+                "injured_count": None,
+                "trapped": None,
+                "water_level_m": None,
+                "lat": lat,
+                "lng": lng,
+                "sms_key": msg.key,
+            }
+        )
+        notes.append(f"SMS from {msg.from_number} at {msg.received_at}")
+        seqs.append(msg.seq)
+
+    if bad:
+        await asyncio.to_thread(sms_queue.mark, bad, FAILED)
+    if not rows:
+        return
+
+    async with SessionLocal() as db:
+        persisted = set(
+            await db.scalars(select(Incident.sms_key).where(Incident.sms_key.in_([r["sms_key"] for r in rows])))
+        )
+        todo = [i for i, r in enumerate(rows) if r["sms_key"] not in persisted]
+        facts, events = [], []
+        if todo:
+            rows, notes = [rows[i] for i in todo], [notes[i] for i in todo]
+            enrich_rows(rows)
+            facts, events = await insert_incidents(db, rows, "created_sms", notes)
+            await db.commit()
+    incidents_created(facts, events)
+    await asyncio.to_thread(sms_queue.mark, seqs, DONE)
+
+
+class DatabaseUnavailable(Exception):
+    pass
+
+
+async def drain_sms_queue() -> int:
+    """Process everything currently pending; returns the number of messages taken.
+
+    Raises DatabaseUnavailable, with the claimed messages handed back
+    untouched, when Postgres cannot be reached.
+    """
+    taken = 0
+    claim = (sms_queue.claim, settings.sms_queue_batch_size, settings.sms_queue_claim_seconds)
+    while batch := await asyncio.to_thread(*claim):
+        try:
+            await persist_batch(batch)
+        except Exception as exc:  # noqa: BLE001
+            if is_transient(exc):
+                await asyncio.to_thread(sms_queue.release, [m.seq for m in batch])
+                raise DatabaseUnavailable(str(exc)) from exc
+            logger.exception("Persisting {} queued SMS messages failed, retrying one by one", len(batch))
+            failed = []
+            for i, msg in enumerate(batch):
+                try:
+                    await persist_batch([msg])
+                except Exception as exc:  # noqa: BLE001
+                    if is_transient(exc):
+                        await asyncio.to_thread(sms_queue.release, [m.seq for m in batch[i:]])
+                        if failed:
+                            await asyncio.to_thread(sms_queue.release, failed, settings.sms_queue_max_attempts)
+                        raise DatabaseUnavailable(str(exc)) from exc
+                    failed.append(msg.seq)
+            if failed:
+                await asyncio.to_thread(sms_queue.release, failed, settings.sms_queue_max_attempts)
+                break
+        taken += len(batch)
+    return taken
+
+
+async def run_sms_worker(interval_seconds: float) -> None:
+    """Drain the queue every ``interval_seconds`` once warm-up has finished, backing off while Postgres is down."""
+    retention = settings.sms_dedup_retention_hours * 3600
+    last_prune = 0.0
+    last_count = 0.0
+    delay = interval_seconds
+    while True:
+        await asyncio.sleep(delay)
+        if not readiness.ready:
+            continue
+        try:
+            # Before draining, so the counts stay fresh while Postgres is down.
+            if time.monotonic() - last_count > STATS_REFRESH_SECONDS:
+                await asyncio.to_thread(sms_queue.stats)
+                last_count = time.monotonic()
+            await drain_sms_queue()
+            delay = interval_seconds
+            if time.monotonic() - last_prune > 600:
+                await asyncio.to_thread(sms_queue.prune, retention)
+                last_prune = time.monotonic()
+        except DatabaseUnavailable as exc:
+            delay = min(max(delay * 2, 1.0), settings.startup_retry_max_seconds)
+            logger.warning("Database unavailable for the SMS queue ({}); retrying in {:.1f}s", exc, delay)
+        except Exception:  # noqa: BLE001
+            logger.exception("SMS queue worker iteration failed")
@@ -0,0 +1,335 @@
+"""In-process spatial index of responders used by the dispatcher.
+
+Responders are bucketed into a uniform lat/lon grid so a radius query only
+visits the cells overlapping the search circle instead of the whole fleet.
+Attributes are kept in column arrays (one slot per responder) so the
+scoring engine in ``scoring.py`` can work on them without per-row objects.
+The index is loaded from the database on first use and kept current by the
+routers that create, move or change the availability of responders.
+
+``version`` is bumped on every change that can alter a dispatch ranking:
+responders added or removed, availability flips (dispatch reservations and
+their release included) and moves of more than ``move_threshold_km`` since
+the responder's last bump. Cached rankings are keyed by it.
+"""
+import asyncio
+import math
+import struct
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from geoalchemy2 import Geometry
+from sqlalchemy import select, func, cast
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .capabilities import capability_mask
+from .config import get_settings
+from .models import Responder
+
+
+settings = get_settings()
+
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE_LAT = 111.32
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
+
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    return EARTH_RADIUS_KM * c
+
+
+def lat_lng_columns(geog_column):
+    """Return (lat, lng) SQL expressions for a geography POINT column."""
+    geom = cast(geog_column, Geometry)
+    return func.ST_Y(geom), func.ST_X(geom)
+
+
+def point_lat_lng(element) -> tuple[float, float]:
+    """(lat, lng) of a loaded POINT value (a WKBElement holding (E)WKB)."""
+    data = element.data if hasattr(element, "data") else element
+    if isinstance(data, str):
+        data = bytes.fromhex(data)
+    data = bytes(data)
+    order = "<" if data[0] == 1 else ">"
+    (geom_type,) = struct.unpack_from(order + "I", data, 1)
+    offset = 9 if geom_type & 0x20000000 else 5  # skip the SRID when present
+    lng, lat = struct.unpack_from(order + "dd", data, offset)
+    return lat, lng
+
+
+@dataclass(slots=True)
+class ResponderEntry:
+    id: int
+    user_id: int
+    lat: float
+    lon: float
+    trust_score: float
+    is_available: bool
+    capabilities: int = 0  # app.capabilities bitset
+
+
+@dataclass
+class FleetColumns:
+    """Column view of a set of responders, aligned by position."""
+
+    ids: np.ndarray
+    lat: np.ndarray
+    lon: np.ndarray
+    trust: np.ndarray
+    available: np.ndarray
+    capabilities: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class ResponderIndex:
+    """Uniform grid of responders keyed by (lat cell, lon cell).
+
+    Each responder owns a slot in the column arrays; grid cells hold slot
+    numbers. Unavailable responders stay in the index so they can be flipped
+    back without a reload; queries skip them by default.
+    """
+
+    def __init__(self, cell_deg: float = 0.25, initial_capacity: int = 1024, move_threshold_km: float = 0.25):
+        self.cell_deg = cell_deg
+        self.move_threshold_km = move_threshold_km
+        self.version = 0
+        self._lon_cells = int(math.ceil(360.0 / cell_deg))
+        self._lock = threading.RLock()
+        self._load_lock = asyncio.Lock()
+        self._allocate(initial_capacity)
+        self.loaded = False
+
+    def _allocate(self, capacity: int) -> None:
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._user_ids = np.zeros(capacity, dtype=np.int64)
+        self._lat = np.zeros(capacity, dtype=np.float64)
+        self._lon = np.zeros(capacity, dtype=np.float64)
+        self._trust = np.zeros(capacity, dtype=np.float64)
+        self._available = np.zeros(capacity, dtype=bool)
+        self._capabilities = np.zeros(capacity, dtype=np.uint32)
+        self._live = np.zeros(capacity, dtype=bool)
+        # Position at the responder's last version bump.
+        self._anchor_lat = np.zeros(capacity, dtype=np.float64)
+        self._anchor_lon = np.zeros(capacity, dtype=np.float64)
+        self._slots: dict[int, int] = {}
+        self._free: list[int] = []
+        self._size = 0
+        self._cells: dict[tuple[int, int], set[int]] = {}
+
+    def _grow(self) -> None:
+        capacity = max(1, len(self._ids)) * 2
+        columns = (
+            "_ids", "_user_ids", "_lat", "_lon", "_trust", "_available", "_capabilities", "_live",
+            "_anchor_lat", "_anchor_lon",
+        )
+        for name in columns:
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[: len(old)] = old
+            setattr(self, name, new)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _cell(self, lat: float, lon: float) -> tuple[int, int]:
+        return (
+            math.floor(lat / self.cell_deg),
+            math.floor((lon + 180.0) / self.cell_deg) % self._lon_cells,
+        )
+
+    def _cell_remove(self, slot: int) -> None:
+        key = self._cell(self._lat[slot], self._lon[slot])
+        bucket = self._cells.get(key)
+        if bucket is not None:
+            bucket.discard(slot)
+            if not bucket:
+                del self._cells[key]
+
+    def _insert(self, entry: ResponderEntry) -> None:
+        slot = self._slots.get(entry.id)
+        if slot is not None:
+            self._cell_remove(slot)
+        elif self._free:
+            slot = self._free.pop()
+        else:
+            if self._size == len(self._ids):
+                self._grow()
+            slot = self._size
+            self._size += 1
+
+        self._slots[entry.id] = slot
+        self._ids[slot] = entry.id
+        self._user_ids[slot] = entry.user_id
+        self._lat[slot] = entry.lat
+        self._lon[slot] = entry.lon
+        self._trust[slot] = entry.trust_score or 0.5
+        self._available[slot] = entry.is_available
+        self._capabilities[slot] = entry.capabilities
+        self._live[slot] = True
+        self._anchor_lat[slot] = entry.lat
+        self._anchor_lon[slot] = entry.lon
+        self._cells.setdefault(self._cell(entry.lat, entry.lon), set()).add(slot)
+        self.version += 1
+
+    def get(self, responder_id: int) -> Optional[ResponderEntry]:
+        with self._lock:
+            slot = self._slots.get(responder_id)
+            if slot is None:
+                return None
+            return ResponderEntry(
+                id=int(self._ids[slot]),
+                user_id=int(self._user_ids[slot]),
+                lat=float(self._lat[slot]),
+                lon=float(self._lon[slot]),
+                trust_score=float(self._trust[slot]),
+                is_available=bool(self._available[slot]),
+                capabilities=int(self._capabilities[slot]),
+            )
+
+    def upsert(self, entry: ResponderEntry) -> None:
+        with self._lock:
+            self._insert(entry)
+
+    def remove(self, responder_id: int) -> None:
+        with self._lock:
+            slot = self._slots.pop(responder_id, None)
+            if slot is None:
+                return
+            self._cell_remove(slot)
+            self._live[slot] = False
+            self._available[slot] = False
+            self._free.append(slot)
+            self.version += 1
+
+    def move(self, responder_id: int, lat: float, lon: float) -> bool:
+        with self._lock:
+            slot = self._slots.get(responder_id)
+            if slot is None:
+                return False
+            old_key = self._cell(self._lat[slot], self._lon[slot])
+            new_key = self._cell(lat, lon)
+            self._lat[slot] = lat
+            self._lon[slot] = lon
+            if old_key != new_key:
+                bucket = self._cells.get(old_key)
+                if bucket is not None:
+                    bucket.discard(slot)
+                    if not bucket:
+                        del self._cells[old_key]
+                self._cells.setdefault(new_key, set()).add(slot)
+            if haversine_km(self._anchor_lat[slot], self._anchor_lon[slot], lat, lon) >= self.move_threshold_km:
+                self._anchor_lat[slot] = lat
+                self._anchor_lon[slot] = lon
+                self.version += 1
+            return True
+
+    def set_available(self, responder_id: int, is_available: bool) -> bool:
+        with self._lock:
+            slot = self._slots.get(responder_id)
+            if slot is None:
+                return False
+            if self._available[slot] != is_available:
+                self._available[slot] = is_available
+                self.version += 1
+            return True
+
+    def _slots_near(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        dlat = radius_km / KM_PER_DEGREE_LAT
+        cos_lat = math.cos(math.radians(lat))
+        if cos_lat < 1e-6:
+            dlon = 180.0
+        else:
+            dlon = min(180.0, radius_km / (KM_PER_DEGREE_LAT * cos_lat))
+
+        row_lo = math.floor((lat - dlat) / self.cell_deg)
+        row_hi = math.floor((lat + dlat) / self.cell_deg)
+        if dlon >= 180.0:
+            cols = range(self._lon_cells)
+        else:
+            col_lo = math.floor((lon - dlon + 180.0) / self.cell_deg)
+            col_hi = math.floor((lon + dlon + 180.0) / self.cell_deg)
+            cols = sorted({c % self._lon_cells for c in range(col_lo, col_hi + 1)})
+
+        found: list[int] = []
+        for row in range(row_lo, row_hi + 1):
+            for col in cols:
+                bucket = self._cells.get((row, col))
+                if bucket:
+                    found.extend(bucket)
+        return np.fromiter(found, dtype=np.int64, count=len(found))
+
+    def _columns(self, slots: np.ndarray) -> FleetColumns:
+        return FleetColumns(
+            ids=self._ids[slots],
+            lat=self._lat[slots],
+            lon=self._lon[slots],
+            trust=self._trust[slots],
+            available=self._available[slots],
+            capabilities=self._capabilities[slots],
+        )
+
+    def candidates(self, lat: float, lon: float, radius_km: float) -> FleetColumns:
+        """Columns for responders in the grid cells overlapping the radius.
+
+        This is a coarse filter; exact distances are left to the scorer.
+        """
+        with self._lock:
+            return self._columns(self._slots_near(lat, lon, radius_km))
+
+    def snapshot(self) -> FleetColumns:
+        """Columns for every responder in the index."""
+        with self._lock:
+            return self._columns(np.flatnonzero(self._live[: self._size]))
+
+    async def load(self, db: AsyncSession) -> None:
+        """Rebuild the index from the responders table in a single query."""
+        lat_col, lon_col = lat_lng_columns(Responder.location)
+        result = await db.execute(
+            select(
+                Responder.id,
+                Responder.user_id,
+                lat_col,
+                lon_col,
+                Responder.trust_score,
+                Responder.is_available,
+                Responder.skills,
+                Responder.vehicle_type,
+            )
+        )
+        rows = result.all()
+
+        with self._lock:
+            self._allocate(max(1024, len(rows)))
+            for responder_id, user_id, lat, lon, trust, available, skills, vehicle_type in rows:
+                self._insert(
+                    ResponderEntry(
+                        id=responder_id,
+                        user_id=user_id,
+                        lat=float(lat),
+                        lon=float(lon),
+                        trust_score=trust,
+                        is_available=bool(available),
+                        capabilities=capability_mask(skills, vehicle_type),
+                    )
+                )
+            self.loaded = True
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        if not self.loaded:
+            async with self._load_lock:
+                if not self.loaded:
+                    await self.load(db)
+
+
+responder_index = ResponderIndex(move_threshold_km=settings.dispatch_cache_move_threshold_km)
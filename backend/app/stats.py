@@ -0,0 +1,136 @@
+"""In-memory incident counters for the analytics summary.
+
+Totals, per-status and per-urgency counts and rolling 1h/24h creation
+windows are rebuilt from the database at startup and then kept current by
+the write paths (create, status change, bulk import, SMS worker), so the
+dashboard summary never scans ``incidents``.
+"""
+import calendar
+import threading
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Incident, IncidentStatus
+
+
+def _epoch_second(dt: datetime) -> int:
+    return calendar.timegm(dt.utctimetuple())
+
+
+class RollingWindow:
+    """Count of events in the trailing ``seconds``, bucketed per second."""
+
+    def __init__(self, seconds: int):
+        self.seconds = seconds
+        self.total = 0
+        self._buckets: deque[list[int]] = deque()  # [second, count], ascending
+
+    def add(self, second: int, count: int = 1) -> None:
+        buckets = self._buckets
+        if not buckets or buckets[-1][0] < second:
+            buckets.append([second, count])
+        else:
+            # Same or slightly out-of-order second; walk back to its slot.
+            i = len(buckets) - 1
+            while i >= 0 and buckets[i][0] > second:
+                i -= 1
+            if i >= 0 and buckets[i][0] == second:
+                buckets[i][1] += count
+            else:
+                buckets.insert(i + 1, [second, count])
+        self.total += count
+
+    def count(self, now: int) -> int:
+        # created_at >= now - seconds stays in the window
+        cutoff = now - self.seconds
+        buckets = self._buckets
+        while buckets and buckets[0][0] < cutoff:
+            self.total -= buckets.popleft()[1]
+        return self.total
+
+    def clear(self) -> None:
+        self._buckets.clear()
+        self.total = 0
+
+
+class IncidentCounters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = 0
+        self.by_status: Counter[str] = Counter()
+        self.by_urgency: Counter[Optional[str]] = Counter()
+        self.last_1h = RollingWindow(3600)
+        self.last_24h = RollingWindow(24 * 3600)
+        self.loaded = False
+
+    def record_created(
+        self,
+        urgencies: Iterable[Optional[str]],
+        created_at: datetime,
+        status: IncidentStatus = IncidentStatus.requested,
+    ) -> None:
+        urgencies = list(urgencies)
+        second = _epoch_second(created_at)
+        with self._lock:
+            self.total += len(urgencies)
+            self.by_status[status.value] += len(urgencies)
+            self.by_urgency.update(urgencies)
+            self.last_1h.add(second, len(urgencies))
+            self.last_24h.add(second, len(urgencies))
+
+    def record_status_change(self, from_status: str, to_status: str) -> None:
+        if from_status == to_status:
+            return
+        with self._lock:
+            self.by_status[from_status] -= 1
+            self.by_status[to_status] += 1
+
+    async def load(self, db: AsyncSession) -> None:
+        """Rebuild every counter from the incidents table."""
+        groups = (
+            await db.execute(
+                select(Incident.status, Incident.urgency, func.count(Incident.id)).group_by(
+                    Incident.status, Incident.urgency
+                )
+            )
+        ).all()
+        since = datetime.utcnow() - timedelta(hours=24)
+        second = func.date_trunc("second", Incident.created_at)
+        recent = (
+            await db.execute(
+                select(second, func.count(Incident.id)).where(Incident.created_at >= since).group_by(second)
+            )
+        ).all()
+
+        with self._lock:
+            self.total = 0
+            self.by_status.clear()
+            self.by_urgency.clear()
+            self.last_1h.clear()
+            self.last_24h.clear()
+            for status, urgency, count in groups:
+                self.total += count
+                self.by_status[status.value] += count
+                self.by_urgency[urgency] += count
+            for created_at, count in sorted(recent):
+                self.last_1h.add(_epoch_second(created_at), count)
+                self.last_24h.add(_epoch_second(created_at), count)
+            self.loaded = True
+
+    def summary(self) -> dict:
+        now = _epoch_second(datetime.utcnow())
+        with self._lock:
+            return {
+                "total_incidents": self.total,
+                "incidents_by_status": {k: v for k, v in self.by_status.items() if v},
+                "incidents_by_urgency": {k or "unknown": v for k, v in self.by_urgency.items() if v},
+                "incidents_last_24h": self.last_24h.count(now),
+                "incidents_last_1h": self.last_1h.count(now),
+            }
+
+
+incident_counters = IncidentCounters()
@@ -0,0 +1,186 @@
+"""Pre-aggregated hotspot grids for the operations map.
+
+Incidents are counted into one grid per Web Mercator zoom level, 0 to
+``hotspot_grid_max_zoom``. A tile (z, x, y) is split into
+``TILE_BINS`` x ``TILE_BINS`` bins. Each bin holds counts keyed by
+(status, urgency, UTC day), so a tile request only touches that tile's bins
+and the status, urgency and since-day filters are applied from there.
+Zooms above the grid's maximum cover small areas and are binned straight
+from a bounded database query.
+
+The grids are rebuilt from the database at startup and kept current
+through ``app.observers``.
+"""
+import math
+import threading
+from collections import Counter
+from datetime import date, datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import get_settings
+from .models import Incident
+from .spatial import lat_lng_columns
+
+
+settings = get_settings()
+
+
+TILE_BINS_SHIFT = 5
+TILE_BINS = 1 << TILE_BINS_SHIFT
+MAX_MERCATOR_LAT = 85.05112878
+MAX_ZOOM = 22
+
+_EPOCH = date(1970, 1, 1)
+
+# (status, urgency, day number)
+AttrKey = tuple[str, Optional[str], int]
+
+
+def day_number(value: date | datetime) -> int:
+    if isinstance(value, datetime):
+        value = value.date()
+    return (value - _EPOCH).days
+
+
+def mercator_xy(lat: float, lng: float, zoom: int) -> tuple[float, float]:
+    """Fractional tile coordinates of a point at ``zoom``."""
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    n = 1 << zoom
+    x = (lng + 180.0) / 360.0 * n
+    rad = math.radians(lat)
+    y = (1.0 - math.log(math.tan(rad) + 1.0 / math.cos(rad)) / math.pi) / 2.0 * n
+    return min(max(x, 0.0), n - 1e-9), min(max(y, 0.0), n - 1e-9)
+
+
+def tile_bounds(z: int, x: int, y: int) -> tuple[float, float, float, float]:
+    """(min_lng, min_lat, max_lng, max_lat) of a tile."""
+    n = 1 << z
+
+    def lat(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y)
+
+
+def _bin_of(lat: float, lng: float, zoom: int) -> tuple[tuple[int, int], tuple[int, int]]:
+    fx, fy = mercator_xy(lat, lng, zoom + TILE_BINS_SHIFT)
+    bx, by = int(fx), int(fy)
+    return (bx >> TILE_BINS_SHIFT, by >> TILE_BINS_SHIFT), (bx & (TILE_BINS - 1), by & (TILE_BINS - 1))
+
+
+def _matches(key: AttrKey, statuses, urgencies, since_day) -> bool:
+    status, urgency, day = key
+    return (
+        (statuses is None or status in statuses)
+        and (urgencies is None or urgency in urgencies)
+        and (since_day is None or day >= since_day)
+    )
+
+
+class HotspotGrid:
+    def __init__(self, max_zoom: int):
+        self.max_zoom = max_zoom
+        self._lock = threading.Lock()
+        # levels[z][(tile_x, tile_y)][(bin_x, bin_y)] -> Counter[AttrKey]
+        self._levels: list[dict] = [{} for _ in range(max_zoom + 1)]
+        # 3-decimal (lat, lng) -> count, for the legacy /hotspots list
+        self.points: Counter[tuple[float, float]] = Counter()
+        self.loaded = False
+
+    def _apply(self, lat: float, lng: float, key: AttrKey, delta: int) -> None:
+        for z, level in enumerate(self._levels):
+            tile, cell = _bin_of(lat, lng, z)
+            bins = level.setdefault(tile, {})
+            counts = bins.setdefault(cell, Counter())
+            counts[key] += delta
+            if counts[key] <= 0:
+                del counts[key]
+                if not counts:
+                    del bins[cell]
+                    if not bins:
+                        del level[tile]
+
+    def add(self, lat: float, lng: float, status: str, urgency: Optional[str], created_at: datetime) -> None:
+        with self._lock:
+            self._apply(lat, lng, (status, urgency, day_number(created_at)), 1)
+            self.points[(round(lat, 3), round(lng, 3))] += 1
+
+    def change_status(
+        self,
+        lat: float,
+        lng: float,
+        urgency: Optional[str],
+        created_at: datetime,
+        from_status: str,
+        to_status: str,
+    ) -> None:
+        if from_status == to_status:
+            return
+        day = day_number(created_at)
+        with self._lock:
+            self._apply(lat, lng, (from_status, urgency, day), -1)
+            self._apply(lat, lng, (to_status, urgency, day), 1)
+
+    def tile(
+        self,
+        z: int,
+        x: int,
+        y: int,
+        statuses: Optional[set[str]] = None,
+        urgencies: Optional[set[Optional[str]]] = None,
+        since: Optional[date] = None,
+    ) -> list[list[int]]:
+        """[[bin_x, bin_y, count], ...] for the non-empty bins of a tile."""
+        since_day = day_number(since) if since is not None else None
+        unfiltered = statuses is None and urgencies is None and since_day is None
+        out = []
+        with self._lock:
+            bins = self._levels[z].get((x, y), {})
+            for (bx, by), counts in bins.items():
+                if unfiltered:
+                    total = sum(counts.values())
+                else:
+                    total = sum(n for key, n in counts.items() if _matches(key, statuses, urgencies, since_day))
+                if total:
+                    out.append([bx, by, total])
+        out.sort()
+        return out
+
+    def hotspots(self) -> list[dict]:
+        with self._lock:
+            return [{"lat": lat, "lng": lng, "count": count} for (lat, lng), count in self.points.items()]
+
+    async def load(self, db: AsyncSession) -> None:
+        """Rebuild the grids from every incident."""
+        lat_col, lng_col = lat_lng_columns(Incident.location)
+        query = select(lat_col, lng_col, Incident.status, Incident.urgency, Incident.created_at)
+        fresh = HotspotGrid(self.max_zoom)
+        result = await db.stream(query.execution_options(yield_per=5000))
+        async for lat, lng, status, urgency, created_at in result:
+            fresh._apply(lat, lng, (status.value, urgency, day_number(created_at)), 1)
+            fresh.points[(round(lat, 3), round(lng, 3))] += 1
+        with self._lock:
+            self._levels = fresh._levels
+            self.points = fresh.points
+            self.loaded = True
+
+
+def bin_rows(
+    rows: Iterable[tuple[float, float]],
+    z: int,
+    x: int,
+    y: int,
+) -> list[list[int]]:
+    """Bin (lat, lng) rows that fall in tile (z, x, y), like ``HotspotGrid.tile``."""
+    counts: Counter[tuple[int, int]] = Counter()
+    for lat, lng in rows:
+        tile, cell = _bin_of(lat, lng, z)
+        if tile == (x, y):
+            counts[cell] += 1
+    return sorted([bx, by, n] for (bx, by), n in counts.items())
+
+
+hotspot_grid = HotspotGrid(settings.hotspot_grid_max_zoom)
@@ -0,0 +1,351 @@
+"""Continuous triage: open incidents are dispatched without waiting for an admin.
+
+A priority queue holds the open incidents (requested or triaged, not a
+duplicate, no pending or accepted assignment). Priority is urgency plus
+injured and trapped people, plus ``triage_aging_per_minute`` for every
+minute waited, so a ``low`` report eventually outranks fresh urgent ones
+instead of starving. Every entry ages at the same rate, so the order never
+changes with time and a heap keyed by ``base - aging * created`` stays valid.
+
+Each tick the scheduler pulls incidents created since the last tick, pops
+a micro-batch of the most urgent and dispatches it like /dispatch/batch:
+one joint match, reserved responders, leased offers. A first offer moves
+the incident from requested to triaged; accepting it moves it on to
+assigned (app.routers.assignments). Incidents nobody could take go back in
+the queue and are retried after ``triage_retry_seconds``. Incidents whose
+offer was rejected or expired are reported through ``reopen`` once that is
+committed and pulled again on the next tick. A periodic resync catches any
+the incremental pull missed.
+
+Incidents are locked with SKIP LOCKED while dispatched, so the schedulers
+of several workers never offer the same incident twice.
+"""
+import asyncio
+import heapq
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Optional
+
+from loguru import logger
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import get_settings
+from .db import SessionLocal
+from .dispatch import (
+    OPEN_INCIDENT_STATUSES,
+    assign_jointly,
+    assigned_events,
+    availability_changed,
+    busy_responder_ids,
+    has_active_assignment,
+    lease_deadline,
+    publish_events,
+    reserve_responders,
+    score_responders_for_incidents,
+)
+from .lifecycle import readiness
+from .metrics import TRIAGE_TICK, TRIAGE_TIME_TO_FIRST_OFFER
+from .models import Assignment, AssignmentStatus, Incident, IncidentEvent, IncidentStatus
+from .observers import IncidentFact, incident_status_changed, stream_event
+
+
+settings = get_settings()
+
+URGENCY_PRIORITY = {"critical": 100.0, "urgent": 50.0}
+DEFAULT_PRIORITY = 10.0  # low or unclassified
+TRAPPED_PRIORITY = 40.0
+INJURED_PRIORITY = 5.0  # per injured person, up to MAX_INJURED
+MAX_INJURED = 10
+EPOCH = datetime(2000, 1, 1)
+
+
+def base_priority(urgency: Optional[str], injured_count: Optional[int], trapped: Optional[bool]) -> float:
+    return (
+        URGENCY_PRIORITY.get(urgency or "", DEFAULT_PRIORITY)
+        + TRAPPED_PRIORITY * bool(trapped)
+        + INJURED_PRIORITY * min(injured_count or 0, MAX_INJURED)
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class QueuedIncident:
+    incident_id: int
+    key: float  # priority minus the aging already earned at creation
+    created_at: datetime
+
+
+class TriageQueue:
+    """Open incidents, most urgent first once aging is counted in.
+
+    Removal is lazy: discarded or popped ids stay in the heaps until they
+    surface. Deferred incidents wait in a second heap ordered by the time
+    they may be retried.
+    """
+
+    def __init__(self, aging_per_minute: float):
+        self.aging_per_minute = aging_per_minute
+        self._entries: dict[int, QueuedIncident] = {}
+        self._heap: list[tuple[float, int]] = []  # (-key, incident id)
+        self._deferred: list[tuple[float, int]] = []  # (not before, incident id), monotonic time
+        self._deferred_ids: set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, incident_id: int) -> bool:
+        return incident_id in self._entries
+
+    def push(
+        self,
+        incident_id: int,
+        urgency: Optional[str],
+        injured_count: Optional[int],
+        trapped: Optional[bool],
+        created_at: datetime,
+    ) -> bool:
+        """Queue an incident; False if it is queued already."""
+        if incident_id in self._entries:
+            return False
+        created_minutes = (created_at - EPOCH).total_seconds() / 60
+        key = base_priority(urgency, injured_count, trapped) - self.aging_per_minute * created_minutes
+        entry = QueuedIncident(incident_id, key, created_at)
+        self._entries[incident_id] = entry
+        heapq.heappush(self._heap, (-entry.key, incident_id))
+        return True
+
+    def discard(self, incident_id: int) -> None:
+        self._entries.pop(incident_id, None)
+        self._deferred_ids.discard(incident_id)
+
+    def retain(self, incident_ids: set[int]) -> int:
+        """Drop every queued incident not in ``incident_ids``; returns how many went."""
+        gone = [i for i in self._entries if i not in incident_ids]
+        for incident_id in gone:
+            self.discard(incident_id)
+        if len(self._heap) > 2 * len(self._entries) + 1024:
+            # Mostly stale slots: rebuild rather than pop through them later.
+            self._heap = [(-e.key, i) for i, e in self._entries.items() if i not in self._deferred_ids]
+            heapq.heapify(self._heap)
+        return len(gone)
+
+    def pop_batch(self, size: int, now: Optional[float] = None) -> list[QueuedIncident]:
+        """Remove and return up to ``size`` of the most urgent incidents not deferred past ``now``."""
+        now = time.monotonic() if now is None else now
+        while self._deferred and self._deferred[0][0] <= now:
+            _, incident_id = heapq.heappop(self._deferred)
+            if incident_id in self._deferred_ids:
+                self._deferred_ids.discard(incident_id)
+                entry = self._entries.get(incident_id)
+                if entry is not None:
+                    heapq.heappush(self._heap, (-entry.key, incident_id))
+
+        batch = []
+        while self._heap and len(batch) < size:
+            neg_key, incident_id = heapq.heappop(self._heap)
+            entry = self._entries.get(incident_id)
+            # A stale slot: discarded, or pushed again since (deferred or re-queued).
+            if entry is None or entry.key != -neg_key or incident_id in self._deferred_ids:
+                continue
+            del self._entries[incident_id]
+            batch.append(entry)
+        return batch
+
+    def requeue(self, entries: Iterable[QueuedIncident], not_before: Optional[float] = None) -> None:
+        """Put popped incidents back with their original priority, optionally deferred."""
+        for entry in entries:
+            if entry.incident_id in self._entries:
+                continue
+            self._entries[entry.incident_id] = entry
+            if not_before is None:
+                heapq.heappush(self._heap, (-entry.key, entry.incident_id))
+            else:
+                self._deferred_ids.add(entry.incident_id)
+                heapq.heappush(self._deferred, (not_before, entry.incident_id))
+
+    def stats(self) -> dict:
+        return {"queue_depth": len(self._entries), "queue_deferred": len(self._deferred_ids)}
+
+
+@dataclass
+class BatchOutcome:
+    offered: list[int]  # incidents that got an offer
+    unmatched: list[int]  # still open, nobody free to take them
+    dropped: list[int]  # closed, linked, assigned or locked by another dispatcher
+
+
+def _open_incidents():
+    return select(Incident.id, Incident.urgency, Incident.injured_count, Incident.trapped, Incident.created_at).where(
+        Incident.status.in_(OPEN_INCIDENT_STATUSES), Incident.duplicate_of_id.is_(None), ~has_active_assignment()
+    )
+
+
+async def dispatch_batch(incident_ids: list[int]) -> BatchOutcome:
+    """Offer one responder to each open incident of ``incident_ids``, matched jointly."""
+    async with SessionLocal() as db:
+        incidents = (
+            await db.scalars(
+                select(Incident)
+                .where(
+                    Incident.id.in_(incident_ids),
+                    Incident.status.in_(OPEN_INCIDENT_STATUSES),
+                    Incident.duplicate_of_id.is_(None),
+                    ~has_active_assignment(),
+                )
+                .with_for_update(skip_locked=True)
+            )
+        ).all()
+        by_id = {i.id: i for i in incidents}
+        dropped = [i for i in incident_ids if i not in by_id]
+        if not incidents:
+            return BatchOutcome([], [], dropped)
+
+        ranked = await score_responders_for_incidents(
+            db,
+            incidents,
+            max_radius_km=settings.triage_max_radius_km,
+            limit=settings.triage_candidates_per_incident,
+            exclude_responder_ids=await busy_responder_ids(db),
+        )
+        matches = await asyncio.to_thread(assign_jointly, ranked, 1, settings.triage_time_budget_ms)
+        reserved = await reserve_responders(db, [score.responder_id for _, score in matches])
+        kept = set(reserved)
+
+        expires_at = lease_deadline()
+        assignments = [
+            Assignment(
+                incident_id=incident_id,
+                responder_id=score.responder_id,
+                status=AssignmentStatus.pending,
+                score=score.score,
+                eta_minutes=score.eta_minutes,
+                expires_at=expires_at,
+            )
+            for incident_id, score in matches
+            if score.responder_id in kept
+        ]
+        db.add_all(assignments)
+        events = assigned_events(assignments, None)
+        db.add_all(events)
+
+        offered = [a.incident_id for a in assignments]
+        now = datetime.utcnow()
+        triaged = []
+        for incident_id in offered:
+            incident = by_id[incident_id]
+            if incident.status != IncidentStatus.requested:
+                continue
+            incident.status = IncidentStatus.triaged
+            status_event = IncidentEvent(
+                incident_id=incident_id,
+                from_status=IncidentStatus.requested.value,
+                to_status=IncidentStatus.triaged.value,
+                event_type="status_change",
+                note="Triage scheduler offered a responder",
+            )
+            db.add(status_event)
+            triaged.append((incident, status_event))
+        await db.commit()
+
+    availability_changed(reserved=reserved)
+    publish_events(events, by_id)
+    for incident, status_event in triaged:
+        TRIAGE_TIME_TO_FIRST_OFFER.observe((now - incident.created_at).total_seconds())
+        fact = IncidentFact.from_incident(incident)
+        incident_status_changed(fact, IncidentStatus.requested.value, stream_event(status_event, fact))
+    offered_set = set(offered)
+    return BatchOutcome(offered, [i.id for i in incidents if i.id not in offered_set], dropped)
+
+
+class TriageScheduler:
+    def __init__(self, aging_per_minute: float):
+        self.queue = TriageQueue(aging_per_minute)
+        self._stop = asyncio.Event()
+        self._high_water = 0  # largest incident id pulled so far
+        self._reopened: set[int] = set()  # lost their offer since the last pull
+        self.running = False
+        self._next_resync = 0.0
+        self.offered = 0
+        self.ticks = 0
+
+    def reopen(self, incident_ids: Iterable[int]) -> None:
+        """Incidents whose offer was rejected or expired; queued again on the next pull if still open."""
+        if self.running:
+            self._reopened.update(incident_ids)
+
+    async def refresh(self, db: AsyncSession, full: bool = False) -> int:
+        """Queue open incidents created or reopened since the last pull, or all of them when ``full``.
+
+        Ids become visible out of order when transactions commit out of
+        order, so the incremental pull can miss some; the full resync catches
+        them, and also drops queued incidents that were closed elsewhere.
+        """
+        query = _open_incidents()
+        reopened, self._reopened = self._reopened, set()
+        if not full:
+            query = query.where(or_(Incident.id > self._high_water, Incident.id.in_(reopened)))
+        rows = (await db.execute(query)).all()
+        added = sum(self.queue.push(*row) for row in rows)
+        if rows:
+            self._high_water = max(self._high_water, max(row.id for row in rows))
+        if full:
+            self.queue.retain({row.id for row in rows})
+        return added
+
+    async def tick(self) -> BatchOutcome:
+        with TRIAGE_TICK.time():
+            now = time.monotonic()
+            async with SessionLocal() as db:
+                full = now >= self._next_resync
+                await self.refresh(db, full)
+                if full:
+                    self._next_resync = now + settings.triage_resync_seconds
+            self.ticks += 1
+
+            batch = self.queue.pop_batch(settings.triage_batch_size, now)
+            if not batch:
+                return BatchOutcome([], [], [])
+            try:
+                outcome = await dispatch_batch([entry.incident_id for entry in batch])
+            except BaseException:
+                self.queue.requeue(batch)
+                raise
+            unmatched = set(outcome.unmatched)
+            self.queue.requeue([e for e in batch if e.incident_id in unmatched], now + settings.triage_retry_seconds)
+            self.offered += len(outcome.offered)
+            return outcome
+
+    async def run(self, interval_seconds: float) -> None:
+        """Tick every ``interval_seconds`` until ``stop``; a tick in progress is finished, not cancelled."""
+        self._stop.clear()
+        self.running = True
+        try:
+            await self._run(interval_seconds)
+        finally:
+            self.running = False
+            self._reopened.clear()
+
+    async def _run(self, interval_seconds: float) -> None:
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._stop.wait(), interval_seconds)
+            except TimeoutError:
+                pass
+            if self._stop.is_set():
+                break
+            if not readiness.ready:
+                continue
+            try:
+                await self.tick()
+            except Exception:  # noqa: BLE001
+                logger.exception("Triage scheduler tick failed")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> dict:
+        return {**self.queue.stats(), "offered": self.offered, "ticks": self.ticks}
+
+
+triage_scheduler = TriageScheduler(settings.triage_aging_per_minute)
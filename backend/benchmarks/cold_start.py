@@ -0,0 +1,124 @@
+"""Measure worker cold start against a target.
+
+Each run starts a fresh ``uvicorn app.main:app`` process and polls it:
+
+- live: first 200 from ``/health`` (process imported, lifespan started),
+- ready: first 200 from ``/ready`` (pool pre-warmed, read models loaded);
+  only reached with a reachable, migrated database.
+
+It also times ``import app.main`` in a fresh interpreter, which is the floor
+for "live". The medians are checked against the targets; the exit status is
+1 when one is missed, so the script can gate a deploy. The default targets
+are what an autoscaled worker needs to absorb a surge before the scaler
+gives up on it: live within 3 s, ready within 10 s.
+
+Usage (from backend/):
+
+    python -m benchmarks.cold_start --runs 5
+    python -m benchmarks.cold_start --live-target-ms 2000 --ready-target-ms 5000 --no-ready
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Optional
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _ok(url: str) -> bool:
+    try:
+        with urllib.request.urlopen(url, timeout=0.5) as response:
+            return response.status == 200
+    except (urllib.error.URLError, OSError):
+        return False
+
+
+def import_seconds() -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def start_once(wait_ready: bool, timeout: float) -> tuple[Optional[float], Optional[float]]:
+    """(seconds to live, seconds to ready) for one fresh worker; None if not reached."""
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    live = ready = None
+    try:
+        while time.perf_counter() - start < timeout and proc.poll() is None:
+            if live is None and _ok(base + "/health"):
+                live = time.perf_counter() - start
+                if not wait_ready:
+                    break
+            if live is not None and _ok(base + "/ready"):
+                ready = time.perf_counter() - start
+                break
+            time.sleep(0.01)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return live, ready
+
+
+def _median_ms(values: list[Optional[float]]) -> Optional[float]:
+    reached = [v for v in values if v is not None]
+    if len(reached) < len(values):
+        return None
+    return statistics.median(reached) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--live-target-ms", type=float, default=3000)
+    parser.add_argument("--ready-target-ms", type=float, default=10000)
+    parser.add_argument("--no-ready", action="store_true", help="only measure liveness (no database)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-run limit in seconds")
+    args = parser.parse_args()
+
+    imports = [import_seconds() for _ in range(args.runs)]
+    runs = [start_once(not args.no_ready, args.timeout) for _ in range(args.runs)]
+
+    checks = [
+        ("import app.main", _median_ms(imports), None),
+        ("live (/health)", _median_ms([r[0] for r in runs]), args.live_target_ms),
+    ]
+    if not args.no_ready:
+        checks.append(("ready (/ready)", _median_ms([r[1] for r in runs]), args.ready_target_ms))
+
+    failed = False
+    print(f"{'phase':<18} {'median ms':>10} {'target ms':>10}")
+    for name, value, target in checks:
+        shown = "not reached" if value is None else f"{value:.0f}"
+        missed = target is not None and (value is None or value > target)
+        failed |= missed
+        print(f"{name:<18} {shown:>10} {'-' if target is None else f'{target:.0f}':>10}{'  MISSED' if missed else ''}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""Concurrency stress test for responder reservations.
+
+Seeds ``--responders`` responders, then for each worker count in
+``--workers`` creates ``--incidents`` fresh incidents and lets that many
+dispatchers auto-dispatch them at once (POST /dispatch/auto, ``--limit``
+offers each). A dispatcher immediately rejects ``--reject-rate`` of the
+offers it gets, so releases race with reservations. Fewer responders than
+offers wanted keeps the dispatchers competing for the same people.
+
+After each round the database is checked:
+
+- no responder holds more than one pending or accepted assignment,
+- no responder with such an assignment is marked available,
+- no responder without one is left unavailable (a leaked reservation).
+
+The report gives dispatches per second, latency and offers per round. The
+exit status is 1 when an invariant is violated or a dispatch failed.
+
+By default the app runs in-process over ASGI. Point ``--target`` at a
+server running several worker processes to check reservations across
+processes, whose in-memory responder indexes lag each other; start it with
+TRIAGE_ENABLED=false so its triage scheduler does not compete for the
+incidents (in-process, the scheduler is switched off). Either way
+the configured database (POSTGRES_HOST etc.) must be reachable for seeding
+and the checks; use a scratch database migrated with ``alembic upgrade head``.
+
+Usage (from backend/):
+
+    python -m benchmarks.dispatch_stress --workers 1 2 4 8 16
+    python -m benchmarks.dispatch_stress --target http://localhost:8000 --workers 8 32 --reject-rate 0.5
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+import uuid
+from contextlib import AsyncExitStack
+from typing import Optional
+
+import httpx
+from sqlalchemy import func, insert, select, update
+
+from app.config import get_settings
+from app.models import Assignment, AssignmentStatus, Responder, User, UserRole
+from app.security import create_access_token, get_password_hash
+
+
+CENTER = (12.97, 77.59)
+STRESS_ADMIN_EMAIL = "stress-admin@example.com"
+RESPONDER_EMAIL = "stress-responder-{}@example.com"
+ACTIVE = (AssignmentStatus.pending, AssignmentStatus.accepted)
+
+
+async def _seed(responders: int) -> tuple[str, list[int]]:
+    """A stress admin and ``responders`` responders near CENTER; returns (token, responder ids)."""
+    from app.db import SessionLocal
+
+    async with SessionLocal() as db:
+        admin = await db.scalar(select(User).where(User.email == STRESS_ADMIN_EMAIL))
+        if admin is None:
+            admin = User(email=STRESS_ADMIN_EMAIL, hashed_password=get_password_hash("stress"), role=UserRole.admin)
+            db.add(admin)
+            await db.commit()
+
+        pattern = RESPONDER_EMAIL.format("%")
+        have = await db.scalar(select(func.count(User.id)).where(User.email.like(pattern))) or 0
+        if have < responders:
+            rng = random.Random(have)
+            user_ids = (
+                await db.scalars(
+                    insert(User).returning(User.id, sort_by_parameter_order=True),
+                    [
+                        {
+                            "email": RESPONDER_EMAIL.format(i),
+                            "hashed_password": "!",
+                            "role": UserRole.responder,
+                            "is_active": True,
+                        }
+                        for i in range(have, responders)
+                    ],
+                )
+            ).all()
+            await db.execute(
+                insert(Responder),
+                [
+                    {
+                        "user_id": user_id,
+                        "display_name": f"Stress responder {user_id}",
+                        "skills": "rescue,medical",
+                        "trust_score": rng.uniform(0.3, 1.0),
+                        "location": (
+                            f"SRID=4326;POINT({CENTER[1] + rng.uniform(-0.1, 0.1)} "
+                            f"{CENTER[0] + rng.uniform(-0.1, 0.1)})"
+                        ),
+                        "is_available": True,
+                    }
+                    for user_id in user_ids
+                ],
+            )
+            await db.commit()
+
+        ids = (
+            await db.scalars(
+                select(Responder.id)
+                .join(User, User.id == Responder.user_id)
+                .where(User.email.like(pattern))
+                .order_by(Responder.id)
+                .limit(responders)
+            )
+        ).all()
+    token = create_access_token({"sub": str(admin.id), "role": UserRole.admin.value})
+    return token, list(ids)
+
+
+async def _reset(responder_ids: list[int], incidents: int, rng: random.Random) -> list[int]:
+    """Free the stress responders and create fresh incidents; returns their ids."""
+    from app.bulk import insert_incidents
+    from app.db import SessionLocal
+    from app.models import Incident
+
+    async with SessionLocal() as db:
+        await db.execute(
+            update(Assignment)
+            .where(Assignment.responder_id.in_(responder_ids), Assignment.status.in_(ACTIVE))
+            .values(status=AssignmentStatus.cancelled, expires_at=None)
+        )
+        await db.execute(update(Responder).where(Responder.id.in_(responder_ids)).values(is_available=True))
+        await db.commit()
+
+        tag = uuid.uuid4().hex
+        rows = [
+            {
+                # Distinct text and spread-out positions, so none is linked as a duplicate.
+                "description": f"stress {tag} {i} {uuid.uuid4().hex}",
+                "raw_text": None,
+                "category": "rescue",
+                "urgency": rng.choice(["critical", "urgent", "low"]),
+                "injured_count": None,
+                "trapped": None,
+                "water_level_m": None,
+                "address": None,
+                "lat": CENTER[0] + rng.uniform(-0.1, 0.1),
+                "lng": CENTER[1] + rng.uniform(-0.1, 0.1),
+            }
+            for i in range(incidents)
+        ]
+        facts, _ = await insert_incidents(db, rows, "created", ["stress test"] * incidents)
+        await db.commit()
+        # Fresh incidents are never duplicates of each other here, but make sure.
+        linked = await db.scalar(
+            select(func.count(Incident.id)).where(
+                Incident.id.in_([f.id for f in facts]), Incident.duplicate_of_id.is_not(None)
+            )
+        )
+        if linked:
+            print(f"warning: {linked} stress incidents were linked as duplicates and will be refused")
+    return [f.id for f in facts]
+
+
+async def _check(responder_ids: list[int]) -> dict:
+    from app.db import SessionLocal
+
+    active_exists = (
+        select(Assignment.id)
+        .where(Assignment.responder_id == Responder.id, Assignment.status.in_(ACTIVE))
+        .exists()
+    )
+    async with SessionLocal() as db:
+        double_booked = (
+            await db.execute(
+                select(Assignment.responder_id)
+                .where(Assignment.responder_id.in_(responder_ids), Assignment.status.in_(ACTIVE))
+                .group_by(Assignment.responder_id)
+                .having(func.count(Assignment.id) > 1)
+            )
+        ).all()
+        available_but_booked = await db.scalar(
+            select(func.count(Responder.id)).where(
+                Responder.id.in_(responder_ids), Responder.is_available.is_(True), active_exists
+            )
+        )
+        leaked = await db.scalar(
+            select(func.count(Responder.id)).where(
+                Responder.id.in_(responder_ids), Responder.is_available.is_(False), ~active_exists
+            )
+        )
+    return {
+        "double_booked": len(double_booked),
+        "available_but_booked": available_but_booked or 0,
+        "leaked_reservations": leaked or 0,
+    }
+
+
+async def _dispatcher(
+    client: httpx.AsyncClient,
+    prefix: str,
+    incident_ids: list[int],
+    limit: int,
+    reject_rate: float,
+    rng: random.Random,
+    stats: dict,
+) -> None:
+    for incident_id in incident_ids:
+        start = time.perf_counter()
+        r = await client.post(f"{prefix}/dispatch/auto", json={"incident_id": incident_id, "limit": limit})
+        stats["latencies"].append(time.perf_counter() - start)
+        if r.status_code >= 400:
+            stats["errors"] += 1
+            continue
+        offers = r.json()
+        stats["offers"] += len(offers)
+        stats["empty"] += not offers
+        for offer in offers:
+            if rng.random() < reject_rate:
+                r = await client.post(f"{prefix}/assignments/{offer['id']}/reject")
+                stats["errors"] += r.status_code >= 400
+                stats["rejected"] += r.status_code < 400
+
+
+async def _round(
+    client: httpx.AsyncClient, prefix: str, workers: int, responder_ids: list[int], args, rng: random.Random
+) -> dict:
+    incident_ids = await _reset(responder_ids, args.incidents, rng)
+    if args.target is None:
+        # The in-process index saw the reset only in the database.
+        from app.db import SessionLocal
+        from app.dispatch import dispatch_cache
+        from app.spatial import responder_index
+
+        async with SessionLocal() as db:
+            await responder_index.load(db)
+        dispatch_cache.clear()
+
+    stats = {"latencies": [], "errors": 0, "offers": 0, "empty": 0, "rejected": 0}
+    shares = [incident_ids[i::workers] for i in range(workers)]
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            _dispatcher(client, prefix, share, args.limit, args.reject_rate, random.Random(rng.random()), stats)
+            for share in shares
+        )
+    )
+    elapsed = time.perf_counter() - start
+    latencies = sorted(stats["latencies"])
+    return {
+        "workers": workers,
+        "dispatches": len(latencies),
+        "seconds": elapsed,
+        "per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+        "offers": stats["offers"],
+        "rejected": stats["rejected"],
+        "no_offer": stats["empty"],
+        "errors": stats["errors"],
+        **await _check(responder_ids),
+    }
+
+
+def _conflicts() -> Optional[float]:
+    from app.metrics import RESERVATION_CONFLICTS
+
+    return RESERVATION_CONFLICTS._value.get()
+
+
+async def run(args) -> int:
+    from app.db import dispose_engine, init_engine, ping
+
+    init_engine()
+    if not await ping(3):
+        print("database unreachable; configure POSTGRES_HOST etc. for a scratch database")
+        return 1
+    token, responder_ids = await _seed(args.responders)
+    prefix = get_settings().api_v1_prefix
+    rng = random.Random(args.seed)
+
+    async with AsyncExitStack() as stack:
+        if args.target is None:
+            from app.lifecycle import readiness
+            from app.main import app
+
+            # The stress dispatchers should be the only ones offering these incidents.
+            get_settings().triage_enabled = False
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            while not readiness.ready:
+                await asyncio.sleep(0.05)
+            transport = httpx.ASGITransport(app=app)
+            client = httpx.AsyncClient(transport=transport, base_url="http://stress")
+        else:
+            limits = httpx.Limits(max_connections=max(args.workers) * 2)
+            client = httpx.AsyncClient(base_url=args.target, limits=limits)
+        client.headers["Authorization"] = f"Bearer {token}"
+        client.timeout = 60.0
+        await stack.enter_async_context(client)
+
+        failed = False
+        header = (
+            f"{'workers':>7} {'disp/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'offers':>7} {'reject':>7} {'none':>6} "
+            f"{'conflicts':>9} {'errors':>6} {'double':>6} {'avail':>6} {'leaked':>6}"
+        )
+        print(header)
+        for workers in args.workers:
+            before = _conflicts() if args.target is None else None
+            r = await _round(client, prefix, workers, responder_ids, args, rng)
+            conflicts = "-" if before is None else f"{_conflicts() - before:.0f}"
+            bad = r["double_booked"] + r["available_but_booked"] + r["leaked_reservations"] + r["errors"]
+            failed |= bad > 0
+            print(
+                f"{workers:>7} {r['per_second']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['offers']:>7} "
+                f"{r['rejected']:>7} {r['no_offer']:>6} {conflicts:>9} {r['errors']:>6} {r['double_booked']:>6} "
+                f"{r['available_but_booked']:>6} {r['leaked_reservations']:>6}{'  FAILED' if bad else ''}"
+            )
+    await dispose_engine()
+    return 1 if failed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--responders", type=int, default=300)
+    parser.add_argument("--incidents", type=int, default=400, help="fresh incidents per round")
+    parser.add_argument("--limit", type=int, default=2, help="offers wanted per dispatch")
+    parser.add_argument("--reject-rate", type=float, default=0.3)
+    parser.add_argument("--target", help="base URL of a running server (default: the app in-process)")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Measure password verifications per second for different hashing pool sizes.
+
+Usage (from backend/):
+
+    python -m benchmarks.login_throughput --pool-sizes 1 2 4 8 --logins 200
+"""
+import argparse
+import asyncio
+import time
+
+from app.hashing import PasswordHasher, PasswordHasherBusy, pwd_context
+
+
+async def _run(workers: int, logins: int, concurrency: int, max_pending: int, hashed: str) -> dict:
+    hasher = PasswordHasher(workers, max_pending)
+    # Start the worker processes before timing.
+    await asyncio.gather(*(hasher.verify("warmup", hashed) for _ in range(workers)))
+
+    semaphore = asyncio.Semaphore(concurrency)
+    ok = 0
+    rejected = 0
+
+    async def one_login():
+        nonlocal ok, rejected
+        async with semaphore:
+            try:
+                valid, _ = await hasher.verify("correct horse", hashed)
+                ok += int(valid)
+            except PasswordHasherBusy:
+                rejected += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    hasher.shutdown()
+    return {
+        "workers": workers,
+        "logins": logins,
+        "ok": ok,
+        "rejected": rejected,
+        "seconds": elapsed,
+        "logins_per_second": ok / elapsed if elapsed else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--max-pending", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    hashed = pwd_context.hash("correct horse")
+    print(f"{'workers':>8} {'ok':>6} {'rejected':>9} {'seconds':>9} {'logins/s':>9}")
+    for workers in args.pool_sizes:
+        r = asyncio.run(_run(workers, args.logins, args.concurrency, args.max_pending, hashed))
+        print(f"{r['workers']:>8} {r['ok']:>6} {r['rejected']:>9} {r['seconds']:>9.2f} {r['logins_per_second']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
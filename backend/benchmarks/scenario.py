@@ -0,0 +1,383 @@
+"""Synthetic disaster scenarios replayed against a running API.
+
+A scenario is a timed list of actions generated from a seed, so the same
+seed and parameters always give the same scenario:
+
+- incident reports following a surge curve that ramps up to a peak and
+  decays (POST /incidents/),
+- SMS bursts when a cell network comes back, including gateway retries
+  (POST /sms/inbound, batched),
+- responders moving toward the epicentre, pinging once a second
+  (POST /responders/locations),
+- status progressions of reported incidents (PATCH /incidents/{id}/status),
+- repeated auto-dispatch of open incidents (POST /dispatch/auto).
+
+Setup (registering responder users and creating their profiles) runs before
+the clock starts and is not measured. The report gives throughput,
+p50/p99 latency per route, and time-to-assignment: the time from an
+incident's creation to the first dispatch call that returned an assignment.
+
+Usage (from backend/, against a running server and an existing admin):
+
+    python -m benchmarks.scenario generate --seed 7 --duration 120 --peak-rate 40 -o flood.json
+    python -m benchmarks.scenario run flood.json --target http://localhost:8000 \\
+        --admin-email admin@example.com --admin-password secret --speed 2
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import statistics
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional
+
+import httpx
+
+
+URGENT_TEMPLATES = [
+    "Building collapse near the market, {n} injured and people trapped",
+    "Water level rising, water {w}m inside homes, family trapped on roof",
+    "Man unconscious after the flood, not breathing properly",
+    "Fire after gas leak, {n} injured",
+]
+ROUTINE_TEMPLATES = [
+    "No food and no water for {n} families",
+    "Road blocked by debris, need clearing",
+    "Need supplies for the shelter at the school",
+]
+STATUS_PATH = ["triaged", "assigned", "en_route", "arrived", "resolved"]
+
+
+@dataclass
+class ScenarioParams:
+    seed: int = 1
+    duration_s: float = 60.0
+    peak_rate: float = 20.0  # incident reports per second at the peak
+    peak_at: float = 0.3  # fraction of the duration
+    center_lat: float = 12.97
+    center_lng: float = 77.59
+    spread_km: float = 8.0
+    responders: int = 50
+    sms_bursts: int = 3
+    sms_burst_size: int = 200
+    sms_retry_fraction: float = 0.2
+    dispatch_fraction: float = 0.6
+    dispatch_delay_s: float = 2.0
+    progress_fraction: float = 0.5
+
+
+def _surge_rate(t: float, p: ScenarioParams) -> float:
+    """Gamma-shaped arrival curve peaking at ``peak_rate`` at ``peak_at``."""
+    tp = max(p.peak_at * p.duration_s, 1e-6)
+    x = t / tp
+    return p.peak_rate * x * math.exp(1 - x)
+
+
+def _jitter(rng: random.Random, p: ScenarioParams, spread_km: Optional[float] = None) -> tuple[float, float]:
+    spread_km = p.spread_km if spread_km is None else spread_km
+    km_lat = rng.gauss(0, spread_km / 2)
+    km_lng = rng.gauss(0, spread_km / 2)
+    lat = p.center_lat + km_lat / 111.32
+    lng = p.center_lng + km_lng / (111.32 * math.cos(math.radians(p.center_lat)))
+    return round(lat, 6), round(lng, 6)
+
+
+def generate(p: ScenarioParams) -> dict:
+    """Build the scenario; a pure function of ``p``."""
+    rng = random.Random(p.seed)
+    actions: list[dict] = []
+
+    responders = []
+    for i in range(p.responders):
+        lat, lng = _jitter(rng, p, p.spread_km * 4)
+        responders.append({"ref": i, "lat": lat, "lng": lng, "skills": rng.choice(["medic", "boat", "rescue"])})
+
+    # Incident reports: non-homogeneous Poisson arrivals by thinning.
+    t, ref = 0.0, 0
+    while True:
+        t += rng.expovariate(p.peak_rate)
+        if t >= p.duration_s:
+            break
+        if rng.random() > _surge_rate(t, p) / p.peak_rate:
+            continue
+        urgent = rng.random() < 0.4
+        template = rng.choice(URGENT_TEMPLATES if urgent else ROUTINE_TEMPLATES)
+        lat, lng = _jitter(rng, p)
+        actions.append(
+            {
+                "t": round(t, 4),
+                "kind": "incident",
+                "ref": ref,
+                "body": {
+                    "description": template.format(n=rng.randint(1, 12), w=round(rng.uniform(0.3, 3.0), 1)),
+                    "location": {"lat": lat, "lng": lng},
+                },
+            }
+        )
+        if rng.random() < p.dispatch_fraction:
+            actions.append({"t": round(t + p.dispatch_delay_s, 4), "kind": "dispatch", "ref": ref})
+        if rng.random() < p.progress_fraction:
+            step_t = t
+            for status in STATUS_PATH[: rng.randint(1, len(STATUS_PATH))]:
+                step_t += rng.uniform(1.0, 8.0)
+                actions.append({"t": round(step_t, 4), "kind": "status", "ref": ref, "status": status})
+        ref += 1
+
+    # SMS bursts: a backlog released at once, with some gateway retries.
+    base = datetime(2024, 1, 1) + timedelta(days=p.seed % 365)
+    for b in range(p.sms_bursts):
+        burst_t = rng.uniform(0.1, 0.9) * p.duration_s
+        messages = []
+        for i in range(p.sms_burst_size):
+            lat, lng = _jitter(rng, p)
+            urgency = rng.choice(["critical", "urgent", "low"])
+            messages.append(
+                {
+                    "from_number": f"+9199{rng.randint(10_000_000, 99_999_999)}",
+                    "body": f"{urgency};{lat};{lng};{rng.choice(URGENT_TEMPLATES).format(n=2, w=1.0)}",
+                    "received_at": (base + timedelta(seconds=burst_t - rng.uniform(0, 3600))).isoformat(),
+                    "message_id": f"s{p.seed}-b{b}-m{i}",
+                }
+            )
+        retries = rng.sample(messages, int(len(messages) * p.sms_retry_fraction))
+        for offset, chunk in enumerate(range(0, len(messages), 100)):
+            batch = messages[chunk:chunk + 100]
+            actions.append({"t": round(burst_t + offset * 0.05, 4), "kind": "sms", "messages": batch})
+        if retries:
+            actions.append({"t": round(burst_t + 5.0, 4), "kind": "sms", "messages": retries})
+
+    # Responders converge on the epicentre, one batched ping per second.
+    positions = [(r["lat"], r["lng"]) for r in responders]
+    for second in range(int(p.duration_s)):
+        pings = []
+        for i, (lat, lng) in enumerate(positions):
+            lat += (p.center_lat - lat) * 0.02 + rng.gauss(0, 0.0005)
+            lng += (p.center_lng - lng) * 0.02 + rng.gauss(0, 0.0005)
+            positions[i] = (lat, lng)
+            pings.append({"responder": i, "lat": round(lat, 6), "lng": round(lng, 6)})
+        if pings:
+            actions.append({"t": float(second), "kind": "pings", "pings": pings})
+
+    actions.sort(key=lambda a: a["t"])
+    return {"params": p.__dict__, "responders": responders, "actions": actions}
+
+
+@dataclass
+class Recorder:
+    latencies: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    errors: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    created_at: dict[int, float] = field(default_factory=dict)
+    assigned_after: dict[int, float] = field(default_factory=dict)
+
+    def record(self, route: str, seconds: float, ok: bool) -> None:
+        self.latencies[route].append(seconds)
+        if not ok:
+            self.errors[route] += 1
+
+
+class Runner:
+    def __init__(self, client: httpx.AsyncClient, prefix: str, speed: float, concurrency: int):
+        self.client = client
+        self.prefix = prefix
+        self.speed = speed
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.recorder = Recorder()
+        self.incident_ids: dict[int, int] = {}
+        self.responder_ids: dict[int, int] = {}
+
+    async def _call(self, route: str, method: str, path: str, **kwargs) -> Optional[httpx.Response]:
+        async with self.semaphore:
+            start = time.perf_counter()
+            try:
+                response = await self.client.request(method, self.prefix + path, **kwargs)
+            except httpx.HTTPError:
+                self.recorder.record(route, time.perf_counter() - start, False)
+                return None
+            self.recorder.record(route, time.perf_counter() - start, response.status_code < 400)
+            return response
+
+    async def setup(self, responders: list[dict]) -> None:
+        run_tag = uuid.uuid4().hex[:8]
+        for r in responders:
+            email = f"scenario-{run_tag}-{r['ref']}@example.com"
+            user = await self.client.post(
+                f"{self.prefix}/auth/register",
+                json={"email": email, "password": "scenario-pass", "role": "responder"},
+            )
+            user.raise_for_status()
+            responder = await self.client.post(
+                f"{self.prefix}/responders/",
+                json={
+                    "user_id": user.json()["id"],
+                    "display_name": f"Scenario responder {r['ref']}",
+                    "skills": r["skills"],
+                    "location": {"lat": r["lat"], "lng": r["lng"]},
+                },
+            )
+            responder.raise_for_status()
+            self.responder_ids[r["ref"]] = responder.json()["id"]
+
+    async def _act(self, action: dict) -> None:
+        kind = action["kind"]
+        if kind == "incident":
+            created = time.perf_counter()
+            r = await self._call("POST /incidents/", "POST", "/incidents/", json=action["body"])
+            if r is not None and r.status_code < 400:
+                self.incident_ids[action["ref"]] = r.json()["id"]
+                self.recorder.created_at[action["ref"]] = created
+        elif kind == "sms":
+            await self._call("POST /sms/inbound", "POST", "/sms/inbound", json={"messages": action["messages"]})
+        elif kind == "pings":
+            pings = [
+                {"responder_id": self.responder_ids[p["responder"]], "location": {"lat": p["lat"], "lng": p["lng"]}}
+                for p in action["pings"]
+                if p["responder"] in self.responder_ids
+            ]
+            await self._call("POST /responders/locations", "POST", "/responders/locations", json={"pings": pings})
+        elif kind == "status":
+            incident_id = self.incident_ids.get(action["ref"])
+            if incident_id is not None:
+                await self._call(
+                    "PATCH /incidents/{id}/status",
+                    "PATCH",
+                    f"/incidents/{incident_id}/status",
+                    json={"status": action["status"]},
+                )
+        elif kind == "dispatch":
+            incident_id = self.incident_ids.get(action["ref"])
+            if incident_id is None:
+                return
+            body = {"incident_id": incident_id, "limit": 1}
+            r = await self._call("POST /dispatch/auto", "POST", "/dispatch/auto", json=body)
+            ref = action["ref"]
+            if r is not None and r.status_code < 400 and r.json() and ref not in self.recorder.assigned_after:
+                self.recorder.assigned_after[ref] = time.perf_counter() - self.recorder.created_at[ref]
+
+    async def run(self, actions: list[dict]) -> float:
+        start = time.perf_counter()
+        tasks = []
+        for action in actions:
+            delay = action["t"] / self.speed - (time.perf_counter() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(self._act(action)))
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - start
+
+
+def _pct(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def report(recorder: Recorder, elapsed: float) -> dict:
+    routes = {}
+    total = 0
+    for route, values in sorted(recorder.latencies.items()):
+        total += len(values)
+        routes[route] = {
+            "requests": len(values),
+            "errors": recorder.errors.get(route, 0),
+            "p50_ms": statistics.median(values) * 1000,
+            "p99_ms": _pct(values, 0.99) * 1000,
+            "per_second": len(values) / elapsed,
+        }
+    tta = list(recorder.assigned_after.values())
+    return {
+        "elapsed_s": elapsed,
+        "requests": total,
+        "throughput_rps": total / elapsed if elapsed else 0.0,
+        "routes": routes,
+        "time_to_assignment": {
+            "assigned": len(tta),
+            "p50_s": statistics.median(tta) if tta else None,
+            "p99_s": _pct(tta, 0.99) if tta else None,
+        },
+    }
+
+
+def _print_report(result: dict) -> None:
+    print(f"\n{result['requests']} requests in {result['elapsed_s']:.1f}s ({result['throughput_rps']:.1f} req/s)")
+    print(f"{'route':<34} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9}")
+    for route, r in result["routes"].items():
+        print(
+            f"{route:<34} {r['requests']:>9} {r['errors']:>7} {r['per_second']:>8.1f} "
+            f"{r['p50_ms']:>9.1f} {r['p99_ms']:>9.1f}"
+        )
+    tta = result["time_to_assignment"]
+    if tta["assigned"]:
+        print(f"time to assignment: {tta['assigned']} incidents, p50 {tta['p50_s']:.2f}s, p99 {tta['p99_s']:.2f}s")
+    else:
+        print("time to assignment: no incident was assigned")
+
+
+async def _run(args) -> dict:
+    with open(args.scenario) as fh:
+        scenario = json.load(fh)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.target, timeout=30.0, limits=limits) as client:
+        token = args.token
+        if token is None:
+            r = await client.post(
+                f"{args.prefix}/auth/token",
+                data={"username": args.admin_email, "password": args.admin_password},
+            )
+            r.raise_for_status()
+            token = r.json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+
+        runner = Runner(client, args.prefix, args.speed, args.concurrency)
+        await runner.setup(scenario["responders"])
+        elapsed = await runner.run(scenario["actions"])
+    return report(runner.recorder, elapsed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    gen = sub.add_parser("generate", help="write a scenario file")
+    defaults = ScenarioParams()
+    for name, value in defaults.__dict__.items():
+        gen.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    gen.add_argument("-o", "--output", required=True)
+
+    run = sub.add_parser("run", help="replay a scenario file against an API")
+    run.add_argument("scenario")
+    run.add_argument("--target", default="http://localhost:8000")
+    run.add_argument("--prefix", default="/api/v1")
+    run.add_argument("--token", help="admin bearer token (instead of email/password)")
+    run.add_argument("--admin-email")
+    run.add_argument("--admin-password")
+    run.add_argument("--speed", type=float, default=1.0, help="time compression; 2 replays twice as fast")
+    run.add_argument("--concurrency", type=int, default=100)
+    run.add_argument("--report", help="also write the report as JSON here")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        params = ScenarioParams(**{name: getattr(args, name) for name in defaults.__dict__})
+        scenario = generate(params)
+        with open(args.output, "w") as fh:
+            json.dump(scenario, fh)
+        kinds = defaultdict(int)
+        for action in scenario["actions"]:
+            kinds[action["kind"]] += 1
+        print(f"wrote {len(scenario['actions'])} actions to {args.output}: {dict(kinds)}")
+        return
+
+    if args.token is None and not (args.admin_email and args.admin_password):
+        parser.error("run needs --token or --admin-email and --admin-password")
+    result = asyncio.run(_run(args))
+    _print_report(result)
+    if args.report:
+        with open(args.report, "w") as fh:
+            json.dump(result, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
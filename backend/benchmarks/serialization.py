@@ -0,0 +1,91 @@
+"""Compare the default response_model encoding of list pages with app.fastjson.
+
+The default path builds ORM instances, validates each through the pydantic
+``*Out`` schema (``from_attributes``) and renders with JSONResponse; the
+fast path encodes the selected column tuples with orjson. Both run on the
+same synthetic rows, and the outputs are checked to be byte-identical. No
+database is needed.
+
+Usage (from backend/):
+
+    python -m benchmarks.serialization --rows 500 5000 50000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.fastjson import encode_rows
+from app.models import Incident, IncidentStatus
+from app.schemas import IncidentOut
+
+
+FIELDS = list(IncidentOut.model_fields)
+
+
+def _rows(n: int, seed: int = 7) -> list[tuple]:
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    statuses = list(IncidentStatus)
+    rows = []
+    for i in range(n):
+        created = start + timedelta(seconds=rng.randint(0, 10_000_000), microseconds=rng.randint(0, 999_999))
+        rows.append(
+            (
+                i + 1,
+                rng.choice([None, rng.randint(1, 1000)]),
+                f"Flooding near block {i}, água subindo — {rng.randint(1, 9)} trapped",
+                rng.choice(["flood", "medical", "rescue", None]),
+                rng.choice(["critical", "urgent", "low", None]),
+                rng.choice([None, rng.randint(0, 12)]),
+                rng.choice([None, True, False]),
+                rng.choice([None, round(rng.uniform(0, 4), 2)]),
+                rng.choice([None, f"{rng.randint(1, 999)} Main St"]),
+                rng.choice(statuses),
+                created,
+                created + timedelta(minutes=rng.randint(0, 600)),
+            )
+        )
+    return rows
+
+
+def _default_path(rows: list[tuple]) -> bytes:
+    adapter = TypeAdapter(list[IncidentOut])
+    objects = [Incident(**dict(zip(FIELDS, row))) for row in rows]
+    validated = adapter.validate_python(objects, from_attributes=True)
+    return JSONResponse(adapter.dump_python(validated, mode="json")).body
+
+
+def _fast_path(rows: list[tuple]) -> bytes:
+    return encode_rows(rows, FIELDS)
+
+
+def _time(fn, rows, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[500, 5000, 50000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'default ms':>11} {'fast ms':>9} {'speedup':>8} {'identical':>10}")
+    for n in args.rows:
+        rows = _rows(n)
+        identical = _default_path(rows) == _fast_path(rows)
+        default = _time(_default_path, rows, args.repeat)
+        fast = _time(_fast_path, rows, args.repeat)
+        print(f"{n:>8} {default * 1000:>11.1f} {fast * 1000:>9.1f} {default / fast:>7.1f}x {str(identical):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,544 @@
+"""Microbenchmarks for the backend hot paths, with baseline comparison.
+
+In-memory cases always run: responder ranking for fleets of 100 to 100k,
+road travel times on a synthetic street grid, the text classifier and
+extractor, near-duplicate lookup among 100k active incidents, a triage
+micro-batch from 100k queued incidents, and JWT decoding with and without
+the token/user caches.
+Database cases run when the configured Postgres/PostGIS is reachable
+(POSTGRES_HOST etc., as for the app). They cover
+score_responders_for_incident and the user lookup on a cache miss, and
+drive the app in-process over ASGI for create_incident, list_incidents
+(first page and deep keyset paging), analytics summary/hotspots and a
+hotspot tile. They write a benchmark admin and ``--seed-incidents``
+incidents, so point them at a scratch database migrated with
+``alembic upgrade head``.
+
+Usage (from backend/):
+
+    python -m benchmarks.suite --save baseline.json
+    python -m benchmarks.suite --compare baseline.json --tolerance 0.15
+    python -m benchmarks.suite --only dispatch --no-db
+
+With --compare, any case whose median is more than --tolerance slower than
+the baseline is reported and the exit status is 1.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+
+import numpy as np
+
+from app.capabilities import CAPABILITIES, incident_needs
+from app.config import get_settings
+from app.dedup import DuplicateIndex, signature, signatures
+from app.ml import classify_text, extract_structured
+from app.models import UserRole
+from app.routing import RoadGraph
+from app.scoring import rank_fleet
+from app.security import (
+    AuthenticatedUser,
+    decode_token,
+    create_access_token,
+    get_current_user,
+    token_cache,
+    user_cache,
+)
+from app.spatial import ResponderEntry, ResponderIndex
+from app.triage import TriageQueue
+
+
+FLEET_SIZES = (100, 1_000, 10_000, 100_000)
+CENTER = (12.97, 77.59)
+BENCH_ADMIN_EMAIL = "bench-admin@example.com"
+
+SAMPLE_TEXTS = [
+    "Building collapse on 5th street, 3 injured and two people trapped",
+    "Water level rising fast, water 1.5m in the ground floor",
+    "Elderly man unconscious, not breathing properly",
+    "We have no food and no water since yesterday",
+    "Road blocked by a fallen tree, nobody hurt",
+    "Fire spreading to the next block, 12 injured",
+]
+
+
+@dataclass
+class Case:
+    name: str
+    fn: Callable[[], Awaitable[None]]
+    inner: int = 1  # calls per timed sample
+    samples: int = 30
+    setup: Optional[Callable[[], Awaitable[None]]] = None
+    teardown: Optional[Callable[[], Awaitable[None]]] = None
+
+
+@dataclass
+class Result:
+    name: str
+    median_ms: float
+    p95_ms: float
+    ops_per_second: float
+
+    def as_dict(self) -> dict:
+        return {"median_ms": self.median_ms, "p95_ms": self.p95_ms, "ops_per_second": self.ops_per_second}
+
+
+async def measure(case: Case, warmup: int = 3) -> Result:
+    for _ in range(warmup):
+        await case.fn()
+    per_call = []
+    for _ in range(case.samples):
+        start = time.perf_counter()
+        for _ in range(case.inner):
+            await case.fn()
+        per_call.append((time.perf_counter() - start) / case.inner)
+    per_call.sort()
+    median = statistics.median(per_call)
+    p95 = per_call[min(len(per_call) - 1, int(len(per_call) * 0.95))]
+    return Result(case.name, median * 1000, p95 * 1000, 1 / median if median else float("inf"))
+
+
+def _fleet(index: ResponderIndex, size: int, seed: int = 11) -> None:
+    rng = random.Random(seed)
+    # Separate stream, so positions match fleets built before capabilities.
+    caps = random.Random(seed + 1)
+    for i in range(size):
+        index.upsert(
+            ResponderEntry(
+                id=i + 1,
+                user_id=i + 1,
+                lat=CENTER[0] + rng.uniform(-1.0, 1.0),
+                lon=CENTER[1] + rng.uniform(-1.0, 1.0),
+                trust_score=rng.uniform(0.2, 1.0),
+                is_available=rng.random() < 0.8,
+                capabilities=caps.getrandbits(len(CAPABILITIES)),
+            )
+        )
+
+
+def _road_grid(n: int, step_deg: float = 0.002, seed: int = 13) -> RoadGraph:
+    """n x n two-way street grid around CENTER, ~220 m blocks at 20-40 km/h."""
+    rng = np.random.default_rng(seed)
+    rows, cols = np.divmod(np.arange(n * n), n)
+    lat = CENTER[0] + (rows - n / 2) * step_deg
+    lon = CENTER[1] + (cols - n / 2) * step_deg
+    ids = np.arange(n * n).reshape(n, n)
+    pairs = np.concatenate(
+        [
+            np.stack([ids[:, :-1].ravel(), ids[:, 1:].ravel()], axis=1),
+            np.stack([ids[:-1, :].ravel(), ids[1:, :].ravel()], axis=1),
+        ]
+    )
+    tails = np.concatenate([pairs[:, 0], pairs[:, 1]])
+    heads = np.concatenate([pairs[:, 1], pairs[:, 0]])
+    seconds = step_deg * 111.32 / rng.uniform(20, 40, len(tails)) * 3600
+    graph = RoadGraph(lat, lon, tails, heads, seconds)
+    graph.build_landmarks(8)
+    return graph
+
+
+def memory_cases() -> list[Case]:
+    cases = []
+    for size in FLEET_SIZES:
+        index = ResponderIndex()
+        _fleet(index, size)
+
+        async def rank(index=index):
+            fleet = index.candidates(CENTER[0], CENTER[1], 50.0)
+            rank_fleet(CENTER[0], CENTER[1], "critical", fleet, 50.0, 20)
+
+        cases.append(Case(f"dispatch.rank[fleet={size}]", rank, inner=5 if size >= 10_000 else 50))
+
+    index = ResponderIndex()
+    _fleet(index, 10_000)
+    flood = incident_needs("flood", trapped=True, injured_count=2, water_level_m=1.5)
+
+    async def rank_needs():
+        fleet = index.candidates(CENTER[0], CENTER[1], 50.0)
+        rank_fleet(CENTER[0], CENTER[1], "critical", fleet, 50.0, 20, needs=flood)
+
+    cases.append(Case("dispatch.rank[fleet=10000,needs=flood]", rank_needs, inner=5))
+
+    road: dict[str, object] = {}
+
+    async def setup_road():
+        if not road:
+            road["graph"] = _road_grid(150)
+            index = ResponderIndex()
+            _fleet(index, 1_000)
+            fleet = index.candidates(CENTER[0], CENTER[1], 50.0)
+            # Pull the fleet into the grid's ~33 km square, about 4 km around CENTER.
+            fleet.lat = CENTER[0] + (fleet.lat - CENTER[0]) * 0.04
+            fleet.lon = CENTER[1] + (fleet.lon - CENTER[1]) * 0.04
+            road["fleet"] = fleet
+
+    async def road_uncached():
+        graph, fleet = road["graph"], road["fleet"]
+        graph.clear_cache()
+        graph.travel_minutes_to(CENTER[0] + 0.01, CENTER[1] - 0.01, fleet.lat, fleet.lon, 200.0)
+
+    async def road_rank():
+        graph, fleet = road["graph"], road["fleet"]
+        graph.clear_cache()
+        rank_fleet(CENTER[0] + 0.01, CENTER[1] - 0.01, "critical", fleet, 50.0, 20, graph)
+
+    cases.append(Case("routing.travel_minutes[grid=150x150,fleet=1000]", road_uncached, samples=20, setup=setup_road))
+    cases.append(Case("routing.rank[grid=150x150,fleet=1000]", road_rank, samples=20, setup=setup_road))
+
+    async def classify():
+        for text in SAMPLE_TEXTS:
+            classify_text(text)
+
+    async def extract():
+        for text in SAMPLE_TEXTS:
+            extract_structured(text)
+
+    cases.append(Case("ml.classify_text[x6]", classify, inner=500))
+    cases.append(Case("ml.extract_structured[x6]", extract, inner=500))
+
+    dedup: dict[str, object] = {}
+
+    async def setup_dedup():
+        if not dedup:
+            rng = random.Random(17)
+            words = " ".join(SAMPLE_TEXTS).lower().replace(",", "").split()
+            now = datetime.utcnow()
+            settings = get_settings()
+            index = DuplicateIndex(
+                settings.dedup_radius_m, settings.dedup_window_minutes, settings.dedup_min_similarity, 100_000
+            )
+
+            def report():
+                text = " ".join(rng.choices(words, k=rng.randint(6, 14)))
+                return text, CENTER[0] + rng.uniform(-0.15, 0.15), CENTER[1] + rng.uniform(-0.15, 0.15)
+
+            reports = [report() for _ in range(100_000)]
+            for i, ((_, lat, lng), sig) in enumerate(zip(reports, signatures([r[0] for r in reports]))):
+                index.add(i, lat, lng, now, sig)
+            dedup["index"], dedup["queries"], dedup["now"] = index, [report() for _ in range(1000)], now
+            dedup["next"] = 0
+
+    async def dedup_find():
+        # A new report: its signature plus the lookup.
+        text, lat, lng = dedup["queries"][dedup["next"] % 1000]
+        dedup["next"] += 1
+        dedup["index"].find(lat, lng, dedup["now"], signature(text))
+
+    cases.append(Case("dedup.find[active=100000]", dedup_find, inner=50, setup=setup_dedup))
+
+    triage: dict[str, object] = {}
+
+    async def setup_triage():
+        if not triage:
+            rng = random.Random(19)
+            now = datetime.utcnow()
+            queue = TriageQueue(get_settings().triage_aging_per_minute)
+            for i in range(100_000):
+                urgency = rng.choice(["critical", "urgent", "low", None])
+                injured = rng.choice([None, 0, 1, 3, 12])
+                queue.push(i, urgency, injured, rng.random() < 0.1, now - timedelta(minutes=rng.uniform(0, 600)))
+            triage["queue"] = queue
+
+    async def triage_pop():
+        # One scheduler tick's queue work: a micro-batch out, the unmatched half back in.
+        queue = triage["queue"]
+        batch = queue.pop_batch(50, now=0.0)
+        queue.requeue(batch[::2])
+        queue.requeue(batch[1::2], not_before=0.0)
+
+    cases.append(Case("triage.pop_batch[queued=100000]", triage_pop, inner=50, setup=setup_triage))
+
+    token = create_access_token({"sub": "424242", "role": UserRole.admin.value})
+    user_cache.set(424242, AuthenticatedUser(424242, "bench@example.com", UserRole.admin, True))
+
+    async def decode_uncached():
+        token_cache.invalidate(token)
+        decode_token(token)
+
+    async def decode_cached():
+        decode_token(token)
+
+    async def current_user_cached():
+        await get_current_user(token, None)  # cache hit, the session is never touched
+
+    cases.append(Case("security.decode_token", decode_uncached, inner=200))
+    cases.append(Case("security.decode_token[cached]", decode_cached, inner=2000))
+    cases.append(Case("security.get_current_user[cached]", current_user_cached, inner=2000))
+    return cases
+
+
+async def database_available() -> bool:
+    from app.db import init_engine, ping
+
+    init_engine()
+    return await ping(3)
+
+
+async def _prepare_database(seed_incidents: int):
+    """Tables, a benchmark admin and enough incidents; returns (admin, token)."""
+    from sqlalchemy import func, select
+
+    from app.bulk import insert_incidents
+    from app.db import SessionLocal
+    from app.models import Incident, User
+    from app.security import pwd_context
+
+    async with SessionLocal() as db:
+        admin = await db.scalar(select(User).where(User.email == BENCH_ADMIN_EMAIL))
+        if admin is None:
+            admin = User(
+                email=BENCH_ADMIN_EMAIL,
+                hashed_password=pwd_context.hash("bench-password"),
+                role=UserRole.admin,
+            )
+            db.add(admin)
+            await db.commit()
+
+        have = await db.scalar(select(func.count(Incident.id))) or 0
+        rng = random.Random(5)
+        while have < seed_incidents:
+            n = min(5000, seed_incidents - have)
+            rows = [
+                {
+                    "description": rng.choice(SAMPLE_TEXTS),
+                    "raw_text": None,
+                    "category": rng.choice(["flood", "medical", "rescue", "other"]),
+                    "urgency": rng.choice(["critical", "urgent", "low"]),
+                    "injured_count": None,
+                    "trapped": None,
+                    "water_level_m": None,
+                    "address": None,
+                    "lat": CENTER[0] + rng.uniform(-0.5, 0.5),
+                    "lng": CENTER[1] + rng.uniform(-0.5, 0.5),
+                }
+                for _ in range(n)
+            ]
+            await insert_incidents(db, rows, "created", ["benchmark seed"] * n, admin.id)
+            await db.commit()
+            have += n
+
+    token = create_access_token({"sub": str(admin.id), "role": UserRole.admin.value})
+    return admin, token
+
+
+async def database_cases(stack, seed_incidents: int) -> list[Case]:
+    import httpx
+    from sqlalchemy import select
+
+    from app import dispatch
+    from app.db import SessionLocal
+    from app.dispatch import dispatch_cache, score_responders_for_incident
+    from app.lifecycle import readiness
+    from app.main import app
+    from app.models import Incident
+    from app.tiles import mercator_xy
+
+    admin, token = await _prepare_database(seed_incidents)
+    # The triage scheduler would dispatch seeded incidents against the benchmark fleets.
+    get_settings().triage_enabled = False
+    await stack.enter_async_context(app.router.lifespan_context(app))
+    while not readiness.ready:
+        await asyncio.sleep(0.05)
+    client = await stack.enter_async_context(
+        httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://bench",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+    )
+    db = await stack.enter_async_context(SessionLocal())
+    prefix = get_settings().api_v1_prefix
+    cases = []
+
+    incident = await db.scalar(select(Incident).order_by(Incident.id).limit(1))
+    live_index = dispatch.responder_index
+
+    async def restore_fleet():
+        dispatch.responder_index = live_index
+        dispatch_cache.clear()
+
+    for size in FLEET_SIZES:
+        async def score(size=size):
+            dispatch_cache.clear()
+            await score_responders_for_incident(db, incident, max_radius_km=50.0, limit=20)
+
+        async def score_cached(size=size):
+            await score_responders_for_incident(db, incident, max_radius_km=50.0, limit=20)
+
+        async def setup_fleet(size=size):
+            # A synthetic fleet in its own index, swapped in for the case only:
+            # the app's index (and the real responders in it) stays untouched.
+            index = ResponderIndex()
+            _fleet(index, size)
+            index.loaded = True
+            dispatch.responder_index = index
+            dispatch_cache.clear()
+
+        cases.append(
+            Case(
+                f"dispatch.score_responders_for_incident[fleet={size}]",
+                score,
+                samples=20,
+                setup=setup_fleet,
+                teardown=restore_fleet,
+            )
+        )
+        cases.append(
+            Case(
+                f"dispatch.score_responders_for_incident[fleet={size},cached]",
+                score_cached,
+                inner=200,
+                setup=setup_fleet,
+                teardown=restore_fleet,
+            )
+        )
+
+    async def current_user_db():
+        user_cache.invalidate(admin.id)
+        await get_current_user(token, db)
+
+    cases.append(Case("security.get_current_user[db]", current_user_db, inner=20))
+
+    body = {"description": "Bench: water 1.2m, 2 injured", "location": {"lat": CENTER[0], "lng": CENTER[1]}}
+
+    async def create_incident():
+        r = await client.post(f"{prefix}/incidents/", json=body)
+        r.raise_for_status()
+
+    async def list_first_page():
+        r = await client.get(f"{prefix}/incidents/", params={"limit": 100})
+        r.raise_for_status()
+
+    async def list_ten_pages():
+        cursor = None
+        for _ in range(10):
+            params = {"limit": 100} | ({"cursor": cursor} if cursor else {})
+            r = await client.get(f"{prefix}/incidents/", params=params)
+            r.raise_for_status()
+            cursor = r.headers.get("x-next-cursor")
+            if cursor is None:
+                break
+
+    async def summary():
+        (await client.get(f"{prefix}/analytics/summary")).raise_for_status()
+
+    async def hotspots():
+        (await client.get(f"{prefix}/analytics/hotspots")).raise_for_status()
+
+    fx, fy = mercator_xy(CENTER[0], CENTER[1], 8)
+
+    async def tile():
+        (await client.get(f"{prefix}/analytics/hotspots/tiles/8/{int(fx)}/{int(fy)}")).raise_for_status()
+
+    cases += [
+        Case("http.create_incident", create_incident, inner=5),
+        Case("http.list_incidents[page=100]", list_first_page, inner=5),
+        Case("http.list_incidents[10 pages]", list_ten_pages, samples=15),
+        Case("http.analytics.summary", summary, inner=20),
+        Case("http.analytics.hotspots", hotspots, samples=15),
+        Case("http.analytics.hotspot_tile[z=8]", tile, inner=20),
+    ]
+    return cases
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict[str, Result], baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    print(f"\n{'case':<58} {'baseline ms':>12} {'now ms':>10} {'change':>8}")
+    for name, result in results.items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:<58} {'-':>12} {result.median_ms:>10.3f} {'new':>8}")
+            continue
+        change = result.median_ms / before["median_ms"] - 1
+        flag = "  REGRESSION" if change > tolerance else ""
+        print(f"{name:<58} {before['median_ms']:>12.3f} {result.median_ms:>10.3f} {change:>+7.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+async def run(args) -> int:
+    from contextlib import AsyncExitStack
+
+    pattern = re.compile(args.only) if args.only else None
+    results: dict[str, Result] = {}
+
+    async with AsyncExitStack() as stack:
+        cases = memory_cases()
+        if args.no_db:
+            print("database cases: skipped (--no-db)")
+        elif await database_available():
+            cases += await database_cases(stack, args.seed_incidents)
+        else:
+            print("database cases: skipped (database unreachable)")
+
+        print(f"{'case':<58} {'median ms':>10} {'p95 ms':>10} {'ops/s':>12}")
+        for case in cases:
+            if pattern and not pattern.search(case.name):
+                continue
+            if case.setup is not None:
+                await case.setup()
+            try:
+                result = await measure(case)
+            finally:
+                if case.teardown is not None:
+                    await case.teardown()
+            results[case.name] = result
+            print(f"{case.name:<58} {result.median_ms:>10.3f} {result.p95_ms:>10.3f} {result.ops_per_second:>12.1f}")
+
+    if args.save:
+        with open(args.save, "w") as fh:
+            json.dump(
+                {
+                    "created_at": datetime.utcnow().isoformat(),
+                    "git": _git_revision(),
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "results": {name: r.as_dict() for name, r in results.items()},
+                },
+                fh,
+                indent=2,
+            )
+        print(f"\nsaved {len(results)} results to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", help="regex; run only matching case names")
+    parser.add_argument("--no-db", action="store_true", help="skip the database cases")
+    parser.add_argument("--seed-incidents", type=int, default=20_000)
+    parser.add_argument("--save", metavar="PATH", help="write results as a baseline JSON file")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed median slowdown (0.10 = 10%%)")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""initial schema
+
+The tables as previously created by ``Base.metadata.create_all`` at startup.
+A database that was created that way is already at this revision:
+``alembic stamp 0001``.
+
+Revision ID: 0001
+Revises:
+Create Date: 2024-10-01 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import geoalchemy2
+import sqlalchemy as sa
+
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+user_role = sa.Enum("citizen", "responder", "admin", name="userrole")
+incident_status = sa.Enum(
+    "requested", "triaged", "assigned", "en_route", "arrived", "resolved", name="incidentstatus"
+)
+assignment_status = sa.Enum("pending", "accepted", "rejected", "cancelled", "completed", name="assignmentstatus")
+
+
+def _point():
+    # Spatial indexes are created explicitly below, under the names
+    # create_all used.
+    return geoalchemy2.Geography(geometry_type="POINT", srid=4326, spatial_index=False)
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS postgis")
+
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("phone", sa.String(32), nullable=True),
+        sa.Column("hashed_password", sa.String(255), nullable=False),
+        sa.Column("role", user_role, nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "incidents",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("reporter_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("description", sa.Text(), nullable=False),
+        sa.Column("raw_text", sa.Text(), nullable=True),
+        sa.Column("category", sa.String(64), nullable=True),
+        sa.Column("urgency", sa.String(32), nullable=True),
+        sa.Column("injured_count", sa.Integer(), nullable=True),
+        sa.Column("trapped", sa.Boolean(), nullable=True),
+        sa.Column("water_level_m", sa.Float(), nullable=True),
+        sa.Column("location", _point(), nullable=False),
+        sa.Column("address", sa.String(255), nullable=True),
+        sa.Column("status", incident_status, nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_incidents_id", "incidents", ["id"])
+    op.create_index("ix_incidents_category", "incidents", ["category"])
+    op.create_index("ix_incidents_urgency", "incidents", ["urgency"])
+    op.create_index("ix_incidents_status", "incidents", ["status"])
+    op.create_index("ix_incidents_created_at", "incidents", ["created_at"])
+    op.create_index("idx_incidents_location", "incidents", ["location"], postgresql_using="gist")
+
+    op.create_table(
+        "incident_media",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("incident_id", sa.Integer(), sa.ForeignKey("incidents.id"), nullable=True),
+        sa.Column("type", sa.String(32), nullable=True),
+        sa.Column("url", sa.String(512), nullable=True),
+        sa.Column("metadata", sa.Text(), nullable=True),
+    )
+    op.create_index("ix_incident_media_incident_id", "incident_media", ["incident_id"])
+
+    op.create_table(
+        "responders",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True, unique=True),
+        sa.Column("display_name", sa.String(255), nullable=True),
+        sa.Column("skills", sa.String(255), nullable=True),
+        sa.Column("vehicle_type", sa.String(64), nullable=True),
+        sa.Column("trust_score", sa.Float(), nullable=True),
+        sa.Column("location", _point(), nullable=False),
+        sa.Column("is_available", sa.Boolean(), nullable=True),
+    )
+    op.create_index("ix_responders_is_available", "responders", ["is_available"])
+    op.create_index("idx_responders_location", "responders", ["location"], postgresql_using="gist")
+
+    op.create_table(
+        "assignments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("incident_id", sa.Integer(), sa.ForeignKey("incidents.id"), nullable=True),
+        sa.Column("responder_id", sa.Integer(), sa.ForeignKey("responders.id"), nullable=True),
+        sa.Column("status", assignment_status, nullable=True),
+        sa.Column("score", sa.Float(), nullable=True),
+        sa.Column("eta_minutes", sa.Float(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_assignments_incident_id", "assignments", ["incident_id"])
+    op.create_index("ix_assignments_responder_id", "assignments", ["responder_id"])
+    op.create_index("ix_assignments_status", "assignments", ["status"])
+
+    op.create_table(
+        "incident_events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("incident_id", sa.Integer(), sa.ForeignKey("incidents.id"), nullable=True),
+        sa.Column("actor_user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("from_status", sa.String(64), nullable=True),
+        sa.Column("to_status", sa.String(64), nullable=True),
+        sa.Column("event_type", sa.String(64), nullable=True),
+        sa.Column("note", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_incident_events_incident_id", "incident_events", ["incident_id"])
+    op.create_index("ix_incident_events_created_at", "incident_events", ["created_at"])
+
+
+def downgrade() -> None:
+    for table in ("incident_events", "assignments", "responders", "incident_media", "incidents", "users"):
+        op.drop_table(table)
+    for enum in (assignment_status, incident_status, user_role):
+        enum.drop(op.get_bind(), checkfirst=True)
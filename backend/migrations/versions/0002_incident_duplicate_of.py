@@ -0,0 +1,26 @@
+"""incident duplicate_of_id
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2024-10-08 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("incidents", sa.Column("duplicate_of_id", sa.Integer(), sa.ForeignKey("incidents.id"), nullable=True))
+    op.create_index("ix_incidents_duplicate_of_id", "incidents", ["duplicate_of_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_incidents_duplicate_of_id", table_name="incidents")
+    op.drop_column("incidents", "duplicate_of_id")
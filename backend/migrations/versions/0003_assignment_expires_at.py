@@ -0,0 +1,26 @@
+"""assignment expires_at
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2024-10-15 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("assignments", sa.Column("expires_at", sa.DateTime(), nullable=True))
+    op.create_index("ix_assignments_expires_at", "assignments", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_assignments_expires_at", table_name="assignments")
+    op.drop_column("assignments", "expires_at")
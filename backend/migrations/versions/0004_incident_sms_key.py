@@ -0,0 +1,26 @@
+"""incident sms_key
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2024-10-18 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("incidents", sa.Column("sms_key", sa.String(length=255), nullable=True))
+    op.create_unique_constraint("uq_incidents_sms_key", "incidents", ["sms_key"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_incidents_sms_key", "incidents", type_="unique")
+    op.drop_column("incidents", "sms_key")
@@ -0,0 +1,27 @@
+"""incidents (created_at, id) index
+
+The keyset pagination of GET /incidents orders by (created_at, id).
+Databases stamped at 0001 after ``create_all`` predate this index, and an
+earlier 0001 created it, so it is only added where missing.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2024-10-19 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_incidents_created_at_id", "incidents", ["created_at", "id"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_incidents_created_at_id", table_name="incidents", if_exists=True)